@@ -1,95 +1,140 @@
-import pandas as pd
-import spotipy
-from spotipy.oauth2 import SpotifyClientCredentials
-import dotenv
 import os
-from tqdm import tqdm
-import time
 
-# === Charger .env ===
-dotenv.load_dotenv()
-
-SPOTIPY_CLIENT_ID = os.getenv("SPOTIPY_CLIENT_ID")
-SPOTIPY_CLIENT_SECRET = os.getenv("SPOTIPY_CLIENT_SECRET")
-
-if not SPOTIPY_CLIENT_ID or not SPOTIPY_CLIENT_SECRET:
-    raise ValueError("Clé Spotify API manquante. Vérifie ton .env !")
-
-# === Init Spotify ===
-sp = spotipy.Spotify(auth_manager=SpotifyClientCredentials())
+from batch_merge import merge_batches, merge_summary, remove_extra_batches, saved_batch
+from dataset_io import read_table
+from enrichment import TokenBucket, run_concurrent
+from journal import Journal, batch_keys
+from response_cache import format_stats, open_cache
+from spotify_api import make_spotify_client, fetch_tracks, is_spotify_id
 
 # === CONFIG ===
-INPUT_CSV = "dataset_avec_genres_ml.csv"
+INPUT_TABLE = "dataset_avec_genres_ml"
 OUTPUT_DIR = "album_batches"  # Correction du nom du dossier
-OUTPUT_FINAL = "dataset_with_album_cover.csv"
+OUTPUT_FINAL = "dataset_with_album_cover"
+JOURNAL = os.path.join(OUTPUT_DIR, "journal.jsonl")  # Résultats ligne à ligne (reprise après crash)
 
 BATCH_SIZE = 500
-PAUSE_SECONDS = 0.5
-
-# === Charger CSV ===
-df = pd.read_csv(INPUT_CSV)
-
-# Ajouter colonne si absente
-if "album_cover_url" not in df.columns:
-    df["album_cover_url"] = ""
-
-# Créer dossier batches
-os.makedirs(OUTPUT_DIR, exist_ok=True)
-
-# Détecte les batchs déjà traités
-import glob
-existing_batches = set()
-for f in glob.glob(os.path.join(OUTPUT_DIR, "spotify_batch_*.csv")):
-    try:
-        num = int(os.path.basename(f).split('_')[2].split('.')[0])
-        existing_batches.add(num)
-    except Exception:
-        pass
-
-# === Boucle par lots ===
-for batch_num, start_idx in enumerate(range(0, len(df), BATCH_SIZE)):
-    if batch_num in existing_batches:
-        continue  # Batch déjà traité, on saute
-    end_idx = min(start_idx + BATCH_SIZE, len(df))
-    batch = df.iloc[start_idx:end_idx].copy()
-
-    print(f"Traitement batch {batch_num} : lignes {start_idx} à {end_idx}")
-
-    for idx, row in tqdm(batch.iterrows(), total=len(batch), desc=f"Batch {batch_num}"):
-        if isinstance(row["album_cover_url"], str) and len(row["album_cover_url"]) > 5:
-            continue  # Déjà enrichi
-
-        artist = row["artist"]
-        title = row["track_name"]
-
-        try:
-            query = f"track:{title} artist:{artist}"
-            results = sp.search(q=query, type="track", limit=1)
-            items = results["tracks"]["items"]
-            if items and "album" in items[0]:
-                images = items[0]["album"]["images"]
-                if images:
-                    batch.at[idx, "album_cover_url"] = images[0]["url"]
-                else:
-                    batch.at[idx, "album_cover_url"] = ""
-            else:
-                batch.at[idx, "album_cover_url"] = ""
-        except Exception as e:
-            print(f"Erreur pour {title} - {artist} : {e}")
-            batch.at[idx, "album_cover_url"] = ""
-
-        time.sleep(PAUSE_SECONDS)
-
-    # Sauvegarder le batch
-    batch_file = os.path.join(OUTPUT_DIR, f"spotify_batch_{batch_num:04d}.csv")
-    batch.to_csv(batch_file, index=False)
-    print(f"Batch {batch_num} sauvegardé → {batch_file}")
-
-print("Tous les lots sont traités ! Fusionne pour finaliser.")
-
-# === Fusion finale ===
-batch_files = glob.glob(f"{OUTPUT_DIR}/spotify_batch_*.csv")
-dfs = [pd.read_csv(f) for f in batch_files]
-final_df = pd.concat(dfs, ignore_index=True)
-final_df.to_csv(OUTPUT_FINAL, index=False)
-print(f"Dataset final enrichi → {OUTPUT_FINAL}")
+CONCURRENCY = 8            # Requêtes Spotify en vol simultanément
+REQUESTS_PER_SECOND = 10   # Débit partagé par tous les threads
+USE_TRACK_IDS = True       # Lookup par lots de 50 track_id, recherche texte en secours
+
+
+def search_album_cover(sp, artist, title):
+    """Renvoie l'URL de la pochette du premier résultat de recherche ("" si aucun)."""
+    query = f"track:{title} artist:{artist}"
+    results = sp.search(q=query, type="track", limit=1)
+    items = results["tracks"]["items"]
+    if items and "album" in items[0]:
+        return album_cover_of(items[0])
+    return ""
+
+
+def album_cover_of(track):
+    images = track["album"]["images"]
+    return images[0]["url"] if images else ""
+
+
+def enrich_batch(batch, sp, limiter, concurrency=CONCURRENCY, use_track_ids=USE_TRACK_IDS, desc=None, cache=None,
+                 journal=None):
+    """
+    Complète album_cover_url pour les lignes du batch qui n'en ont pas encore.
+
+    Les lignes avec un track_id valide sont résolues par lots de 50 via sp.tracks ;
+    la recherche texte (artiste + titre) ne sert qu'aux lignes sans id ou dont
+    l'id est inconnu de Spotify. Avec `cache` (ResponseCache), les pistes et
+    recherches déjà résolues par un autre run ou worker ne sont pas redemandées.
+    Avec `journal` (journal.Journal), chaque pochette ou échec est journalisé
+    dès qu'il est obtenu, et les lignes déjà réglées dans le journal sont
+    reprises sans appel.
+    """
+    already_done = batch["album_cover_url"].map(lambda u: isinstance(u, str) and len(u) > 5)
+    todo = batch[~already_done]
+    keys = batch_keys(todo)
+
+    if journal is not None:
+        settled = ~keys.map(journal.pending).astype(bool)
+        for idx, key in keys[settled].items():
+            batch.at[idx, "album_cover_url"] = journal.value(key, "")
+        todo = todo[~settled]
+
+    if use_track_ids and "track_id" in todo.columns:
+        ids = todo["track_id"][todo["track_id"].map(is_spotify_id)]
+        tracks = fetch_tracks(sp, ids, limiter, concurrency=concurrency, cache=cache)
+        found = ids[ids.isin(list(tracks))]
+        for idx, track_id in found.items():
+            url = batch.at[idx, "album_cover_url"] = album_cover_of(tracks[track_id])
+            if journal is not None:
+                journal.record(keys[idx], url)
+        todo = todo.drop(found.index)
+
+    jobs = [(idx, (sp, row["artist"], row["track_name"])) for idx, row in todo.iterrows()]
+    search = search_album_cover
+    if cache is not None:
+        # "" (aucun résultat) mis en cache comme réponse vide ; le limiteur ne sert qu'aux appels réels
+        search = cache.wrap(lambda sp, artist, title: search_album_cover(sp, artist, title) or None,
+                            "spotify", "album_cover", lambda sp, artist, title: (artist, title), limiter)
+
+    def record(idx, result):
+        if isinstance(result, Exception):
+            journal.record_failure(keys[idx], result)
+        else:
+            journal.record(keys[idx], result or "")
+
+    covers = run_concurrent(search, jobs, None if cache is not None else limiter, concurrency=concurrency,
+                            default="", desc=desc, on_result=record if journal is not None else None)
+    for idx, url in covers.items():
+        batch.at[idx, "album_cover_url"] = url or ""
+    return batch
+
+
+def main(sp=None, cache=None):
+    sp = sp or make_spotify_client(CONCURRENCY)
+    limiter = TokenBucket(REQUESTS_PER_SECOND)
+    cache = cache or open_cache()
+
+    # === Charger dataset ===
+    df = read_table(INPUT_TABLE)
+
+    # Ajouter colonne si absente
+    if "album_cover_url" not in df.columns:
+        df["album_cover_url"] = ""
+
+    # Créer dossier batches
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+
+    # Journal : reprise ligne à ligne après un crash, échecs retentés selon sa politique
+    journal = Journal(JOURNAL)
+    if len(journal):
+        print(journal.summary())
+
+    # === Boucle par lots ===
+    for batch_num, start_idx in enumerate(range(0, len(df), BATCH_SIZE)):
+        end_idx = min(start_idx + BATCH_SIZE, len(df))
+        batch_file = os.path.join(OUTPUT_DIR, f"spotify_batch_{batch_num:04d}.csv")
+        batch = df.iloc[start_idx:end_idx].copy()
+        unchanged, saved = saved_batch(batch_file, batch, ["album_cover_url"])
+        if unchanged and not batch_keys(batch).map(journal.retry_due).any():
+            continue  # Batch sauvegardé à jour, sans échec à retenter
+        # Lignes déjà traitées (run sans journal, batch modifié par une ingestion) : pochettes reprises
+        batch.loc[saved.index, "album_cover_url"] = saved["album_cover_url"].fillna("")
+
+        print(f"Traitement batch {batch_num} : lignes {start_idx} à {end_idx}")
+        enrich_batch(batch, sp, limiter, desc=f"Batch {batch_num}", cache=cache, journal=journal)
+
+        # Sauvegarder le batch
+        batch.to_csv(batch_file, index=False)
+        print(f"Batch {batch_num} sauvegardé → {batch_file}")
+
+    print("Tous les lots sont traités ! Fusionne pour finaliser.")
+    print(format_stats(cache))
+    print(journal.summary())
+    journal.close()
+
+    # === Fusion finale ===
+    remove_extra_batches(f"{OUTPUT_DIR}/spotify_batch_*.csv", len(df), BATCH_SIZE)
+    stats = merge_batches(f"{OUTPUT_DIR}/spotify_batch_*.csv", OUTPUT_FINAL, expected_rows=len(df), batch_size=BATCH_SIZE)
+    print(f"Dataset final enrichi → {OUTPUT_FINAL} ({merge_summary(stats)})")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,71 +1,80 @@
 import streamlit as st
-import pandas as pd
-import spotipy
-from spotipy.oauth2 import SpotifyOAuth
-
-# === CONFIG ===
-SPOTIPY_CLIENT_ID = "SPOTIPY_CLIENT_ID"
-SPOTIPY_CLIENT_SECRET = "SPOTIPY_CLIENT_SECRET"
-SPOTIPY_REDIRECT_URI = "http://localhost:8501"
-SCOPE = "playlist-modify-public"
-
-# === Auth Spotify ===
-sp = spotipy.Spotify(auth_manager=SpotifyOAuth(
-    client_id=SPOTIPY_CLIENT_ID,
-    client_secret=SPOTIPY_CLIENT_SECRET,
-    redirect_uri=SPOTIPY_REDIRECT_URI,
-    scope=SCOPE
-))
-
-# === Charger dataset ===
-df = pd.read_csv("dataset_mood_activity.csv")
 
-# === Interface ===
-st.title("Générateur de Playlist - Pole Dance / Renfo / Flex")
+from catalog import PROGRAMMES, Catalog, catalog_version
+from lyrics_index import LYRIC_POOL_LABELS
+from playlist_writer import PlaylistWriter
+from sequencer import sequence
+from similarity import load_or_build
 
-genres = sorted(df['genre'].dropna().unique())
-selected_genre = st.selectbox("Choisis ton genre préféré :", genres)
 
-programme = st.radio("Choisis ton programme :", ("renfo", "flex", "pole dance"))
+# === Ressources par session (jeton OAuth et profil de l'utilisateur) ===
+def get_writer() -> PlaylistWriter:
+    # Créé au premier clic seulement, gardé pour les reruns de la session ; identifiants dans le .env
+    if "playlist_writer" not in st.session_state:
+        st.session_state.playlist_writer = PlaylistWriter.from_env()
+    return st.session_state.playlist_writer
 
-if st.button("Générer sur Spotify"):
 
-    genre_pool = df[df['genre'].str.lower() == selected_genre.lower()]
+# === Ressources partagées entre les reruns ===
+@st.cache_resource(max_entries=1)
+def get_catalog(version: float) -> Catalog:
+    # version = mtime de la table : un fichier régénéré crée une nouvelle entrée (et remplace l'ancienne)
+    return Catalog.load()
 
-    cardio_pool = genre_pool[(genre_pool.energy > 0.8) & (genre_pool.danceability > 0.7) & (genre_pool.tempo > 120)]
-    dynamic_pool = genre_pool[(genre_pool.energy > 0.5) & (genre_pool.energy <= 0.8) & (genre_pool.danceability > 0.6)]
-    chill_pool = genre_pool[(genre_pool.energy < 0.4)]
-    dansant_pool = genre_pool[(genre_pool.danceability > 0.8) & (genre_pool['activity'] == 'party')]
 
-    track_duration = 3.5
+@st.cache_resource(max_entries=1)
+def get_similarity(version: float):
+    # Index persisté (similarity_index.npz), reconstruit si la table a changé
+    return load_or_build()
 
-    phases = []
-    if programme == "renfo":
-        phases = [("Cardio", cardio_pool, 15), ("Dynamique", dynamic_pool, 75), ("Chill", chill_pool, 15)]
-    elif programme == "flex":
-        phases = [("Dynamique", dynamic_pool, 15), ("Chill", chill_pool, 45)]
-    elif programme == "pole dance":
-        phases = [("Dynamique", dynamic_pool, 15), ("Dansant", dansant_pool, 75)]
 
-    track_uris = []
+def create_playlist(playlist_name: str, track_uris: list):
+    playlist = get_writer().create(playlist_name, track_uris)
+    st.success(f"Playlist créée : [{playlist_name}]({playlist['external_urls']['spotify']})")
+
+
+catalog = get_catalog(catalog_version())
+
+# === Interface ===
+st.title("Générateur de Playlist - Pole Dance / Renfo / Flex")
 
-    for name, pool, duration in phases:
-        if pool.empty:
-            continue
-        n_tracks = int(duration / track_duration)
-        sampled = pool.sample(min(len(pool), n_tracks))
-        uris = sampled['track_id'].tolist()
-        track_uris.extend(uris)
+selected_genre = st.selectbox("Choisis ton genre préféré :", catalog.genres)
+
+programme = st.radio("Choisis ton programme :", tuple(PROGRAMMES))
+
+# Thème des paroles (pools de l'index inversé), si l'index a été construit
+theme = None
+if catalog.themes:
+    theme = st.selectbox("Thème des paroles :", [None] + list(catalog.themes),
+                         format_func=lambda t: "Tous" if t is None else LYRIC_POOL_LABELS.get(t, t))
+
+if st.button("Générer sur Spotify"):
+
+    # Titres ordonnés selon la courbe énergie / tempo du programme
+    track_uris = sequence(catalog, selected_genre, programme, theme=theme)
 
     if not track_uris:
         st.error("Aucun morceau trouvé pour ce combo. Essaie un autre genre !")
         st.stop()
 
     # === Créer playlist ===
-    user = sp.current_user()
-    playlist_name = f"{programme.capitalize()} - {selected_genre.capitalize()}"
-
-    playlist = sp.user_playlist_create(user['id'], playlist_name, public=True)
-    sp.playlist_add_items(playlist['id'], track_uris)
-
-    st.success(f"Playlist créée : [{playlist_name}]({playlist['external_urls']['spotify']})")
+    create_playlist(f"{programme.capitalize()} - {selected_genre.capitalize()}", track_uris)
+
+# === Plus de titres comme celui-ci ===
+st.header("Plus de titres comme celui-ci")
+search = st.text_input("Cherche un titre ou un artiste :")
+if search:
+    matches = catalog.find(search)
+    if matches.empty:
+        st.info("Aucun titre trouvé.")
+    else:
+        labels = dict(zip(matches["track_id"], matches["artist"] + " - " + matches["track_name"]))
+        seed = st.selectbox("Titre de départ :", list(labels), format_func=labels.get)
+        same_genre = st.checkbox(f"Seulement en {selected_genre}", value=False)
+        similarity = get_similarity(catalog_version())
+        mask = catalog.mask({"genre": selected_genre}) if same_genre else None
+        similar = similarity.similar_to([seed], k=20, mask=mask)[0]
+        st.dataframe(catalog.describe(similar), hide_index=True)
+
+        if st.button("Créer la playlist de titres similaires"):
+            create_playlist(f"Comme {catalog.describe([seed]).track_name[0]}", [seed] + list(similar))
@@ -1,62 +1,99 @@
-import pandas as pd
-import spotipy
-from spotipy.oauth2 import SpotifyClientCredentials
-import time
-import dotenv
-from tqdm import tqdm
-import json
-import os
-
-dotenv.load_dotenv()
-
-SPOTIPY_CLIENT_ID = os.getenv('SPOTIPY_CLIENT_ID')
-SPOTIPY_CLIENT_SECRET = os.getenv('SPOTIPY_CLIENT_SECRET')
-
-client_credentials_manager = SpotifyClientCredentials(
-    client_id=SPOTIPY_CLIENT_ID,
-    client_secret=SPOTIPY_CLIENT_SECRET
-)
-sp = spotipy.Spotify(client_credentials_manager=client_credentials_manager)
-
-INPUT_CSV = "clean.csv"
-CACHE_FILE = "artist_genre_cache.json"
+from dataset_io import read_table
+from enrichment import TokenBucket, run_concurrent
+from genre_cache import STATUS_OK, STATUS_NOT_FOUND, open_genre_cache
+from response_cache import format_stats, open_cache
+from spotify_api import make_spotify_client, fetch_tracks, fetch_artists, is_spotify_id, chunked
+
+INPUT_TABLE = "clean"
+CACHE_DB = "artist_genre_cache.sqlite"
 SAVE_EVERY = 50
 
-df = pd.read_csv(INPUT_CSV)
-artists = df['artist'].fillna('').astype(str).str.lower()
-
-# Chargement du cache
-if os.path.exists(CACHE_FILE):
-    with open(CACHE_FILE, 'r') as f:
-        artist_genre_cache = json.load(f)
-else:
-    artist_genre_cache = {}
-
-# Liste des artistes à traiter (non présents dans le cache)
-unique_artists = set(artists.unique())
-missing_artists = [a for a in unique_artists if a and a not in artist_genre_cache]
-
-print(f"Artistes à traiter via l'API Spotify : {len(missing_artists)}")
-
-def get_artist_genres(artist_name):
-    try:
-        results = sp.search(q='artist:' + artist_name, type='artist', limit=1)
-        if results['artists']['items']:
-            return results['artists']['items'][0]['genres']
-    except Exception as e:
-        pass
-    return []
-
-# Traitement uniquement des artistes manquants
-for idx, artist in enumerate(tqdm(missing_artists, desc="Appels API Spotify artistes manquants")):
-    genres = get_artist_genres(artist)
-    artist_genre_cache[artist] = genres
-    if idx % SAVE_EVERY == 0 and idx > 0:
-        with open(CACHE_FILE, 'w') as f:
-            json.dump(artist_genre_cache, f)
-    time.sleep(0.1)
-
-# Sauvegarde finale du cache
-with open(CACHE_FILE, 'w') as f:
-    json.dump(artist_genre_cache, f)
+CONCURRENCY = 8
+REQUESTS_PER_SECOND = 10
+USE_TRACK_IDS = True  # Genres via sp.tracks -> sp.artists (50 ids/appel), recherche en secours
+
+
+def get_artist_genres(sp, artist_name):
+    """Genres du premier artiste trouvé par recherche, ou None si la recherche ne renvoie rien."""
+    results = sp.search(q='artist:' + artist_name, type='artist', limit=1)
+    if results['artists']['items']:
+        return results['artists']['items'][0]['genres']
+    return None
+
+
+def primary_artist_id(track, artist_name):
+    """Id de l'artiste de la piste correspondant au nom du dataset (sinon le premier crédité)."""
+    for artist in track.get("artists", []):
+        if artist.get("name", "").lower() == artist_name:
+            return artist["id"]
+    return track["artists"][0]["id"] if track.get("artists") else None
+
+
+def genres_by_track_ids(sp, artist_track_ids, limiter, cache=None):
+    """
+    Résout les genres d'artistes à partir d'un track_id connu par artiste :
+    sp.tracks (50 ids/appel) donne l'id de l'artiste, puis sp.artists (50 ids/appel) ses genres.
+
+    Parameters:
+    cache (ResponseCache): Cache de réponses partagé entre runs et workers, optionnel.
+
+    Returns:
+    dict: nom d'artiste -> liste de genres, pour les artistes résolus.
+    """
+    tracks = fetch_tracks(sp, artist_track_ids.values(), limiter, concurrency=CONCURRENCY, cache=cache)
+    artist_ids = {}
+    for artist, track_id in artist_track_ids.items():
+        if track_id in tracks:
+            artist_id = primary_artist_id(tracks[track_id], artist)
+            if artist_id:
+                artist_ids[artist] = artist_id
+
+    artists = fetch_artists(sp, artist_ids.values(), limiter, concurrency=CONCURRENCY, cache=cache)
+    return {
+        artist: artists[artist_id].get("genres", [])
+        for artist, artist_id in artist_ids.items()
+        if artist_id in artists
+    }
+
+
+def main():
+    sp = make_spotify_client(CONCURRENCY)
+    limiter = TokenBucket(REQUESTS_PER_SECOND)
+    responses = open_cache()
+
+    df = read_table(INPUT_TABLE, columns=['artist', 'track_id'])
+    df['artist'] = df['artist'].fillna('').astype(str).str.lower()
+
+    # Chargement du cache (import unique de l'ancien JSON si la base est vide)
+    cache = open_genre_cache(CACHE_DB)
+
+    # Artistes à traiter : absents du cache, en échec ou périmés (TTL)
+    unique_artists = [a for a in df['artist'].unique() if a]
+    missing_artists = cache.artists_to_fetch(unique_artists)
+
+    print(f"Artistes à traiter via l'API Spotify : {len(missing_artists)}")
+
+    # Lookup direct par ids : un track_id représentatif par artiste manquant
+    if USE_TRACK_IDS and 'track_id' in df.columns:
+        known = df[df['artist'].isin(missing_artists) & df['track_id'].map(is_spotify_id)]
+        artist_track_ids = known.drop_duplicates('artist').set_index('artist')['track_id'].to_dict()
+        resolved = genres_by_track_ids(sp, artist_track_ids, limiter, responses)
+        cache.put_many(resolved, STATUS_OK)
+        missing_artists = [a for a in missing_artists if a not in resolved]
+        print(f"Artistes sans id résolu, recherche texte : {len(missing_artists)}")
+
+    # Recherche texte en secours, écrite dans le cache tous les SAVE_EVERY artistes
+    search = responses.wrap(get_artist_genres, "spotify", "search_artist", lambda sp, artist: (artist,), limiter)
+    for chunk in chunked(missing_artists, SAVE_EVERY):
+        jobs = [(artist, (sp, artist)) for artist in chunk]
+        results = run_concurrent(search, jobs, None, concurrency=CONCURRENCY, return_exceptions=True)
+        cache.put_many({a: g for a, g in results.items() if isinstance(g, list)}, STATUS_OK)
+        cache.put_many({a: [] for a, g in results.items() if g is None}, STATUS_NOT_FOUND)
+        cache.record_failures({a: g for a, g in results.items() if isinstance(g, Exception)})
+
+    cache.close()
+    print(format_stats(responses))
+
 
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+"""
+Fusion des batchs CSV d'une étape (paroles, pochettes, tags Last.fm, mood)
+en une table, en streaming.
+
+- batchs lus dans l'ordre numérique (batch_0002 avant batch_0010), quel que
+  soit l'ordre du système de fichiers
+- quelques batchs lus en parallèle d'avance, écrits un par un : la mémoire
+  reste bornée à READ_AHEAD batchs, paroles comprises
+- numéros de batchs continus et nombre de lignes attendu vérifiés : un batch
+  manquant, tronqué ou issu d'un run avec un autre BATCH_SIZE est signalé
+- une seule ligne par track_id (la première rencontrée)
+
+Les étapes reprennent leurs batchs par identité, pas par position : un
+batch sauvegardé n'est gardé que s'il décrit encore les mêmes lignes que la
+tranche actuelle du dataset (voir saved_batch), ce qui couvre les lignes
+ajoutées, remplacées ou mises à jour par clean.py --ingest.
+
+    python batch_merge.py "lyrics_batches/batch_*.csv" dataset_with_lyrics --expected-rows 114000 --batch-size 500
+"""
+import argparse
+import glob
+import math
+import os
+import re
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from dataset_io import TableWriter
+
+# === CONFIG ===
+READ_WORKERS = 4
+READ_AHEAD = 8  # Batchs lus d'avance au maximum
+IDENTITY_COLUMNS = ["track_id", "artist", "track_name", "popularity"]  # Changent à l'ingestion (clean.merge_delta)
+
+
+def batch_number(path: str) -> int:
+    """Numéro d'un fichier de batch : dernier entier du nom (spotify_batch_0012.csv -> 12)."""
+    match = re.search(r"(\d+)\D*$", os.path.basename(path))
+    if match is None:
+        raise ValueError(f"Pas de numéro de batch dans {path}")
+    return int(match.group(1))
+
+
+def batch_files(pattern: str) -> list:
+    """Fichiers du motif glob, triés par numéro de batch."""
+    return sorted(glob.glob(pattern), key=batch_number)
+
+
+def missing_batches(numbers, expected_batches: int = None) -> list:
+    """Numéros absents entre 0 et le dernier batch (ou expected_batches - 1)."""
+    last = (expected_batches if expected_batches is not None else max(numbers, default=-1) + 1)
+    return sorted(set(range(last)) - set(numbers))
+
+
+def read_batch(path: str, key: str = "track_id") -> pd.DataFrame:
+    # Types d'un batch à l'autre (entier avec ou sans trous...) réconciliés par TableWriter sur le schéma du premier
+    return pd.read_csv(path, dtype={key: str} if key else None)
+
+
+def read_ahead(paths: list, workers: int = READ_WORKERS, window: int = READ_AHEAD, key: str = "track_id"):
+    """Batchs lus en parallèle, rendus dans l'ordre de `paths`, au plus `window` en mémoire."""
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for path in paths:
+            pending.append((path, pool.submit(read_batch, path, key)))
+            if len(pending) >= window:
+                done_path, future = pending.popleft()
+                yield done_path, future.result()
+        while pending:
+            done_path, future = pending.popleft()
+            yield done_path, future.result()
+
+
+def _identity(df: pd.DataFrame, columns: list) -> pd.DataFrame:
+    titles = [col for col in columns if col != "popularity"]
+    identity = df[titles].fillna("").astype(str).reset_index(drop=True)
+    if "popularity" in columns:
+        identity["popularity"] = pd.to_numeric(df["popularity"], errors="coerce").to_numpy(dtype=float)
+    return identity
+
+
+def saved_batch(path: str, batch: pd.DataFrame, columns: list) -> tuple:
+    """
+    Compare le batch sauvegardé `path` à la tranche actuelle du dataset.
+
+    Après une ingestion, le fichier peut décrire d'autres lignes : titres
+    ajoutés au dernier batch, track_id remplacé, ligne mise à jour (popularité,
+    artiste...). Il est alors à refaire ; les résultats des lignes dont le titre
+    n'a pas changé (même track_id, artiste et titre) restent réutilisables.
+
+    Parameters:
+    path (str): Fichier du batch (peut ne pas exister).
+    batch (DataFrame): Lignes actuelles du batch.
+    columns (list): Colonnes de résultat de l'étape (ex. ["lyrics"]).
+
+    Returns:
+    tuple: (fichier identique à la tranche, DataFrame des `columns` sauvegardées,
+    indexé comme `batch`, pour les lignes inchangées).
+    """
+    if not os.path.exists(path):
+        return False, pd.DataFrame(columns=columns)
+    keys = [col for col in IDENTITY_COLUMNS if col in batch.columns]
+    saved = pd.read_csv(path, dtype={col: str for col in keys if col != "popularity"},
+                        usecols=lambda col: col in keys or col in columns)
+    keys = [col for col in keys if col in saved.columns]
+    current, before = _identity(batch, keys), _identity(saved, keys)
+    unchanged = len(saved.columns) == len(set(keys) | set(columns)) and current.equals(before)
+
+    titles = [col for col in keys if col != "popularity"]
+    results = [col for col in columns if col in saved.columns]
+    values = before[titles].join(saved[results].reset_index(drop=True)).drop_duplicates(titles)
+    kept = current[titles].assign(_row=batch.index).merge(values, on=titles, how="inner")
+    return unchanged, kept.set_index("_row")[results].rename_axis(batch.index.name)
+
+
+def remove_extra_batches(pattern: str, expected_rows: int, batch_size: int) -> list:
+    """Supprime les batchs au-delà de la taille actuelle du dataset (raccourci par une ingestion)."""
+    expected_batches = math.ceil(expected_rows / batch_size)
+    extra = [p for p in batch_files(pattern) if batch_number(p) >= expected_batches]
+    for path in extra:
+        os.remove(path)
+    return extra
+
+
+def merged_schema(df: pd.DataFrame) -> pa.Schema:
+    """
+    Schéma du premier batch ; une colonne vide (type inconnu) est une chaîne
+    (paroles, URL...). Sans métadonnées pandas : elles décriraient les types
+    du premier batch seulement.
+    """
+    schema = pa.Schema.from_pandas(df, preserve_index=False)
+    for i, col in enumerate(df.columns):
+        if len(df) and df[col].isna().all():
+            schema = schema.set(i, pa.field(col, pa.string()))
+    return schema.remove_metadata()
+
+
+def merge_batches(pattern: str, output: str, expected_rows: int = None, batch_size: int = None,
+                  key: str = "track_id", strict: bool = True, workers: int = READ_WORKERS, csv: bool = None,
+                  transform=None) -> dict:
+    """
+    Fusionne les batchs du motif dans la table `output` (Parquet + export CSV, voir dataset_io).
+
+    Parameters:
+    pattern (str): Motif glob des batchs (ex. "lyrics_batches/batch_*.csv").
+    output (str): Table produite (ex. "dataset_with_lyrics").
+    expected_rows (int): Lignes attendues au total avant dédoublonnage (taille de la table source).
+    batch_size (int): BATCH_SIZE de l'étape : donne le nombre de batchs attendus.
+    key (str): Colonne de dédoublonnage (None pour garder toutes les lignes).
+    strict (bool): Lever une erreur si des batchs ou des lignes manquent, sinon seulement l'afficher.
+    transform (callable): batch -> batch appliqué avant écriture (ex. LyricsStore.externalize).
+
+    Returns:
+    dict: batches, rows_read, rows_written, duplicates, missing (numéros de batchs absents).
+    """
+    paths = batch_files(pattern)
+    if not paths:
+        raise FileNotFoundError(f"Aucun batch pour {pattern}")
+    expected_batches = math.ceil(expected_rows / batch_size) if expected_rows is not None and batch_size else None
+    missing = missing_batches([batch_number(p) for p in paths], expected_batches)
+    extra = [p for p in paths if expected_batches is not None and batch_number(p) >= expected_batches]
+    problems = []
+    if missing:
+        problems.append(f"batchs manquants : {missing[:20]}{' ...' if len(missing) > 20 else ''}")
+    if extra:
+        problems.append(f"batchs en trop (autre BATCH_SIZE ?) : {[os.path.basename(p) for p in extra[:5]]}")
+    _check(problems, strict)
+
+    seen = set()
+    last = batch_number(paths[-1])
+    stats = {"batches": len(paths), "rows_read": 0, "rows_written": 0, "duplicates": 0, "missing": missing}
+    with TableWriter(output, csv=csv) as writer:
+        for path, batch in read_ahead(paths, workers, key=key):
+            stats["rows_read"] += len(batch)
+            if transform is not None:
+                batch = transform(batch)
+            if writer.schema is None:
+                writer.schema = merged_schema(batch)
+            if batch_size and len(batch) != batch_size and batch_number(path) != last:
+                problems.append(f"{os.path.basename(path)} : {len(batch)} lignes au lieu de {batch_size}")
+            if key is not None and key in batch.columns:
+                ids = batch[key]
+                already = np.fromiter((i in seen for i in ids), dtype=bool, count=len(ids))
+                duplicated = (ids.duplicated() | already) & ids.notna()
+                seen.update(ids[~duplicated & ids.notna()])
+                stats["duplicates"] += int(duplicated.sum())
+                batch = batch[~duplicated]
+            writer.write(batch)
+            stats["rows_written"] += len(batch)
+
+        if expected_rows is not None and stats["rows_read"] != expected_rows:
+            problems.append(f"{stats['rows_read']} lignes lues au lieu de {expected_rows}")
+        _check(problems, strict)
+    return stats
+
+
+def _check(problems: list, strict: bool):
+    if problems:
+        message = "Fusion incomplète : " + " ; ".join(problems)
+        if strict:
+            raise ValueError(message)
+        print(f"Attention : {message}")
+        problems.clear()
+
+
+def merge_summary(stats: dict) -> str:
+    return (f"{stats['batches']} batchs, {stats['rows_read']} lignes lues, {stats['rows_written']} écrites"
+            + (f", {stats['duplicates']} doublons de track_id retirés" if stats["duplicates"] else ""))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fusion ordonnée et dédoublonnée de batchs CSV")
+    parser.add_argument("pattern")
+    parser.add_argument("output")
+    parser.add_argument("--expected-rows", type=int, default=None)
+    parser.add_argument("--batch-size", type=int, default=None)
+    parser.add_argument("--key", default="track_id")
+    parser.add_argument("--no-strict", action="store_true", help="Signaler les problèmes sans échouer")
+    args = parser.parse_args()
+
+    stats = merge_batches(args.pattern, args.output, args.expected_rows, args.batch_size, args.key,
+                          strict=not args.no_strict)
+    print(f"Fusion → {args.output} : {merge_summary(stats)}")
@@ -0,0 +1,65 @@
+"""
+Débit d'enrichissement des pochettes (albums.py) contre le serveur Spotify factice.
+
+Compare la boucle séquentielle historique (une recherche à la fois) au moteur
+concurrent limité en débit, en recherche texte puis en lookup par lots de track_id. Usage :
+    python -m benchmarks.bench_albums --rows 500 --latency 0.05 --rate 100
+"""
+import argparse
+import hashlib
+import time
+
+import pandas as pd
+
+from albums import enrich_batch, search_album_cover
+from benchmarks.fake_spotify import start_fake_spotify
+from enrichment import TokenBucket
+from spotify_api import make_spotify_client
+
+
+def make_rows(n: int) -> pd.DataFrame:
+    return pd.DataFrame({
+        "track_id": [hashlib.md5(str(i).encode()).hexdigest()[:22] for i in range(n)],
+        "artist": [f"artist {i % 97}" for i in range(n)],
+        "track_name": [f"title {i}" for i in range(n)],
+        "album_cover_url": [""] * n,
+    })
+
+
+def bench_sequential(sp, df, pause):
+    start = time.perf_counter()
+    for idx, row in df.iterrows():
+        df.at[idx, "album_cover_url"] = search_album_cover(sp, row["artist"], row["track_name"])
+        time.sleep(pause)
+    return time.perf_counter() - start
+
+
+def bench_concurrent(sp, df, rate, concurrency, use_track_ids):
+    start = time.perf_counter()
+    enrich_batch(df, sp, TokenBucket(rate), concurrency=concurrency, use_track_ids=use_track_ids)
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=500)
+    parser.add_argument("--latency", type=float, default=0.05, help="Latence simulée par requête (s)")
+    parser.add_argument("--rate", type=float, default=100, help="Limite serveur en requêtes/s (429 au-delà)")
+    parser.add_argument("--pause", type=float, default=0.0, help="Pause de l'ancienne boucle (0.5 en prod)")
+    parser.add_argument("--concurrency", type=int, default=8)
+    args = parser.parse_args()
+
+    server, prefix = start_fake_spotify(latency=args.latency, rate=args.rate)
+    sp = make_spotify_client(args.concurrency, prefix=prefix, auth="fake")
+
+    seq = bench_sequential(sp, make_rows(args.rows), args.pause)
+    print(f"Séquentiel  : {seq:.2f}s ({args.rows / seq:.0f} lignes/s)")
+
+    for label, use_track_ids in [("Concurrent ", False), ("Ids par 50 ", True)]:
+        server.throttled = server.request_count = 0
+        df = make_rows(args.rows)
+        elapsed = bench_concurrent(sp, df, args.rate * 0.9, args.concurrency, use_track_ids)
+        filled = (df["album_cover_url"].str.len() > 5).sum()
+        print(f"{label} : {elapsed:.2f}s ({args.rows / elapsed:.0f} lignes/s), {filled}/{args.rows} pochettes, "
+              f"{server.request_count} requêtes, {server.throttled} réponses 429")
+    server.shutdown()
@@ -0,0 +1,61 @@
+"""
+App Streamlit : coût par clic de l'ancien code (lecture + filtres à chaque
+rerun) vs catalogue chargé une fois puis tirage dans les pools précalculés.
+
+    python -m benchmarks.bench_app --rows 200000
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.bench_io import make_stage_tables
+from catalog import APP_COLUMNS, Catalog
+from dataset_io import write_table
+
+
+def legacy_click(path: str, genre: str) -> list:
+    df = pd.read_csv(path)
+    genre_pool = df[df['genre'].str.lower() == genre.lower()]
+    cardio_pool = genre_pool[(genre_pool.energy > 0.8) & (genre_pool.danceability > 0.7) & (genre_pool.tempo > 120)]
+    dynamic_pool = genre_pool[(genre_pool.energy > 0.5) & (genre_pool.energy <= 0.8) & (genre_pool.danceability > 0.6)]
+    chill_pool = genre_pool[(genre_pool.energy < 0.4)]
+    track_uris = []
+    for pool, duration in ((cardio_pool, 15), (dynamic_pool, 75), (chill_pool, 15)):
+        if not pool.empty:
+            track_uris.extend(pool.sample(min(len(pool), int(duration / 3.5)))['track_id'].tolist())
+    return track_uris
+
+
+def timed(fn, repeat: int = 1) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=200000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        df = make_stage_tables(args.rows)["dataset_mood_activity"]
+        # Valeurs audio réalistes pour le tempo (BPM)
+        df["tempo"] = 60 + df["tempo"] * 140
+        name = os.path.join(tmp, "dataset_mood_activity")
+        write_table(df, name, csv=True)
+
+        t_legacy = timed(lambda: legacy_click(name + ".csv", "Rap"))
+        t_load = timed(lambda: Catalog.load(name))
+        catalog = Catalog.load(name)
+        rng = np.random.default_rng(0)
+        t_click = timed(lambda: catalog.playlist("Rap", "renfo", rng), repeat=1000)
+
+        print(f"Ancien code, chaque clic (read_csv + filtres) : {t_legacy:.2f}s")
+        print(f"Catalogue, premier rendu (Parquet projeté + pools) : {t_load:.2f}s")
+        print(f"Catalogue, chaque clic (lookup + tirage) : {t_click * 1e6:.0f}µs")
+        print(f"Colonnes chargées : {len(APP_COLUMNS)} sur {len(df.columns)}")
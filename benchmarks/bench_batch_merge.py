@@ -0,0 +1,86 @@
+"""
+Fusion des batchs : ancienne fusion (glob non trié, read_csv de tous les
+batchs, concat, to_csv) vs batch_merge.merge_batches (ordre numérique,
+streaming, dédoublonnage), temps et pic mémoire dans un sous-processus.
+
+Batchs synthétiques avec paroles (comme lyrics_batches/).
+
+    python -m benchmarks.bench_batch_merge --rows 100000 --batch-size 500
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from benchmarks.bench_io import make_stage_tables
+
+MEASURE = """
+import json, sys, time
+sys.path.insert(0, {root!r})
+import glob
+import pandas as pd
+from batch_merge import merge_batches
+
+def status(key):
+    for line in open("/proc/self/status"):
+        if line.startswith(key):
+            return int(line.split()[1]) / 1024
+
+open("/proc/self/clear_refs", "w").write("5")
+before = status("VmRSS")
+start = time.perf_counter()
+{code}
+elapsed = time.perf_counter() - start
+print(json.dumps({{"seconds": elapsed, "peak_mb": status("VmHWM") - before}}))
+"""
+
+LEGACY = """
+dfs = [pd.read_csv(f) for f in glob.glob("batches/batch_*.csv")]
+pd.concat(dfs, ignore_index=True).to_csv("legacy.csv", index=False)
+"""
+
+LEGACY_TABLE = """
+from dataset_io import write_table
+dfs = [pd.read_csv(f) for f in glob.glob("batches/batch_*.csv")]
+write_table(pd.concat(dfs, ignore_index=True), "legacy", csv={csv})
+"""
+
+MERGE = """
+merge_batches("batches/batch_*.csv", "merged", expected_rows={rows}, batch_size={batch_size}, workers={workers},
+              csv={csv})
+"""
+
+
+def measure(code: str, cwd: str) -> dict:
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    out = subprocess.run([sys.executable, "-c", MEASURE.format(root=root, code=code)],
+                         cwd=cwd, capture_output=True, text=True, check=True)
+    return json.loads(out.stdout)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+
+    df = make_stage_tables(args.rows)["dataset_with_lyrics"]
+    with tempfile.TemporaryDirectory() as tmp:
+        os.makedirs(os.path.join(tmp, "batches"))
+        for n, start in enumerate(range(0, len(df), args.batch_size)):
+            df.iloc[start:start + args.batch_size].to_csv(os.path.join(tmp, "batches", f"batch_{n:04d}.csv"), index=False)
+        size = sum(os.path.getsize(os.path.join(tmp, "batches", f)) for f in os.listdir(os.path.join(tmp, "batches")))
+        print(f"{len(os.listdir(os.path.join(tmp, 'batches')))} batchs, {size / 1e6:.0f} Mo de CSV")
+
+        # Sorties : CSV seul (fusion_*.py, albums.py), Parquet seul, Parquet + CSV (tags.py, write_table)
+        results = [("CSV", "glob + concat (ancien)", measure(LEGACY, tmp))]
+        for output, csv in (("Parquet", False), ("Parquet+CSV", True)):
+            results.append((output, "glob + concat + write_table", measure(LEGACY_TABLE.format(csv=csv), tmp)))
+            for workers in (1, 4):
+                code = MERGE.format(rows=len(df), batch_size=args.batch_size, workers=workers, csv=csv)
+                results.append((output, f"merge_batches, {workers} lecteur{'s' if workers > 1 else ''}",
+                                 measure(code, tmp)))
+        for output, label, r in results:
+            print(f"{output:<12} {label:<28} {r['seconds']:6.2f}s  pic {r['peak_mb']:7.1f} Mo")
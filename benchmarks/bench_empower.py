@@ -0,0 +1,59 @@
+"""
+Score empowerment : boucle iterrows historique vs scan vectorisé par mots entiers.
+
+    python -m benchmarks.bench_empower --rows 20000
+"""
+import argparse
+import random
+import time
+
+import pandas as pd
+
+from empower_tag import KEYWORDS, score_empowerment
+
+FILLER = ("love night baby heart dance feel time know never surprise powerful arise together forever "
+          "tonight money the and you me i my your we it is in on that be all so go oh yeah down up like "
+          "just get got want need make way come back say girl's queens, fighting").split()
+
+
+def make_lyrics(n: int, words: int = 250, keyword_rate: float = 0.01, seed: int = 0) -> pd.DataFrame:
+    """Paroles synthétiques : ~1 % de mots-clés, comme des paroles réelles."""
+    rnd = random.Random(seed)
+    return pd.DataFrame({"lyrics": [
+        " ".join(rnd.choice(KEYWORDS) if rnd.random() < keyword_rate else rnd.choice(FILLER) for _ in range(words))
+        for _ in range(n)
+    ]})
+
+
+def legacy_loop(df: pd.DataFrame) -> pd.DataFrame:
+    """Copie de l'ancienne implémentation (sous-chaînes, une ligne à la fois)."""
+    df["empowerment"] = False
+    df["empowerment_hits"] = 0
+    for idx, row in df.iterrows():
+        lyrics = str(row.get("lyrics", "")).lower()
+        hits = sum(1 for kw in KEYWORDS if kw in lyrics)
+        if hits > 0:
+            df.at[idx, "empowerment"] = True
+            df.at[idx, "empowerment_hits"] = hits
+    return df
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=20000)
+    args = parser.parse_args()
+
+    df = make_lyrics(args.rows)
+
+    start = time.perf_counter()
+    legacy = legacy_loop(df.copy())
+    t_legacy = time.perf_counter() - start
+
+    start = time.perf_counter()
+    vectorized = score_empowerment(df.copy())
+    t_vec = time.perf_counter() - start
+
+    diff = (legacy["empowerment_hits"] != vectorized["empowerment_hits"]).sum()
+    print(f"Boucle iterrows : {t_legacy:.2f}s")
+    print(f"Scan vectorisé  : {t_vec:.2f}s (x{t_legacy / t_vec:.1f})")
+    print(f"Lignes dont le score change (faux positifs sous-chaîne retirés) : {diff}/{args.rows}")
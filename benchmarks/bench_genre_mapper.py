@@ -0,0 +1,68 @@
+"""
+Règles de genre de smart_genre_mapper : boucle par ligne (ancien code) vs
+évaluation par artiste distinct, sur les artistes réels du cache JSON.
+
+    python -m benchmarks.bench_genre_mapper --rows 1000000
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+import pandas as pd
+
+from smart_genre_mapper import load_artistes_fr, map_genres, rules
+
+
+def legacy_map_genre(spotify_genres, artist, artistes_fr):
+    if any(a in artist for a in artistes_fr):
+        return "Variété-Pop"
+    if not spotify_genres:
+        return "Autre"
+    for genre in spotify_genres:
+        g = genre.lower()
+        for rule in rules:
+            for pat in rule["pattern"]:
+                if pat in g:
+                    return rule["genre"]
+    return "Autre"
+
+
+def legacy_loop(artists: pd.Series, cache: dict, artistes_fr: list) -> list:
+    return [legacy_map_genre(cache.get(a, []), a, artistes_fr) for a in artists.fillna('').astype(str).str.lower()]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--cache", default="artist_genre_cache.json")
+    parser.add_argument("--legacy-rows", type=int, default=100000, help="Ancien code mesuré sur un échantillon")
+    args = parser.parse_args()
+
+    with open(args.cache, encoding="utf-8") as f:
+        cache = json.load(f)
+    names = np.array(list(cache), dtype=object)
+    artists = pd.Series(np.random.default_rng(0).choice(names, args.rows))
+    legacy_list = [line.strip() for line in open("artistes_fr.txt", encoding="utf-8")
+                   if line.strip() and not line.startswith("#")]
+    load_artistes_fr()
+
+    start = time.perf_counter()
+    labels = map_genres(artists, cache)
+    t_new = time.perf_counter() - start
+
+    sample = artists.iloc[:args.legacy_rows]
+    start = time.perf_counter()
+    legacy = legacy_loop(sample, cache, legacy_list)
+    t_legacy = (time.perf_counter() - start) * len(artists) / len(sample)
+
+    print(f"Ancien code (extrapolé à {args.rows} lignes) : {t_legacy:.2f}s")
+    print(f"Par artiste distinct ({artists.nunique()} artistes) : {t_new:.2f}s")
+
+    # Artistes dont le macro-genre change (correspondance exacte des artistes FR)
+    old = {a: legacy_map_genre(cache.get(a, []), a, legacy_list) for a in names}
+    new = dict(zip(names, map_genres(pd.Series(names), cache)))
+    changed = [(a, old[a], new[a]) for a in names if old[a] != new[a]]
+    print(f"Artistes reclassés : {len(changed)} sur {len(names)}")
+    for artist, before, after in changed[:15]:
+        print(f"  {artist!r} : {before} -> {after}")
@@ -0,0 +1,63 @@
+"""
+Classifieur des lignes "Autre" de smart_genre_mapper : forêt historique
+(RandomForestClassifier() mono-thread) vs options de make_model.
+
+Données synthétiques : features audio tirées par genre avec recouvrement
+(moyennes différentes, même bruit), pour comparer vitesse, taille et
+précision ; le jeu réel donnera d'autres scores absolus.
+
+    python -m benchmarks.bench_genre_model --rows 200000
+"""
+import argparse
+import io
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.model_selection import train_test_split
+
+from smart_genre_mapper import FEATURES, make_model
+
+GENRES = ["Rap", "Variété-Pop", "Rock-Metal", "Dance-Electro", "Latino", "Soul & R&B",
+          "Classique", "Jazz & Blues", "Reggae", "Contemporain", "K-Pop"]
+
+
+def make_labelled(n: int, seed: int = 0) -> tuple:
+    rng = np.random.default_rng(seed)
+    centers = rng.random((len(GENRES), len(FEATURES)))
+    y = rng.integers(0, len(GENRES), n)
+    X = np.clip(centers[y] + rng.normal(0, 0.18, (n, len(FEATURES))), 0, 1)
+    X[:, 0] = 60 + X[:, 0] * 140  # tempo en BPM
+    return pd.DataFrame(X, columns=FEATURES), pd.Series(np.array(GENRES)[y])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=200000)
+    args = parser.parse_args()
+
+    X, y = make_labelled(args.rows)
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=0)
+
+    models = {"forest (historique)": RandomForestClassifier(random_state=0)}
+    models.update({kind: make_model(kind) for kind in ("forest", "forest_small", "hgb")})
+
+    reference = None
+    print(f"{'modèle':22} {'fit s':>7} {'predict s':>10} {'taille Mo':>10} {'précision':>10} {'accord':>8}")
+    for name, model in models.items():
+        start = time.perf_counter()
+        model.fit(X_train, y_train)
+        t_fit = time.perf_counter() - start
+        start = time.perf_counter()
+        preds = model.predict(X_test)
+        t_predict = time.perf_counter() - start
+
+        buffer = io.BytesIO()
+        joblib.dump(model, buffer)
+        if reference is None:
+            reference = preds
+        accuracy = (preds == y_test.to_numpy()).mean()
+        agreement = (preds == reference).mean()
+        print(f"{name:22} {t_fit:7.2f} {t_predict:10.2f} {buffer.tell() / 1e6:10.1f} {accuracy:10.1%} {agreement:8.1%}")
@@ -0,0 +1,126 @@
+"""
+Ingestion (clean.py --ingest) puis reprise des étapes d'enrichissement
+(albums.py, lyrics_enrichment.py + fusion_lyrics.py) contre les serveurs
+Spotify et Genius factices.
+
+Le troisième export et des lignes fabriquées (track_id remplaçant un titre
+moins populaire, mise à jour qui rejoint un autre titre) sont ingérés après
+un premier run. Le second run ne doit demander que les lignes changées, et
+ses tables doivent être identiques à un run complet sur le dataset final.
+
+    python -m benchmarks.bench_ingest --rows 3000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+import albums
+import lyrics_enrichment
+from benchmarks.fake_genius import start_fake_genius
+from benchmarks.fake_spotify import start_fake_spotify
+from benchmarks.synthetic import SOURCES, dataset_dir, track_ids
+from clean import CLEAN_COLUMNS, clean_sources, ingest
+from dataset_io import read_table, write_table
+from lyrics_store import lyrics_column
+from response_cache import open_cache
+from spotify_api import make_spotify_client
+
+INPUT_TABLE = albums.INPUT_TABLE  # Même table d'entrée pour les deux étapes (les étapes de genre gardent les lignes)
+
+
+def crafted_rows(df, rng, n: int):
+    """
+    Lignes à ingérer en plus de l'export : `n` nouveaux track_id plus
+    populaires qu'un titre existant (remplacement), et `n` mises à jour qui
+    prennent l'artiste et le titre d'une autre ligne moins populaire (retrait).
+    """
+    low = df[df["popularity"] < 90].sample(3 * n, random_state=int(rng.integers(1 << 31)))
+    replacing = low.iloc[:n].assign(track_id=track_ids(rng, n), popularity=low["popularity"].iloc[:n] + 5)
+    updated, target = low.iloc[n:2 * n].copy(), low.iloc[2 * n:]
+    updated["artist"], updated["track_name"] = target["artist"].to_numpy(), target["track_name"].to_numpy()
+    updated["popularity"] = np.maximum(updated["popularity"].to_numpy(), target["popularity"].to_numpy()) + 5
+    return pd.concat([replacing, updated])[[col for col in CLEAN_COLUMNS if col in df.columns]]
+
+
+def run_stages(spotify, genius):
+    albums.main(make_spotify_client(8, prefix=spotify, auth="fake"), open_cache("memory://"))
+    lyrics_enrichment.main(lyrics_enrichment.GeniusFetcher(root=genius, rate=1000), open_cache("memory://"))
+
+
+def results():
+    covers = read_table(albums.OUTPUT_FINAL, columns=["track_id", "album_cover_url"])
+    lyrics = read_table("dataset_with_lyrics")
+    return covers, lyrics["track_id"], lyrics_column(lyrics)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=3000)
+    parser.add_argument("--crafted", type=int, default=20, help="Remplacements et retraits fabriqués (chacun)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    src = dataset_dir(args.rows, args.seed)
+    rng = np.random.default_rng(args.seed)
+    albums.REQUESTS_PER_SECOND = 1000
+    spotify_server, spotify = start_fake_spotify(latency=0)
+    genius_server, genius = start_fake_genius(latency=0, page_kb=2)
+    servers = (spotify_server, genius_server)
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        first = clean_sources([os.path.join(src, name) for name in SOURCES[:2]])
+        write_table(first, INPUT_TABLE)
+        crafted_rows(first, rng, args.crafted).to_csv("extra.csv", index=False)
+        t_first = time.perf_counter()
+        run_stages(spotify, genius)
+        t_first = time.perf_counter() - t_first
+        first_requests = sum(s.request_count for s in servers)
+
+        for server in servers:
+            server.request_count = 0
+        delta = ingest([os.path.join(src, SOURCES[2]), "extra.csv"], name=INPUT_TABLE)
+        t_resume = time.perf_counter()
+        run_stages(spotify, genius)
+        t_resume = time.perf_counter() - t_resume
+        resume_requests = sum(s.request_count for s in servers)
+        final = read_table(INPUT_TABLE)
+        covers, lyric_ids, lyrics = results()
+
+        # Référence : run complet sur le dataset après ingestion
+        os.makedirs("full")
+        os.chdir("full")
+        write_table(final, INPUT_TABLE)
+        for server in servers:
+            server.request_count = 0
+        t_full = time.perf_counter()
+        run_stages(spotify, genius)
+        t_full = time.perf_counter() - t_full
+        full_requests = sum(s.request_count for s in servers)
+        ref_covers, ref_ids, ref_lyrics = results()
+        os.chdir(cwd)
+    for server in servers:
+        server.shutdown()
+
+    ids = final["track_id"].tolist()
+    checks = {
+        "pochettes": covers["track_id"].tolist() == ids and covers.equals(ref_covers),
+        "paroles": lyric_ids.tolist() == ids and lyrics.tolist() == ref_lyrics.tolist(),
+    }
+    counts = delta["change"].value_counts()
+    print()
+    print(f"Dataset initial       : {len(first)} titres ; ingestion : " +
+          ", ".join(f"{n} {change}" for change, n in counts.items()) + f" → {len(final)} titres")
+    print(f"Premier run           : {t_first:.2f}s, {first_requests} requêtes")
+    print(f"Reprise après ingestion: {t_resume:.2f}s, {resume_requests} requêtes")
+    print(f"Run complet           : {t_full:.2f}s, {full_requests} requêtes")
+    for name, ok in checks.items():
+        print(f"{name:22}: {'identique au run complet' if ok else 'DIFFÉRENT du run complet'}")
+    if not all(checks.values()):
+        sys.exit(1)
@@ -0,0 +1,112 @@
+"""
+Temps de chargement et pic mémoire de chaque table de la chaîne : CSV vs Parquet.
+
+Chaque mesure tourne dans un sous-processus (pic RSS propre). Les tables sont
+synthétiques mais ont les colonnes réelles de chaque étape, paroles comprises.
+
+    python -m benchmarks.bench_io --rows 100000
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.bench_empower import make_lyrics
+from dataset_io import write_table
+
+FEATURES = ["danceability", "energy", "loudness", "speechiness", "acousticness",
+            "instrumentalness", "liveness", "valence", "tempo"]
+
+# Colonnes ajoutées par chaque étape, dans l'ordre de la chaîne
+STAGES = [
+    ("clean", []),
+    ("dataset_avec_genres_ml", ["genre"]),
+    ("dataset_with_lyrics", ["lyrics"]),
+    ("dataset_with_empowerment", ["empowerment", "empowerment_hits"]),
+    ("dataset_with_lastfm_tags", ["lastfm_tags"]),
+    ("dataset_mood_activity", ["mood", "activity", "era"]),
+]
+APP_COLUMNS = ["track_id", "track_name", "artist", "genre", "energy", "danceability", "tempo", "activity"]
+
+# Pic RSS (VmHWM) remis à zéro après les imports via /proc/self/clear_refs (Linux)
+MEASURE = """
+import json, sys, time
+sys.path.insert(0, {root!r})
+import pandas as pd
+from dataset_io import read_table
+
+def status(key):
+    for line in open("/proc/self/status"):
+        if line.startswith(key):
+            return int(line.split()[1]) / 1024
+
+open("/proc/self/clear_refs", "w").write("5")
+before = status("VmRSS")
+start = time.perf_counter()
+df = {loader}
+elapsed = time.perf_counter() - start
+print(json.dumps({{"seconds": elapsed, "peak_mb": status("VmHWM") - before, "rows": len(df)}}))
+"""
+
+
+def make_stage_tables(n: int, seed: int = 0) -> dict:
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        "track_id": [f"{i:022d}" for i in range(n)],
+        "artist": [f"artist {i % (n // 5 + 1)}" for i in range(n)],
+        "track_name": [f"title {i}" for i in range(n)],
+        "album": [f"album {i % (n // 3 + 1)}" for i in range(n)],
+        "popularity": rng.integers(0, 100, n),
+        "duration_ms": rng.integers(60000, 360000, n),
+        **{col: rng.random(n) for col in FEATURES},
+        "time_signature": rng.choice([3.0, 4.0], n),
+    })
+    extras = {
+        "genre": rng.choice(["Rap", "Variété-Pop", "Rock-Metal", "Latino", "Dance-Electro"], n),
+        "lyrics": make_lyrics(n, words=300)["lyrics"].to_numpy(),
+        "empowerment": rng.random(n) < 0.3,
+        "empowerment_hits": rng.integers(0, 4, n),
+        "lastfm_tags": rng.choice(["pop, happy, 2010s", "rock, 90s", "chill, study", ""], n),
+        "mood": rng.choice(["happy", "sad", "calm", ""], n),
+        "activity": rng.choice(["party", "workout", ""], n),
+        "era": rng.choice(["90s", "2010s", ""], n),
+    }
+    tables = {}
+    for name, added in STAGES:
+        for col in added:
+            df[col] = extras[col]
+        tables[name] = df.copy()
+    return tables
+
+
+def measure(loader: str, cwd: str) -> dict:
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    out = subprocess.run([sys.executable, "-c", MEASURE.format(root=root, loader=loader)],
+                         cwd=cwd, capture_output=True, text=True, check=True)
+    return json.loads(out.stdout)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=100000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tables = make_stage_tables(args.rows)
+        print(f"{'table':28} {'CSV s':>7} {'CSV Mo':>7} {'PQ s':>7} {'PQ Mo':>7} {'taille CSV/PQ':>14}")
+        for name, df in tables.items():
+            write_table(df, os.path.join(tmp, name), csv=True)
+            csv_file, pq_file = os.path.join(tmp, name + ".csv"), os.path.join(tmp, name + ".parquet")
+            csv = measure(f"pd.read_csv({name + '.csv'!r})", tmp)
+            pq = measure(f"read_table({name!r})", tmp)
+            ratio = os.path.getsize(csv_file) / os.path.getsize(pq_file)
+            print(f"{name:28} {csv['seconds']:7.2f} {csv['peak_mb']:7.0f} {pq['seconds']:7.2f} {pq['peak_mb']:7.0f} {ratio:13.1f}x")
+
+        csv = measure(f"pd.read_csv('dataset_mood_activity.csv', usecols={APP_COLUMNS!r})", tmp)
+        pq = measure(f"read_table('dataset_mood_activity', columns={APP_COLUMNS!r})", tmp)
+        print(f"{'app.py (8 colonnes)':28} {csv['seconds']:7.2f} {csv['peak_mb']:7.0f} {pq['seconds']:7.2f} {pq['peak_mb']:7.0f}")
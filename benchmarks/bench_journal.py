@@ -0,0 +1,86 @@
+"""
+Journal ligne à ligne (journal.py) avec albums.enrich_batch contre le serveur
+Spotify factice :
+- crash avant la sauvegarde du batch : requêtes refaites sans journal, avec journal
+- pannes 503 injectées : seules les lignes en échec sont retentées au run suivant
+- coût du journal : écriture (avec et sans fsync) et relecture au démarrage
+
+    python -m benchmarks.bench_journal --rows 500 --rate 200
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from albums import enrich_batch
+from benchmarks.bench_albums import make_rows
+from benchmarks.fake_spotify import start_fake_spotify
+from enrichment import TokenBucket
+from journal import Journal
+from spotify_api import make_spotify_client
+
+
+def run(sp, server, df, limiter, journal=None, use_track_ids=False):
+    server.request_count = 0
+    start = time.perf_counter()
+    batch = enrich_batch(df.copy(), sp, limiter, use_track_ids=use_track_ids, journal=journal)
+    return batch, time.perf_counter() - start, server.request_count
+
+
+def journal_cost(n: int, fsync: bool, folder: str) -> tuple:
+    path = os.path.join(folder, f"cost_{fsync}.jsonl")
+    start = time.perf_counter()
+    with Journal(path, fsync=fsync) as journal:
+        for i in range(n):
+            journal.record(f"track{i:08d}", f"https://i.scdn.co/image/{i:040x}")
+    write = time.perf_counter() - start
+    start = time.perf_counter()
+    journal = Journal(path)
+    replay = time.perf_counter() - start
+    journal.close()
+    return write, replay
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=500)
+    parser.add_argument("--latency", type=float, default=0.02)
+    parser.add_argument("--rate", type=float, default=200)
+    parser.add_argument("--fail-every", type=int, default=9, help="Un 503 toutes les N requêtes")
+    parser.add_argument("--entries", type=int, default=100000, help="Entrées pour le coût écriture/relecture")
+    args = parser.parse_args()
+
+    server, prefix = start_fake_spotify(latency=args.latency, rate=args.rate)
+    sp = make_spotify_client(8, prefix=prefix, auth="fake")
+    limiter = TokenBucket(args.rate * 0.9)
+    df = make_rows(args.rows)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Crash juste avant la sauvegarde : sans journal tout le batch est redemandé
+        _, t, n = run(sp, server, df, limiter)
+        print(f"{'sans journal':<28} {t:6.2f}s  {n:5} requêtes, reprise : {n} requêtes refaites")
+        path = os.path.join(tmp, "journal.jsonl")
+        with Journal(path) as journal:
+            _, t, n = run(sp, server, df, limiter, journal)
+        with Journal(path) as journal:
+            batch, t2, n2 = run(sp, server, df, limiter, journal)
+        filled = (batch["album_cover_url"].str.len() > 5).sum()
+        print(f"{'journal':<28} {t:6.2f}s  {n:5} requêtes, reprise : {n2} requêtes ({t2:.2f}s), "
+              f"{filled}/{len(df)} pochettes")
+
+        # Pannes : les échecs sont journalisés avec leur raison puis retentés, eux seuls
+        path = os.path.join(tmp, "journal_503.jsonl")
+        server.fail_every = args.fail_every
+        with Journal(path) as journal:
+            _, t, n = run(sp, server, df, limiter, journal)
+            print(f"{f'503 (1 sur {args.fail_every})':<28} {t:6.2f}s  {n:5} requêtes  → {journal.summary()}")
+        server.fail_every = None
+        with Journal(path) as journal:
+            _, t, n = run(sp, server, df, limiter, journal)
+            print(f"{'run suivant':<28} {t:6.2f}s  {n:5} requêtes  → {journal.summary()}")
+
+        for fsync in (True, False):
+            write, replay = journal_cost(args.entries, fsync, tmp)
+            print(f"{args.entries} entrées, fsync={fsync!s:<5} : écriture {write:.2f}s "
+                  f"({write / args.entries * 1e6:.0f} µs/ligne), relecture {replay:.2f}s")
+    server.shutdown()
@@ -0,0 +1,76 @@
+"""
+Étape Last.fm contre le serveur factice : boucle naïve (une requête titre par
+ligne, puis une requête artiste si pas de tags) vs lastfm_tags.enrich_batch
+(dédoublonnage, repli artiste partagé, concurrence), puis reprise après pannes.
+
+    python -m benchmarks.bench_lastfm --rows 1000 --rate 100
+"""
+import argparse
+import time
+
+import pandas as pd
+
+from benchmarks.bench_io import make_stage_tables
+from benchmarks.fake_lastfm import start_fake_lastfm
+from enrichment import TokenBucket
+from lastfm_tags import SOURCE_ERROR, LastfmClient, enrich_batch, keep_tags
+from response_cache import open_cache
+
+
+def naive(df, client) -> float:
+    start = time.perf_counter()
+    for _, row in df.iterrows():
+        tags = keep_tags(client.track_top_tags(row["artist"], row["track_name"]))
+        if not tags:
+            keep_tags(client.artist_top_tags(row["artist"]))
+    return time.perf_counter() - start
+
+
+def report(label, server, elapsed, batch=None):
+    calls = ", ".join(f"{m} {n}" for m, n in sorted(server.calls.items()))
+    extra = ""
+    if batch is not None:
+        counts = batch["lastfm_tag_source"].value_counts()
+        extra = "  " + " / ".join(f"{k} {v}" for k, v in counts.items())
+    print(f"{label:<26} {elapsed:6.2f}s  {server.request_count:5} requêtes ({calls}){extra}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--latency", type=float, default=0.02)
+    parser.add_argument("--rate", type=float, default=100)
+    parser.add_argument("--naive-rows", type=int, default=200, help="Lignes mesurées pour la boucle naïve")
+    args = parser.parse_args()
+
+    df = make_stage_tables(args.rows)["dataset_with_empowerment"][["track_id", "artist", "track_name"]]
+    # Doublons (artiste, titre) comme après fusion des sources Kaggle
+    df = pd.concat([df, df.sample(frac=0.3, random_state=0)], ignore_index=True)
+
+    server, root = start_fake_lastfm(latency=args.latency, rate=args.rate)
+    client = LastfmClient(api_key="fake", root=root)
+
+    t = naive(df.head(args.naive_rows), client)
+    report(f"naïf ({args.naive_rows} lignes)", server, t)
+    print(f"{'':26} → estimé {t * len(df) / args.naive_rows:6.1f}s pour {len(df)} lignes")
+
+    server.request_count = 0
+    server.calls.clear()
+    start = time.perf_counter()
+    batch = enrich_batch(df.copy(), client, open_cache("memory://"), TokenBucket(args.rate * 0.9))
+    report(f"étape ({len(df)} lignes)", server, time.perf_counter() - start, batch)
+
+    # Pannes injectées : seules les lignes en erreur sont retentées au passage suivant
+    server.fail_every, server.request_count = 7, 0
+    server.calls.clear()
+    cache = open_cache("memory://")
+    start = time.perf_counter()
+    batch = enrich_batch(df.copy(), client, cache, TokenBucket(args.rate * 0.9))
+    report("avec 503 (1 sur 7)", server, time.perf_counter() - start, batch)
+    server.fail_every, server.request_count = None, 0
+    server.calls.clear()
+    errors = (batch["lastfm_tag_source"] == SOURCE_ERROR).sum()
+    start = time.perf_counter()
+    batch = enrich_batch(batch, client, cache, TokenBucket(args.rate * 0.9))
+    report(f"reprise ({errors} en erreur)", server, time.perf_counter() - start, batch)
+    server.shutdown()
@@ -0,0 +1,85 @@
+"""
+Paroles contre le serveur Genius factice : ancienne boucle (lyricsgenius.search_song
+ligne par ligne + pause) vs lyrics_enrichment.process_batch (recherche puis pages
+en deux phases, session keep-alive, concurrence adaptative), et concurrence fixe
+vs adaptative face à un serveur qui sature au-delà de --capacity requêtes.
+
+    python -m benchmarks.bench_lyrics --rows 500 --rate 50 --capacity 8
+"""
+import argparse
+import time
+import warnings
+
+import pandas as pd
+from lyricsgenius import Genius
+
+from benchmarks.bench_io import make_stage_tables
+from benchmarks.fake_genius import start_fake_genius
+from enrichment import AdaptiveConcurrency
+from lyrics_enrichment import GeniusFetcher, process_batch
+
+
+def naive(df, root, pause) -> float:
+    genius = Genius("fake", verbose=False, timeout=15, retries=3)
+    genius.PUBLIC_API_ROOT, genius.WEB_ROOT, genius.API_ROOT = root + "api/", root, root + "v1/"
+    start = time.perf_counter()
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")  # Avertissements de dépréciation de lyricsgenius.Song
+        for title, artist in zip(df["track_name"], df["artist"]):
+            try:
+                genius.search_song(title, artist)
+            except Exception:
+                pass
+            time.sleep(pause)
+    return time.perf_counter() - start
+
+
+def report(label, server, elapsed, rows, batch=None, fetcher=None):
+    calls = ", ".join(f"{k} {v}" for k, v in sorted(server.calls.items()))
+    extra = ""
+    if batch is not None:
+        extra += f", {(batch['lyrics'].str.len() > 5).sum()}/{len(batch)} paroles"
+    if fetcher is not None:
+        extra += f", fenêtre finale {fetcher.adaptive.limit:.0f}"
+    print(f"{label:<30} {elapsed:7.2f}s  {rows / elapsed:6.1f} lignes/s  {server.request_count:5} requêtes "
+          f"({calls}), {server.overloaded} 503 de surcharge, pic {server.peak_in_flight} en vol{extra}")
+
+
+def reset(server):
+    server.request_count = server.overloaded = server.peak_in_flight = 0
+    server.calls.clear()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=500)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--rate", type=float, default=50, help="Limite serveur en requêtes/s (429 au-delà)")
+    parser.add_argument("--capacity", type=int, default=8, help="Requêtes simultanées avant 503")
+    parser.add_argument("--page-kb", type=int, default=300)
+    parser.add_argument("--pause", type=float, default=1.0, help="Pause de l'ancienne boucle (PAUSE_SECONDS)")
+    parser.add_argument("--naive-rows", type=int, default=20, help="Lignes mesurées pour l'ancienne boucle")
+    args = parser.parse_args()
+
+    df = make_stage_tables(args.rows)["dataset_avec_genres_ml"][["track_id", "artist", "track_name"]]
+    # Doublons (artiste, titre) comme après fusion des sources Kaggle
+    df = pd.concat([df, df.sample(frac=0.2, random_state=0)], ignore_index=True)
+    df["lyrics"] = ""
+
+    server, root = start_fake_genius(latency=args.latency, rate=args.rate, capacity=args.capacity,
+                                     page_kb=args.page_kb)
+
+    t = naive(df.head(args.naive_rows), root, args.pause)
+    report(f"search_song ({args.naive_rows} lignes)", server, t, args.naive_rows)
+    print(f"{'':30} → estimé {t * len(df) / args.naive_rows:7.1f}s pour {len(df)} lignes")
+
+    for label, window in (("fixe 16", AdaptiveConcurrency(16, minimum=16, maximum=16)),
+                          ("adaptative 4 → 16", None)):
+        reset(server)
+        fetcher = GeniusFetcher(root=root, rate=args.rate * 0.9)
+        if window is not None:
+            fetcher.adaptive = window
+        start = time.perf_counter()
+        batch = process_batch(df.copy(), fetcher)
+        report(f"deux phases, {label}", server, time.perf_counter() - start, len(df), batch, fetcher)
+    server.shutdown()
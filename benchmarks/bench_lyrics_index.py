@@ -0,0 +1,68 @@
+"""
+Pool de paroles : rescan de toutes les paroles (keyword_hits, comme
+empower_tag.py) vs index inversé (lyrics_index.py). Mesure aussi la
+construction de l'index et sa mise à jour incrémentale après un nouvel ajout
+de paroles.
+
+    python -m benchmarks.bench_lyrics_index --rows 50000 --added 2500
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.bench_empower import make_lyrics
+from empower_tag import KEYWORDS, keyword_hits
+from lyrics_index import LyricsIndex, update_index
+from lyrics_store import LyricsStore
+
+
+def timed(fn, *args, repeat: int = 1):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn(*args)
+    return (time.perf_counter() - start) / repeat, result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--added", type=int, default=2500, help="Paroles ajoutées avant la mise à jour incrémentale")
+    args = parser.parse_args()
+
+    lyrics = make_lyrics(args.rows + args.added, words=300)["lyrics"]
+    track_ids = np.array([f"{i:022d}" for i in range(len(lyrics))], dtype=object)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "lyrics_index.npz")
+        store = LyricsStore(os.path.join(tmp, "lyrics_store"))
+        store.put_many(lyrics[:args.rows], track_ids[:args.rows])
+
+        t_build, index = timed(update_index, store, path)
+        print(f"Construction ({args.rows} paroles)      : {t_build:.2f}s, {len(index)} termes, "
+              f"{os.path.getsize(path) / 1e6:.1f} Mo")
+
+        store.put_many(lyrics[args.rows:], track_ids[args.rows:])
+        t_update, index = timed(update_index, store, path)
+        full = LyricsIndex.empty()
+        t_full, _ = timed(full.update, store)
+        same = all(np.array_equal(getattr(index, a), getattr(full, a)) for a in ("vocab", "offsets", "refs", "counts"))
+        print(f"Mise à jour (+{args.added} paroles)        : {t_update:.2f}s (reconstruction complète {t_full:.2f}s, "
+              f"{'identique' if same else 'DIFFÉRENTE'})")
+        t_load, index = timed(LyricsIndex.load, path)
+        print(f"Chargement de l'index                : {t_load * 1e3:.0f}ms")
+
+        # Pool empowerment : mots-clés de empower_tag.py, même correspondance (mot + pluriel en -s)
+        texts = pd.Series(store.get_many(np.arange(len(store))), dtype=object)
+        refs = pd.Series(track_ids).map(store.ref_of)
+        t_scan, hits = timed(lambda: keyword_hits(texts.iloc[refs]))
+        t_query, pool = timed(index.query, (), KEYWORDS, repeat=20)
+        scanned = set(track_ids[(hits.to_numpy() > 0).any(axis=1)])
+        print(f"Pool empowerment, rescan des paroles : {t_scan:.2f}s (décompression exclue)")
+        print(f"Pool empowerment, index inversé      : {t_query * 1e3:.1f}ms "
+              f"({'identique' if scanned == set(pool) else 'DIFFÉRENT'}, {len(pool)} titres)")
+        t_weighted, _ = timed(index.query, (), (), (), dict.fromkeys(KEYWORDS[:10], 1), 2, repeat=20)
+        print(f"Requête pondérée (10 termes, score 2): {t_weighted * 1e3:.1f}ms")
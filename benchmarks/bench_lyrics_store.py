@@ -0,0 +1,78 @@
+"""
+Paroles dans la table (colonne lyrics) vs dans lyrics_store (colonne lyrics_ref) :
+taille de dataset_with_lyrics, lecture de la table, score empowerment en
+streaming, et latence d'un accès direct aux paroles d'un titre.
+
+    python -m benchmarks.bench_lyrics_store --rows 50000
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks.bench_io import make_stage_tables
+from dataset_io import iter_table, read_table, table_file, write_table
+from empower_tag import score_empowerment
+from lyrics_store import STORE_DIR, LyricsStore, lyrics_column
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - start, result
+
+
+def empower_stream(name: str, chunk: int) -> int:
+    return sum(int(score_empowerment(batch)["empowerment"].sum()) for batch in iter_table(name, chunk))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--chunk", type=int, default=10000)
+    parser.add_argument("--lookups", type=int, default=10000, help="Accès aléatoires mesurés")
+    args = parser.parse_args()
+
+    df = make_stage_tables(args.rows)["dataset_with_lyrics"]
+    # Un titre sur cinq partage ses paroles avec un autre track_id (rééditions, compilations)
+    dup = np.arange(0, args.rows, 5)
+    df.loc[dup, "lyrics"] = df["lyrics"].to_numpy()[dup // 2]
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        # score_empowerment lit le store du dossier courant, comme dans la chaîne
+        os.chdir(tmp)
+        inline, with_refs, store_dir = "inline", "refs", STORE_DIR
+        write_table(df, inline)
+        with LyricsStore(store_dir) as store:
+            t_put, _ = timed(lambda: write_table(store.externalize(df.copy()), with_refs))
+            s = store.stats()
+        store = LyricsStore(store_dir)
+
+        size_inline, size_refs = os.path.getsize(table_file(inline)), os.path.getsize(table_file(with_refs))
+        size_store = sum(os.path.getsize(os.path.join(store_dir, f)) for f in os.listdir(store_dir))
+        print(f"Table avec lyrics      : {size_inline / 1e6:7.1f} Mo")
+        print(f"Table avec lyrics_ref  : {size_refs / 1e6:7.1f} Mo + store {size_store / 1e6:.1f} Mo "
+              f"({s['blobs']} textes distincts / {args.rows}, zstd x{s['text_bytes'] / s['compressed_bytes']:.1f}, "
+              f"écrit en {t_put:.2f}s)")
+
+        t_inline, _ = timed(read_table, inline)
+        t_refs, _ = timed(read_table, with_refs)
+        print(f"read_table             : {t_inline:.3f}s avec lyrics, {t_refs:.3f}s avec lyrics_ref")
+
+        t_inline, hits_inline = timed(empower_stream, inline, args.chunk)
+        t_refs, hits_refs = timed(empower_stream, with_refs, args.chunk)
+        print(f"Empowerment (streaming): {t_inline:.2f}s avec lyrics, {t_refs:.2f}s via le store "
+              f"({'identique' if hits_inline == hits_refs else f'ÉCART {hits_inline} vs {hits_refs}'})")
+
+        refs = read_table(with_refs)
+        ids = refs["track_id"].sample(args.lookups, replace=True, random_state=0).tolist()
+        store.lyrics_of(ids[0])  # Chargement de tracks.tsv hors mesure
+        t_get, _ = timed(lambda: [store.lyrics_of(t) for t in ids])
+        t_col, col = timed(lyrics_column, refs.sample(args.lookups, random_state=0), store)
+        print(f"Accès par track_id     : {t_get / args.lookups * 1e6:.0f} µs/titre ; "
+              f"lyrics_column sur {args.lookups} lignes aléatoires : {t_col:.3f}s")
+        store.close()
+        os.chdir(cwd)
@@ -0,0 +1,62 @@
+"""
+Création de playlist contre le serveur Spotify factice : ancien appel unique
+(app.py) vs PlaylistWriter, avec 429 et 503 injectés. Avec --fail-after-write,
+le 503 d'une écriture est renvoyé après l'avoir appliquée : un ajout rejoué à
+l'aveugle dupliquerait des titres.
+
+    python -m benchmarks.bench_playlist_writer --tracks 250 --fail-every 7 --rate 20
+    python -m benchmarks.bench_playlist_writer --tracks 250 --fail-every 5 --fail-after-write
+"""
+import argparse
+import time
+
+from benchmarks.fake_spotify import _fake_id, start_fake_spotify
+from playlist_writer import PlaylistWriter
+from spotify_api import make_user_client
+
+
+def legacy_create(sp, name: str, track_uris: list):
+    user = sp.current_user()
+    playlist = sp.user_playlist_create(user['id'], name, public=True)
+    sp.playlist_add_items(playlist['id'], track_uris)
+    return playlist
+
+
+def run(label: str, create, server, track_uris: list):
+    before = (server.request_count, server.connections, server.throttled, server.failed)
+    start = time.perf_counter()
+    try:
+        playlist = create()
+        tracks = server.playlists[playlist["id"]]["tracks"]
+        result = f"{len(tracks)} titres" + ("" if tracks == track_uris else
+                                            " (DOUBLONS)" if len(tracks) > len(track_uris) else
+                                            " (INCOMPLET)" if len(tracks) < len(track_uris) else " (ORDRE FAUX)")
+    except Exception as e:
+        result = f"échec : {str(e).splitlines()[0][:70]}"
+    t = time.perf_counter() - start
+    requests, connections, throttled, failed = (now - b for now, b in zip(
+        (server.request_count, server.connections, server.throttled, server.failed), before))
+    print(f"{label:<28} {t:6.2f}s {requests:4} req {connections:3} conn {throttled:3} x 429 {failed:3} x 503  {result}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tracks", type=int, default=250)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--rate", type=float, default=None, help="Requêtes/s avant 429")
+    parser.add_argument("--fail-every", type=int, default=None, help="Un 503 toutes les N requêtes")
+    parser.add_argument("--fail-after-write", action="store_true", help="503 renvoyé après application des POST")
+    args = parser.parse_args()
+
+    server, prefix = start_fake_spotify(latency=args.latency, rate=args.rate, retry_after=1,
+                                        fail_every=args.fail_every, fail_after_write=args.fail_after_write)
+    track_ids = [_fake_id(f"track{i}") for i in range(args.tracks)]
+    uris = [f"spotify:track:{t}" for t in track_ids]
+
+    sp = make_user_client("playlist-modify-public", prefix=prefix, auth="fake")
+    run("appel unique (ancien)", lambda: legacy_create(sp, "ancien", uris), server, uris)
+
+    writer = PlaylistWriter(make_user_client("playlist-modify-public", prefix=prefix, auth="fake"), backoff=0.05)
+    run("PlaylistWriter", lambda: writer.create("writer", track_ids), server, uris)
+    run("PlaylistWriter (2e playlist)", lambda: writer.create("writer 2", track_ids), server, uris)
+    server.shutdown()
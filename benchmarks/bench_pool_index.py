@@ -0,0 +1,54 @@
+"""
+Requêtes de pools : filtres pandas (parcours complet) vs PoolIndex, avec
+vérification que les deux renvoient les mêmes track_id.
+
+    python -m benchmarks.bench_pool_index --rows 200000
+"""
+import argparse
+import time
+
+import numpy as np
+
+from benchmarks.bench_io import make_stage_tables
+from pool_index import PoolIndex, above, below, between
+
+QUERIES = {
+    "cardio": ({"energy": above(0.8), "danceability": above(0.7), "tempo": above(120)},
+               lambda df: (df.energy > 0.8) & (df.danceability > 0.7) & (df.tempo > 120)),
+    "dynamic + rap": ({"energy": between(0.5, 0.8), "danceability": above(0.6), "genre": "rap"},
+                      lambda df: (df.energy > 0.5) & (df.energy <= 0.8) & (df.danceability > 0.6)
+                      & (df.genre.str.lower() == "rap")),
+    "chill": ({"energy": below(0.4)}, lambda df: df.energy < 0.4),
+    "dansant": ({"danceability": above(0.8), "any": [{"activity": "party"}, {"valence": above(0.5)}]},
+                lambda df: (df.danceability > 0.8) & ((df.activity == "party") | (df.valence > 0.5))),
+    "empowerment + happy": ({"empowerment": True, "mood": ["happy", "calm"]},
+                            lambda df: df.empowerment & df.mood.isin(["happy", "calm"])),
+}
+
+
+def timed(fn, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=200000)
+    args = parser.parse_args()
+
+    df = make_stage_tables(args.rows)["dataset_mood_activity"].drop(columns=["lyrics"])
+    df["tempo"] = 60 + df["tempo"] * 140
+    start = time.perf_counter()
+    index = PoolIndex(df)
+    print(f"Construction de l'index : {time.perf_counter() - start:.2f}s")
+
+    print(f"{'requête':22} {'pandas ms':>10} {'index ms':>10} {'bitmap ms':>10} {'titres':>8}")
+    for name, (conditions, predicate) in QUERIES.items():
+        expected = df.track_id[predicate(df)].to_numpy()
+        assert np.array_equal(index.query(conditions), expected), name
+        t_pandas = timed(lambda: df.track_id[predicate(df)].to_numpy(), 20)
+        t_index = timed(lambda: index.query(conditions), 200)
+        t_bitmap = timed(lambda: index.count(conditions), 200)  # sans matérialiser les track_id
+        print(f"{name:22} {t_pandas * 1e3:10.2f} {t_index * 1e3:10.3f} {t_bitmap * 1e3:10.3f} {len(expected):8}")
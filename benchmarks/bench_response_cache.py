@@ -0,0 +1,79 @@
+"""
+Cache de réponses partagé : requêtes envoyées au serveur Spotify factice par
+albums.enrich_batch sans cache, au premier run (cache froid), au second run
+(cache chaud), puis par deux workers simultanés sur le même cache.
+
+Les lignes répètent des couples (artiste, titre) : doublons dans un run et
+entre workers, comme un dataset Kaggle fusionné.
+
+    python -m benchmarks.bench_response_cache --rows 400 --url sqlite:///tmp/bench_cache.sqlite
+    python -m benchmarks.bench_response_cache --url redis://localhost:6379/15
+"""
+import argparse
+import os
+import threading
+import time
+
+import pandas as pd
+
+from albums import enrich_batch
+from benchmarks.bench_albums import make_rows
+from benchmarks.fake_spotify import start_fake_spotify
+from enrichment import TokenBucket
+from response_cache import format_stats, open_cache
+from spotify_api import make_spotify_client
+
+
+def make_duplicated_rows(n: int, distinct: int) -> pd.DataFrame:
+    df = make_rows(distinct).sample(n, replace=True, random_state=0).reset_index(drop=True)
+    # La moitié sans track_id : résolue par recherche texte (artiste + titre)
+    df.loc[df.index % 2 == 0, "track_id"] = ""
+    return df
+
+
+def run(label, server, workers):
+    server.request_count = 0
+    start = time.perf_counter()
+    threads = [threading.Thread(target=w) for w in workers]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    print(f"{label:<26} {time.perf_counter() - start:6.2f}s {server.request_count:5} requêtes")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=400)
+    parser.add_argument("--distinct", type=int, default=150, help="Couples (artiste, titre) distincts")
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--url", default="sqlite:///bench_response_cache.sqlite")
+    args = parser.parse_args()
+
+    server, prefix = start_fake_spotify(latency=args.latency)
+    sp = make_spotify_client(8, prefix=prefix, auth="fake")
+    df = make_duplicated_rows(args.rows, args.distinct)
+
+    def worker(cache=None):
+        return lambda: enrich_batch(df.copy(), sp, TokenBucket(200), cache=cache)
+
+    run("sans cache", server, [worker()])
+
+    cache = open_cache(args.url)
+    cache.clear()
+    run("cache froid", server, [worker(cache)])
+    run("cache chaud", server, [worker(cache)])
+    print(format_stats(cache))
+
+    # Deux workers (deux ResponseCache, même backend) démarrés ensemble sur un cache vide
+    cache.clear()
+    workers = [open_cache(args.url), open_cache(args.url)]
+    run("2 workers, cache partagé", server, [worker(c) for c in workers])
+    for n, c in enumerate(workers):
+        print(f"  worker {n} : {format_stats(c)}")
+
+    server.shutdown()
+    if args.url.startswith("sqlite:///") and args.url.endswith("bench_response_cache.sqlite"):
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(args.url[len("sqlite:///"):] + suffix):
+                os.remove(args.url[len("sqlite:///"):] + suffix)
@@ -0,0 +1,41 @@
+"""
+Fallback sentiment de tags.py : pipeline ligne à ligne (ancien code) vs lots triés par longueur.
+
+    python -m benchmarks.bench_sentiment --rows 200 --batch-size 32 --backend int8
+"""
+import argparse
+import time
+
+from transformers import pipeline
+
+from benchmarks.bench_empower import make_lyrics
+from sentiment import MODEL_NAME, SentimentMoodModel
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=200)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--threads", type=int, default=None)
+    parser.add_argument("--backend", default="torch")
+    args = parser.parse_args()
+
+    # Longueurs variées, comme des paroles réelles
+    texts = [t[: 200 + (i * 997) % 3000] for i, t in enumerate(make_lyrics(args.rows, words=600)["lyrics"])]
+
+    legacy = pipeline("sentiment-analysis", model=MODEL_NAME)
+    start = time.perf_counter()
+    for text in texts:
+        legacy(text[:512])
+    t_legacy = time.perf_counter() - start
+
+    model = SentimentMoodModel(batch_size=args.batch_size, num_threads=args.threads, backend=args.backend)
+    start = time.perf_counter()
+    moods = model.predict_moods(texts)
+    t_batched = time.perf_counter() - start
+
+    reference = SentimentMoodModel(batch_size=1).predict_moods(texts) if args.backend != "torch" else moods
+    parity = sum(a == b for a, b in zip(moods, reference)) / len(texts)
+    print(f"Ligne à ligne (512 caractères) : {t_legacy:.2f}s")
+    print(f"Lots de {args.batch_size} ({args.backend}, 512 tokens) : {t_batched:.2f}s")
+    print(f"Accord des moods avec le modèle fp32 : {parity:.1%}")
@@ -0,0 +1,58 @@
+"""
+Séquenceur vs tirage aléatoire par phase (ancienne app) : temps, doublons,
+artistes répétés, sauts de tempo et écart à la courbe cible.
+
+    python -m benchmarks.bench_sequencer --rows 200000 --genre Rap
+"""
+import argparse
+import time
+
+import numpy as np
+
+from benchmarks.bench_io import make_stage_tables
+from catalog import Catalog
+from sequencer import PROGRAMMES, sequence, targets
+
+
+def legacy_playlist(catalog, genre: str, programme: str, rng) -> list:
+    track_ids = []
+    for _, pool, duration in PROGRAMMES[programme]:
+        ids = catalog.pool(genre, pool)
+        if len(ids):
+            track_ids.extend(rng.choice(ids, min(len(ids), int(duration / 3.5)), replace=False).tolist())
+    return track_ids
+
+
+def report(catalog, programme: str, track_ids: list) -> str:
+    position = {t: i for i, t in enumerate(catalog.index.track_ids)}
+    rows = np.array([position[t] for t in track_ids])
+    slots = np.concatenate([s for _, _, s in targets(programme)])[:len(rows)]
+    tempo = catalog.tempo[rows]
+    return (f"{len(rows):3} titres, {len(rows) - len(set(track_ids)):2} doublons, "
+            f"{len(rows) - len(set(catalog.artist_codes[rows])):2} artistes répétés, "
+            f"saut de tempo max {np.abs(np.diff(tempo)).max():5.1f} BPM, "
+            f"écart énergie moyen {np.abs(catalog.energy[rows] - slots[:, 0]).mean():.3f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=200000)
+    parser.add_argument("--genre", default="Rap")
+    args = parser.parse_args()
+
+    df = make_stage_tables(args.rows)["dataset_mood_activity"].drop(columns=["lyrics"])
+    rng = np.random.default_rng(0)
+    df["tempo"] = rng.normal(118, 22, len(df)).clip(60, 200)
+    df["energy"] = rng.beta(3, 2, len(df))
+    df["danceability"] = rng.beta(4, 2, len(df))
+    catalog = Catalog(df)
+
+    for programme in PROGRAMMES:
+        start = time.perf_counter()
+        for seed in range(10):
+            playlist = sequence(catalog, args.genre, programme, seed=seed)
+        t = (time.perf_counter() - start) / 10
+        assert playlist == sequence(catalog, args.genre, programme, seed=9)
+        print(f"\n{programme} ({sum(d for _, _, d in PROGRAMMES[programme])} min)")
+        print(f"  aléatoire   : {report(catalog, programme, legacy_playlist(catalog, args.genre, programme, rng))}")
+        print(f"  séquenceur  : {report(catalog, programme, playlist)}  [{t * 1e3:.1f} ms]")
@@ -0,0 +1,60 @@
+"""
+Index de similarité : rappel@k et latence de la recherche IVF par rapport à
+la recherche exacte, avec et sans filtre (genre).
+
+Features synthétiques en grappes (comme des genres / styles), dans [0, 1].
+
+    python -m benchmarks.bench_similarity --rows 100000 --queries 200
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from similarity import FEATURES, SimilarityIndex
+
+
+def make_features(n: int, n_styles: int = 40, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    centers = rng.random((n_styles, len(FEATURES)))
+    style = rng.integers(0, n_styles, n)
+    X = np.clip(centers[style] + rng.normal(0, 0.12, (n, len(FEATURES))), 0, 1)
+    df = pd.DataFrame(X, columns=FEATURES)
+    df.insert(0, "track_id", [f"{i:022d}" for i in range(n)])
+    df["genre"] = rng.choice(["rap", "pop", "rock", "latino", "electro"], n)
+    return df
+
+
+def recall(approx: list, exact: list) -> float:
+    return np.mean([len(np.intersect1d(a, e)) / max(len(e), 1) for a, e in zip(approx, exact)])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("-k", type=int, default=10)
+    args = parser.parse_args()
+
+    df = make_features(args.rows)
+    start = time.perf_counter()
+    index = SimilarityIndex.build(df)
+    print(f"Construction : {time.perf_counter() - start:.2f}s ({len(index.centroids)} listes)")
+    print(f"Matrice cosinus du notebook : {args.rows ** 2 * 8 / 1e9:.0f} Go")
+
+    rows = np.random.default_rng(1).choice(args.rows, args.queries, replace=False)
+    queries, exclude = index.vectors[rows], list(rows)
+    genre_mask = (df["genre"] == "rap").to_numpy()
+
+    for label, mask in (("sans filtre", None), ("genre = rap", genre_mask)):
+        start = time.perf_counter()
+        exact, _ = index.exact_search(queries, args.k, mask, exclude)
+        t_exact = (time.perf_counter() - start) / args.queries
+        print(f"\n{label} : exact {t_exact * 1e3:.2f} ms/requête")
+        print(f"{'n_probe':>8} {'ms/requête':>11} {'rappel@' + str(args.k):>10}")
+        for n_probe in (1, 2, 4, 8, 16, 32):
+            start = time.perf_counter()
+            approx, _ = index.search(queries, args.k, n_probe, mask, exclude)
+            t = (time.perf_counter() - start) / args.queries
+            print(f"{n_probe:8} {t * 1e3:11.3f} {recall(approx, exact):10.1%}")
@@ -0,0 +1,161 @@
+"""
+Serveur Genius factice : recherche publique (GET /api/search/multi, même JSON
+que genius.com) et pages de paroles HTML, avec la limite de débit, la latence
+et les pannes de benchmarks/fake_spotify.py.
+
+Les pages sont servies sous /songs/<id>-lyrics (chemin "path" des
+résultats) et l'API officielle sous /v1/ (GET /v1/songs/<id>), pour rejouer
+aussi lyricsgenius.search_song. Une recherche sur dix n'a aucun résultat, une sur quinze commence par un
+résultat instrumental (à écarter). Au-delà de --capacity requêtes
+simultanées, le serveur répond 503 (surcharge) : c'est ce que la
+concurrence adaptative doit éviter. Les pages pèsent --page-kb Ko, dont
+l'essentiel hors paroles, comme les vraies.
+
+    python -m benchmarks.fake_genius --port 8767 --rate 20 --capacity 8
+puis : GeniusFetcher(root="http://127.0.0.1:8767/")
+"""
+import argparse
+import hashlib
+import threading
+from collections import Counter
+from urllib.parse import parse_qs, urlparse
+
+from benchmarks.fake_spotify import FakeSpotifyHandler, start_server
+
+WORDS = ["love", "night", "baby", "fire", "dance", "heart", "city", "dream", "money", "rain", "gold", "tonight"]
+
+
+def _digest(text: str) -> bytes:
+    return hashlib.md5(text.lower().encode("utf-8")).digest()
+
+
+def fake_lyrics(song_id: int) -> list:
+    """Couplets déterministes, avec les en-têtes de section de Genius."""
+    d = _digest(str(song_id))
+    lines = []
+    for section in ("[Verse 1]", "[Chorus]", "[Verse 2]", "[Chorus]"):
+        lines.append(section)
+        lines += [" ".join(WORDS[(b + i) % len(WORDS)] for i in range(6)) for b in d[:4]]
+    return lines
+
+
+def song_page(song_id: int, page_kb: int) -> str:
+    lines = fake_lyrics(song_id)
+    half = len(lines) // 2
+    container = '<div data-lyrics-container="true" class="Lyrics__Container-sc-1ynbvzw-1 kUgSbL">{}</div>'
+    filler = '<div class="SongPage__Filler"><a href="/artists/x">lien</a> <span>texte</span></div>\n'
+    padding = filler * max(0, page_kb * 1024 // len(filler))
+    return ("<!DOCTYPE html><html><head><title>Paroles</title>"
+            f"<script>window.__PRELOADED_STATE__ = {{}};</script></head><body>{padding[:len(padding) // 2]}"
+            + container.format("<br/>".join(lines[:half]))
+            + '<div class="RightSidebar__Container"><span>pub</span></div>'
+            + container.format("<br/>".join(lines[half:]))
+            + f"{padding[len(padding) // 2:]}</body></html>")
+
+
+def fake_song(song_id: int, title: str, instrumental: bool = False, full: bool = False) -> dict:
+    """Résultat de recherche ; full=True : fiche complète de GET /v1/songs/<id> (lue par lyricsgenius.Song)."""
+    artist = {"id": song_id % 1000, "name": "artist", "api_path": "/artists/1", "url": "https://genius.com/artists/1",
+              "header_image_url": "", "image_url": "", "is_meme_verified": False, "is_verified": False}
+    song = {"id": song_id, "title": title, "instrumental": instrumental, "lyrics_state": "complete",
+            "path": f"/songs/{song_id}-lyrics", "url": f"https://genius.com/songs/{song_id}-lyrics",
+            "primary_artist": artist}
+    if full:
+        song.update({"stats": {}, "annotation_count": 0, "api_path": f"/songs/{song_id}", "full_title": title,
+                     "header_image_thumbnail_url": "", "header_image_url": "", "lyrics_owner_id": 1,
+                     "pyongs_count": 0, "song_art_image_thumbnail_url": "", "song_art_image_url": "",
+                     "title_with_featured": title})
+    return song
+
+
+def search_hit(song_id: int, title: str, instrumental: bool = False) -> dict:
+    return {"index": "song", "type": "song", "result": fake_song(song_id, title, instrumental)}
+
+
+class FakeGeniusHandler(FakeSpotifyHandler):
+
+    def _send_html(self, status, html):
+        body = html.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.in_flight += 1
+            server.peak_in_flight = max(server.peak_in_flight, server.in_flight)
+            overloaded = server.capacity and server.in_flight > server.capacity
+            if overloaded:
+                server.overloaded += 1
+        try:
+            if overloaded:
+                self._send(503, {"meta": {"status": 503, "message": "Service overloaded"}})
+            elif self._throttle():
+                self._route()
+        finally:
+            with server.lock:
+                server.in_flight -= 1
+
+    def _route(self):
+        url = urlparse(self.path)
+        if url.path == "/api/search/multi":
+            with self.server.lock:
+                self.server.calls["search"] += 1
+            q = parse_qs(url.query).get("q", [""])[0]
+            d = _digest(q)
+            song_id = int.from_bytes(d[:4], "big")
+            hits = []
+            if d[4] % 10:
+                hits = [search_hit(song_id, q)]
+                if d[5] % 15 == 0:
+                    hits.insert(0, search_hit(song_id + 1, f"{q} (Instrumental)", instrumental=True))
+            self._send(200, {"meta": {"status": 200}, "response": {"sections": [
+                {"type": "top_hit", "hits": hits[:1]}, {"type": "song", "hits": hits}]}})
+        elif url.path.startswith("/songs/") and url.path.endswith("-lyrics"):
+            with self.server.lock:
+                self.server.calls["page"] += 1
+            song_id = int(url.path[len("/songs/"):-len("-lyrics")])
+            self._send_html(200, song_page(song_id, self.server.page_kb))
+        elif url.path.startswith("/v1/songs/"):
+            # API officielle (Genius.song, infos complètes demandées par search_song)
+            with self.server.lock:
+                self.server.calls["song"] += 1
+            song_id = int(url.path[len("/v1/songs/"):])
+            self._send(200, {"meta": {"status": 200}, "response": {"song": fake_song(song_id, f"song {song_id}", full=True)}})
+        else:
+            self._send(404, {"meta": {"status": 404, "message": "Not found"}})
+
+
+def start_fake_genius(port: int = 0, latency: float = 0.05, rate: float = None, retry_after: int = 1,
+                      fail_every: int = None, capacity: int = None, page_kb: int = 100):
+    """
+    Returns:
+    tuple: (serveur, racine à passer à GeniusFetcher)
+    """
+    server = start_server(FakeGeniusHandler, port, latency, rate, retry_after, fail_every)
+    server.calls = Counter()
+    server.capacity = capacity
+    server.page_kb = page_kb
+    server.in_flight = server.peak_in_flight = server.overloaded = 0
+    return server, f"http://127.0.0.1:{server.server_address[1]}/"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serveur Genius factice")
+    parser.add_argument("--port", type=int, default=8767)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--rate", type=float, default=None, help="Requêtes/s avant 429")
+    parser.add_argument("--capacity", type=int, default=None, help="Requêtes simultanées avant 503")
+    parser.add_argument("--page-kb", type=int, default=100, help="Taille des pages de paroles")
+    parser.add_argument("--fail-every", type=int, default=None, help="Un 503 toutes les N requêtes")
+    args = parser.parse_args()
+    server, root = start_fake_genius(args.port, args.latency, args.rate, fail_every=args.fail_every,
+                                     capacity=args.capacity, page_kb=args.page_kb)
+    print(f"Genius factice prêt → {root}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,81 @@
+"""
+Serveur Last.fm factice (track.getTopTags, artist.getTopTags), même limite de
+débit, latence et pannes injectées que benchmarks/fake_spotify.py.
+
+Un titre sur trois n'a pas de tags (repli artiste), un sur vingt est inconnu
+(erreur 6). Les appels sont comptés par méthode dans server.calls.
+
+    python -m benchmarks.fake_lastfm --port 8766 --rate 5
+puis : LastfmClient(api_key="fake", root="http://127.0.0.1:8766/2.0/")
+"""
+import argparse
+import hashlib
+import threading
+from collections import Counter
+from urllib.parse import parse_qs, urlparse
+
+from benchmarks.fake_spotify import FakeSpotifyHandler, start_server
+
+TAGS = ["pop", "rock", "happy", "sad", "chill", "party", "workout", "study", "90s", "2010s", "rap", "female vocalists"]
+
+
+def _digest(text: str) -> bytes:
+    return hashlib.md5(text.lower().encode("utf-8")).digest()
+
+
+def fake_tags(text: str, n_max: int = 6) -> list:
+    """Tags déterministes, poids décroissants (format toptags de Last.fm)."""
+    d = _digest(text)
+    n = d[0] % n_max
+    names = list(dict.fromkeys(TAGS[b % len(TAGS)] for b in d[1:1 + n]))
+    return [{"name": name, "count": 100 - 15 * i} for i, name in enumerate(names)]
+
+
+class FakeLastfmHandler(FakeSpotifyHandler):
+
+    def do_GET(self):
+        if not self._throttle():
+            return
+        params = {k: v[0] for k, v in parse_qs(urlparse(self.path).query).items()}
+        method = params.get("method", "")
+        with self.server.lock:
+            self.server.calls[method] += 1
+
+        if method == "track.gettoptags":
+            key = f"{params.get('artist', '')}|{params.get('track', '')}"
+            if _digest(key)[15] % 20 == 0:
+                self._send(200, {"error": 6, "message": "Track not found"})
+            else:
+                tags = fake_tags(key) if _digest(key)[14] % 3 else []
+                self._send(200, {"toptags": {"tag": tags, "@attr": {"artist": params.get("artist")}}})
+        elif method == "artist.gettoptags":
+            self._send(200, {"toptags": {"tag": fake_tags(params.get("artist", ""), 8) or fake_tags("pop"),
+                                         "@attr": {"artist": params.get("artist")}}})
+        else:
+            self._send(200, {"error": 3, "message": "Invalid Method"})
+
+
+def start_fake_lastfm(port: int = 0, latency: float = 0.05, rate: float = None, retry_after: int = 1,
+                      fail_every: int = None):
+    """
+    Returns:
+    tuple: (serveur, URL d'API à passer à LastfmClient)
+    """
+    server = start_server(FakeLastfmHandler, port, latency, rate, retry_after, fail_every)
+    server.calls = Counter()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/2.0/"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serveur Last.fm factice")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--rate", type=float, default=None, help="Requêtes/s avant 429")
+    parser.add_argument("--fail-every", type=int, default=None, help="Un 503 toutes les N requêtes")
+    args = parser.parse_args()
+    server, root = start_fake_lastfm(args.port, args.latency, args.rate, fail_every=args.fail_every)
+    print(f"Last.fm factice prêt → {root}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,215 @@
+"""
+Serveur Spotify Web API factice, pour mesurer le débit d'enrichissement hors-ligne.
+
+Usage :
+    python -m benchmarks.fake_spotify --port 8765 --latency 0.05 --rate 50
+puis pointer le client dessus : make_spotify_client(prefix="http://127.0.0.1:8765/v1/", auth="fake")
+
+Écriture de playlists : GET /v1/me, POST /v1/users/{id}/playlists et
+POST /v1/playlists/{id}/tracks (400 au-delà de 100 titres), contenu gardé
+dans server.playlists. --fail-every N renvoie un 503 toutes les N requêtes.
+"""
+import argparse
+import hashlib
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+def _fake_id(text: str) -> str:
+    return hashlib.md5(text.encode("utf-8")).hexdigest()[:22]
+
+
+def fake_track(track_id: str) -> dict:
+    return {
+        "id": track_id,
+        "name": f"track {track_id}",
+        "artists": [{"id": _fake_id("artist" + track_id[:4]), "name": f"artist {track_id[:4]}"}],
+        "album": {"id": _fake_id("album" + track_id), "images": [{"url": f"https://i.scdn.co/image/{track_id}"}]},
+    }
+
+
+def fake_artist(artist_id: str) -> dict:
+    genres = ["pop", "dance pop", "rap", "rock", "latin", "edm", "soul", "jazz"]
+    n = int(artist_id[:2], 16) % 3
+    return {"id": artist_id, "name": f"artist {artist_id}", "genres": genres[int(artist_id[2:4], 16) % 6:][:n]}
+
+
+class FakeSpotifyHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def _body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"null") if length else None
+
+    def _send(self, status, payload, headers=None):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _throttle(self, write: bool = False):
+        """
+        Simule la latence réseau et la limite de débit côté serveur (429 + Retry-After).
+        Avec server.fail_after_write, le 503 d'une écriture (write=True) est renvoyé
+        par _reply après l'avoir appliquée, comme une passerelle qui perd la réponse.
+        """
+        server = self.server
+        with server.lock:
+            server.request_count += 1
+            if server.rate:
+                now = time.monotonic()
+                server.tokens = min(server.rate, server.tokens + (now - server.last) * server.rate)
+                server.last = now
+                throttled = server.tokens < 1
+                if throttled:
+                    server.throttled += 1
+                else:
+                    server.tokens -= 1
+            else:
+                throttled = False
+            failed = not throttled and server.fail_every and server.request_count % server.fail_every == 0
+            if failed:
+                server.failed += 1
+        self.lost_response = failed and write and server.fail_after_write
+        if failed and not self.lost_response:
+            self._send(503, {"error": {"status": 503, "message": "Service unavailable"}})
+            return False
+        if throttled:
+            self._send(429, {"error": {"status": 429, "message": "API rate limit exceeded"}},
+                       {"Retry-After": str(server.retry_after)})
+            return False
+        time.sleep(server.latency)
+        return True
+
+    def _reply(self, status, payload):
+        """Réponse d'une écriture appliquée, ou 503 si le serveur « perd » la réponse."""
+        if self.lost_response:
+            self._send(503, {"error": {"status": 503, "message": "Service unavailable"}})
+        else:
+            self._send(status, payload)
+
+    def do_GET(self):
+        if not self._throttle():
+            return
+        url = urlparse(self.path)
+        params = {k: v[0] for k, v in parse_qs(url.query).items()}
+        path = url.path.rstrip("/")
+
+        if path == "/v1/search":
+            q = params.get("q", "")
+            if params.get("type") == "artist":
+                self._send(200, {"artists": {"items": [fake_artist(_fake_id(q))]}})
+            else:
+                self._send(200, {"tracks": {"items": [fake_track(_fake_id(q))]}})
+        elif path == "/v1/tracks":
+            ids = [i for i in params.get("ids", "").split(",") if i]
+            self._send(200, {"tracks": [fake_track(i) for i in ids]})
+        elif path == "/v1/artists":
+            ids = [i for i in params.get("ids", "").split(",") if i]
+            self._send(200, {"artists": [fake_artist(i) for i in ids]})
+        elif path == "/v1/me":
+            self._send(200, {"id": "fake_user", "display_name": "Fake User"})
+        elif path.startswith("/v1/playlists/") and path.count("/") == 3:
+            playlist = self.server.playlists.get(path.rsplit("/", 1)[1])
+            if playlist is None:
+                self._send(404, {"error": {"status": 404, "message": "Playlist not found"}})
+            else:
+                self._send(200, {"name": playlist["name"], "tracks": {"total": len(playlist["tracks"])}})
+        else:
+            self._send(404, {"error": {"status": 404, "message": "Not found"}})
+
+    def do_POST(self):
+        body = self._body()
+        if self.path.startswith("/api/token"):
+            self._send(200, {"access_token": "fake", "token_type": "Bearer", "expires_in": 3600})
+            return
+        if not self._throttle(write=True):
+            return
+        url = urlparse(self.path)
+        params = {k: v[0] for k, v in parse_qs(url.query).items()}
+        parts = url.path.strip("/").split("/")
+
+        if parts[1:2] == ["users"] and parts[3:] == ["playlists"]:
+            with self.server.lock:
+                playlist_id = _fake_id(f"playlist{len(self.server.playlists)}")
+                self.server.playlists[playlist_id] = {"name": body["name"], "owner": parts[2], "tracks": []}
+            self._reply(201, {"id": playlist_id, "name": body["name"],
+                              "external_urls": {"spotify": f"https://open.spotify.com/playlist/{playlist_id}"}})
+        elif parts[1:2] == ["playlists"] and parts[3:] == ["tracks"]:
+            playlist = self.server.playlists.get(parts[2])
+            uris = body.get("uris", []) if isinstance(body, dict) else body or []
+            if playlist is None:
+                self._send(404, {"error": {"status": 404, "message": "Playlist not found"}})
+            elif len(uris) > 100:
+                self._send(400, {"error": {"status": 400, "message": "You can add a maximum of 100 tracks per request."}})
+            else:
+                with self.server.lock:
+                    position = int(params.get("position", len(playlist["tracks"])))
+                    playlist["tracks"][position:position] = uris
+                self._reply(201, {"snapshot_id": _fake_id(f"{parts[2]}{len(playlist['tracks'])}")})
+        else:
+            self._send(404, {"error": {"status": 404, "message": "Not found"}})
+
+
+def start_server(handler, port: int = 0, latency: float = 0.05, rate: float = None, retry_after: int = 1,
+                 fail_every: int = None, fail_after_write: bool = False) -> ThreadingHTTPServer:
+    """Démarre un serveur factice (handler dérivé de FakeSpotifyHandler) dans un thread de fond."""
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    server.latency = latency
+    server.rate = rate
+    server.retry_after = retry_after
+    server.tokens = rate or 0
+    server.last = time.monotonic()
+    server.lock = threading.Lock()
+    server.request_count = 0
+    server.throttled = 0
+    server.fail_every = fail_every
+    server.failed = 0
+    server.fail_after_write = fail_after_write
+    server.connections = 0
+    server.playlists = {}
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def start_fake_spotify(port: int = 0, latency: float = 0.05, rate: float = None, retry_after: int = 1,
+                       fail_every: int = None, fail_after_write: bool = False):
+    """
+    Démarre le serveur dans un thread de fond.
+
+    Returns:
+    tuple: (serveur, préfixe d'API à passer à make_spotify_client)
+    """
+    server = start_server(FakeSpotifyHandler, port, latency, rate, retry_after, fail_every, fail_after_write)
+    return server, f"http://127.0.0.1:{server.server_address[1]}/v1/"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serveur Spotify factice")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--rate", type=float, default=None, help="Requêtes/s avant 429")
+    parser.add_argument("--fail-every", type=int, default=None, help="Un 503 toutes les N requêtes")
+    args = parser.parse_args()
+    server, prefix = start_fake_spotify(args.port, args.latency, args.rate, fail_every=args.fail_every)
+    print(f"Spotify factice prêt → {prefix}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,334 @@
+"""
+Suite de benchmarks de la chaîne complète, sur le jeu synthétique de
+benchmarks/synthetic.py (10k, 100k ou 1M titres) : temps et pic mémoire de
+chaque étape, appelée par ses fonctions (aucune clé d'API, aucun fichier réel),
+dans un dossier de travail temporaire.
+
+    clean            clean.create_clean_dataset sur les trois exports
+    genre_rules      cache SQLite + smart_genre_mapper.map_genres
+    genre_model      classifieur des lignes "Autre" (entraînement + prédiction)
+    lyrics_store     paroles versées dans lyrics_store (fusion_lyrics)
+    lyrics_index     index inversé des paroles
+    empowerment      empower_tag.main (streaming, paroles lues dans le store)
+    tags             extraction mood / activity / era des tags Last.fm
+    pools            PoolIndex + pools de POOL_DEFINITIONS et de paroles
+    app_pools        Catalog.load (pools par genre de l'app) + séquençage
+    similarity_build / similarity_search
+    spotify_fetch, lastfm_fetch, genius_fetch
+                     clients réseau contre les serveurs factices locaux
+                     (--sample lignes, --no-network pour les ignorer)
+
+Le fallback sentiment de tags.py (modèle Hugging Face) n'est pas lancé : voir
+benchmarks/bench_sentiment.py.
+
+Résultats en JSON pour comparer deux passages (régression si une étape est
+plus lente ou plus gourmande de --tolerance et d'au moins --min-seconds /
+--min-mb ; code de sortie 1) :
+
+    python -m benchmarks.suite run --rows 100k --output base.json
+    python -m benchmarks.suite run --rows 100k --output new.json --compare base.json
+    python -m benchmarks.suite compare base.json new.json
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+import empower_tag
+from benchmarks import synthetic
+from benchmarks.fake_genius import start_fake_genius
+from benchmarks.fake_lastfm import start_fake_lastfm
+from benchmarks.fake_spotify import start_fake_spotify
+from catalog import PROGRAMMES, Catalog
+from clean import create_clean_dataset
+from dataset_io import read_table, table_rows, write_table
+from enrichment import TokenBucket
+from genre_cache import GenreCache
+from lastfm_tags import LastfmClient, fetch_tags
+from lyrics_enrichment import GeniusFetcher, process_batch
+from lyrics_index import LYRICS_INDEX, load_lyric_pools, update_index
+from lyrics_store import STORE_DIR, LyricsStore
+from pool_index import POOL_DEFINITIONS, PoolIndex
+from pools import POOL_COLUMNS
+from response_cache import open_cache
+from sequencer import sequence
+from similarity import FEATURES as SIMILARITY_FEATURES, SimilarityIndex
+from smart_genre_mapper import FEATURES as GENRE_FEATURES, MODEL_KIND, artist_keys, load_or_train, map_genres, \
+    predict_undetermined
+from spotify_api import fetch_tracks, make_spotify_client
+from tags import prepare_columns, tag_keywords
+
+STAGES = ["clean", "genre_rules", "genre_model", "lyrics_store", "lyrics_index", "empowerment", "tags", "pools",
+          "app_pools", "similarity_build", "similarity_search", "spotify_fetch", "lastfm_fetch", "genius_fetch"]
+NETWORK_STAGES = {"spotify_fetch", "lastfm_fetch", "genius_fetch"}
+
+TOLERANCE = 0.2      # +20 % = régression ...
+MIN_SECONDS = 0.05   # ... si l'écart dépasse aussi ce temps (bruit des étapes courtes)
+MIN_MB = 20
+
+
+# === Mesure ===
+def _status_mb(key: str) -> float:
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith(key):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def measure(fn, state: dict) -> dict:
+    """
+    Temps et pic mémoire d'une étape. Pic RSS (VmHWM) remis à zéro avant
+    l'étape via /proc/self/clear_refs, comme benchmarks/bench_io.py ; None hors Linux.
+    """
+    tracked = os.path.exists("/proc/self/clear_refs")
+    if tracked:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        before = _status_mb("VmRSS")
+    start = time.perf_counter()
+    rows = fn(state)
+    seconds = time.perf_counter() - start
+    peak = round(_status_mb("VmHWM") - before, 1) if tracked else None
+    return {"seconds": round(seconds, 4), "peak_mb": peak, "rows": rows}
+
+
+# === Étapes (state : DataFrames passés d'une étape à l'autre, options) ===
+def stage_clean(state):
+    df = create_clean_dataset(*synthetic.SOURCES)
+    write_table(df, "clean")
+    return len(df)
+
+
+def stage_genre_rules(state):
+    df = read_table("clean")
+    with GenreCache(synthetic.CACHE_DB) as cache:
+        artist_genre_cache = cache.get_many(artist_keys(df["artist"])[1].unique())
+    df["genre"] = map_genres(df["artist"], artist_genre_cache)
+    state["genres"] = df
+    return len(df)
+
+
+def stage_genre_model(state):
+    df = state.pop("genres")
+    train_df = df[df["genre"] != "Autre"]
+    saved = load_or_train(train_df[GENRE_FEATURES].fillna(0), train_df["genre"], kind=state["model"], retrain=True)
+    df = predict_undetermined(df, saved)
+    write_table(df, "dataset_avec_genres_ml")
+    return len(df)
+
+
+def stage_lyrics_store(state):
+    shutil.rmtree(STORE_DIR, ignore_errors=True)
+    df = read_table("dataset_avec_genres_ml")
+    enrichment = read_table(synthetic.ENRICHMENT_TABLE, columns=["track_id", "lyrics"])
+    df = df.merge(enrichment, on="track_id", how="left")
+    with LyricsStore(STORE_DIR) as store:
+        write_table(store.externalize(df), "dataset_with_lyrics")
+    return len(df)
+
+
+def stage_lyrics_index(state):
+    if os.path.exists(LYRICS_INDEX):
+        os.remove(LYRICS_INDEX)
+    return update_index().indexed
+
+
+def stage_empowerment(state):
+    empower_tag.main()
+    return table_rows(empower_tag.OUTPUT_TABLE)
+
+
+def stage_tags(state):
+    df = read_table("dataset_with_empowerment")
+    enrichment = read_table(synthetic.ENRICHMENT_TABLE, columns=["track_id", "lastfm_tags"])
+    df = tag_keywords(prepare_columns(df.merge(enrichment, on="track_id", how="left")))
+    write_table(df, "dataset_mood_activity")
+    return len(df)
+
+
+def stage_pools(state):
+    index = PoolIndex(read_table("dataset_mood_activity", columns=POOL_COLUMNS))
+    counts = {name: index.count(POOL_DEFINITIONS[name]) for name in POOL_DEFINITIONS}
+    counts.update({name: index.count({name: True}) for name in load_lyric_pools(index)})
+    state["pool_counts"] = counts
+    return index.size
+
+
+def stage_app_pools(state):
+    catalog = Catalog.load()
+    for genre in catalog.genres:
+        for programme in PROGRAMMES:
+            sequence(catalog, genre, programme, seed=0)
+    return len(catalog.energy)
+
+
+def stage_similarity_build(state):
+    df = read_table("dataset_mood_activity", columns=["track_id"] + SIMILARITY_FEATURES)
+    state["similarity"] = SimilarityIndex.build(df)
+    return len(state["similarity"])
+
+
+def stage_similarity_search(state):
+    index = state.pop("similarity")
+    seeds = np.random.default_rng(0).choice(index.track_ids, min(state["queries"], len(index)), replace=False)
+    index.similar_to(seeds, k=20)
+    return len(seeds)
+
+
+def _sample(state) -> pd.DataFrame:
+    df = read_table("dataset_mood_activity", columns=["track_id", "artist", "track_name"])
+    return df.sample(min(state["sample"], len(df)), random_state=0)
+
+
+def stage_spotify_fetch(state):
+    server, prefix = start_fake_spotify(latency=state["latency"])
+    try:
+        sp = make_spotify_client(8, prefix=prefix, auth="fake")
+        return len(fetch_tracks(sp, _sample(state)["track_id"].tolist(), TokenBucket(1000)))
+    finally:
+        server.shutdown()
+
+
+def stage_lastfm_fetch(state):
+    server, root = start_fake_lastfm(latency=state["latency"])
+    try:
+        rows = _sample(state)
+        fetch_tags(rows, LastfmClient(api_key="fake", root=root), open_cache("memory://"), TokenBucket(1000))
+        return len(rows)
+    finally:
+        server.shutdown()
+
+
+def stage_genius_fetch(state):
+    server, root = start_fake_genius(latency=state["latency"])
+    try:
+        rows = _sample(state).assign(lyrics="")
+        process_batch(rows, GeniusFetcher(root=root, rate=1000))
+        return len(rows)
+    finally:
+        server.shutdown()
+
+
+STAGE_FUNCTIONS = {name: globals()[f"stage_{name}"] for name in STAGES}
+
+
+# === Résultats ===
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=synthetic.ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(rows: int, stages: list, seed: int = 0, options: dict = None) -> dict:
+    """Lance les étapes dans l'ordre, dans une copie de travail du jeu synthétique."""
+    data = synthetic.dataset_dir(rows, seed)
+    state = dict(options or {})
+    results = {}
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as work:
+        for name in os.listdir(data):
+            shutil.copy(os.path.join(data, name), work)
+        os.chdir(work)
+        try:
+            for name in stages:
+                results[name] = measure(STAGE_FUNCTIONS[name], state)
+                r = results[name]
+                peak = "" if r["peak_mb"] is None else f"{r['peak_mb']:8.0f} Mo"
+                print(f"{name:18} {r['seconds']:9.3f}s {peak}  ({r['rows']} lignes)")
+        finally:
+            os.chdir(cwd)
+    return {"meta": {"rows": rows, "seed": seed, "commit": git_commit(), "python": platform.python_version(),
+                     "pandas": pd.__version__, "numpy": np.__version__, "machine": platform.machine(),
+                     "cpus": os.cpu_count(), "date": time.strftime("%Y-%m-%dT%H:%M:%S"), "options": options},
+            "stages": results, "pool_counts": state.get("pool_counts")}
+
+
+def compare(base: dict, new: dict, tolerance: float = TOLERANCE, min_seconds: float = MIN_SECONDS,
+            min_mb: float = MIN_MB) -> list:
+    """
+    Affiche les écarts étape par étape.
+
+    Returns:
+    list: Étapes en régression (temps ou mémoire).
+    """
+    if base["meta"]["rows"] != new["meta"]["rows"] or base["meta"]["seed"] != new["meta"]["seed"]:
+        print(f"Attention : jeux différents ({base['meta']['rows']} / {new['meta']['rows']} titres)")
+    regressions = []
+    print(f"{'étape':18} {'avant s':>9} {'après s':>9} {'ratio':>7} {'avant Mo':>9} {'après Mo':>9}")
+    for name, after in new["stages"].items():
+        before = base["stages"].get(name)
+        if before is None:
+            print(f"{name:18} {'':>9} {after['seconds']:9.3f}   (nouvelle étape)")
+            continue
+        ratio = after["seconds"] / before["seconds"] if before["seconds"] else float("inf")
+        slower = ratio > 1 + tolerance and after["seconds"] - before["seconds"] > min_seconds
+        heavier = (after["peak_mb"] is not None and before["peak_mb"] is not None
+                   and after["peak_mb"] > before["peak_mb"] * (1 + tolerance)
+                   and after["peak_mb"] - before["peak_mb"] > min_mb)
+        flag = "  RÉGRESSION" + (" temps" if slower else "") + (" mémoire" if heavier else "") if slower or heavier else ""
+        mb = lambda v: f"{v:9.0f}" if v is not None else f"{'-':>9}"
+        print(f"{name:18} {before['seconds']:9.3f} {after['seconds']:9.3f} {ratio:6.2f}x "
+              f"{mb(before['peak_mb'])} {mb(after['peak_mb'])}{flag}")
+        if slower or heavier:
+            regressions.append(name)
+    return regressions
+
+
+def load_results(path: str) -> dict:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Suite de benchmarks de la chaîne (jeu synthétique)")
+    parser.add_argument("command", choices=["run", "compare"])
+    parser.add_argument("files", nargs="*", help="compare : résultats de référence puis nouveaux")
+    parser.add_argument("--rows", default="10k", help="10k, 100k, 1m ou un entier")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=None, help="Étapes à lancer (et leur amont)")
+    parser.add_argument("--no-network", action="store_true", help="Sans les étapes contre les serveurs factices")
+    parser.add_argument("--sample", type=int, default=500, help="Lignes envoyées aux serveurs factices")
+    parser.add_argument("--latency", type=float, default=0.01, help="Latence des serveurs factices (s)")
+    parser.add_argument("--queries", type=int, default=200, help="Titres de départ pour similarity_search")
+    parser.add_argument("--model", default=None, help="Classifieur de genre (smart_genre_mapper.make_model)")
+    parser.add_argument("--output", default=None, help="Fichier JSON des résultats (bench_<rows>.json par défaut)")
+    parser.add_argument("--compare", default=None, help="Résultats de référence à comparer")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE)
+    parser.add_argument("--min-seconds", type=float, default=MIN_SECONDS)
+    parser.add_argument("--min-mb", type=float, default=MIN_MB)
+    args = parser.parse_args()
+
+    if args.command == "compare":
+        if len(args.files) != 2:
+            parser.error("compare attend deux fichiers : référence puis nouveaux résultats")
+        base, new = (load_results(path) for path in args.files)
+    else:
+        rows = synthetic.parse_rows(args.rows)
+        # Une étape a besoin des sorties de toutes celles qui la précèdent
+        last = max(STAGES.index(name) for name in args.stages) if args.stages else len(STAGES) - 1
+        stages = [name for name in STAGES[:last + 1] if not (args.no_network and name in NETWORK_STAGES)]
+        options = {"model": args.model or MODEL_KIND, "sample": args.sample, "latency": args.latency,
+                   "queries": args.queries}
+        new = run(rows, stages, args.seed, options)
+        output = args.output or f"bench_{args.rows}.json"
+        with open(output, "w", encoding="utf-8") as f:
+            json.dump(new, f, indent=2)
+        print(f"Résultats → {output}")
+        base = load_results(args.compare) if args.compare else None
+
+    if base is not None:
+        regressions = compare(base, new, args.tolerance, args.min_seconds, args.min_mb)
+        if regressions:
+            print(f"Régressions : {', '.join(regressions)}")
+            sys.exit(1)
@@ -0,0 +1,211 @@
+"""
+Jeu de données synthétique et reproductible (graine) pour la suite de
+benchmarks : les trois exports lus par clean.py avec leurs vrais schémas
+(doublons entre sources, lignes rejetées par les filtres), le cache de
+genres d'artistes (SQLite, listes vides -> "Autre" -> classifieur), les
+paroles et les tags Last.fm de chaque titre.
+
+Générer 1M de titres prend du temps : les fichiers sont gardés dans
+--out (un dossier par taille et graine) et réutilisés.
+
+    python -m benchmarks.synthetic --rows 100k
+"""
+import argparse
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.bench_empower import FILLER
+from empower_tag import KEYWORD_FORMS, KEYWORDS, WORD_SEPARATORS
+from genre_cache import GenreCache
+from lyrics_index import LYRIC_POOLS
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_DIR = os.path.join(ROOT, ".bench_data")
+
+SOURCES = ["SpotifyFeatures.csv", "dataset.csv", "spotify_songs.csv"]
+ENRICHMENT_TABLE = "enrichment"   # track_id, lyrics, lastfm_tags (résultats simulés des étapes réseau)
+CACHE_DB = "artist_genre_cache.sqlite"
+ARTISTES_FR_FILE = "artistes_fr.txt"
+
+# Genres Spotify d'artistes : couvrent les règles de smart_genre_mapper et des genres sans règle
+SPOTIFY_GENRES = ["french hip hop", "rap francais", "pop", "dance pop", "trap latino", "reggaeton", "k-pop",
+                  "rock", "alt metal", "edm", "house", "r&b", "neo soul", "jazz", "blues", "classical",
+                  "reggae", "indie folk", "singer-songwriter", "chanson", "lo-fi beats", "ambient"]
+LASTFM_TAGS = ["pop", "rock", "happy", "sad", "chill", "romantic", "calm", "melancholic", "party", "workout",
+               "study", "sleep", "driving", "90s", "2000s", "2010s", "rap", "female vocalists"]
+# Paroles : mots courants sans mot-clé, plus de rares mots de thème (empowerment, pools de paroles)
+LYRIC_WORDS = [w for w in FILLER if not set(w.translate(WORD_SEPARATORS).split()) & KEYWORD_FORMS.keys()]
+THEME_WORDS = KEYWORDS + [term.rstrip("*") for spec in LYRIC_POOLS.values()
+                          for term in spec.get("any_of", list(spec.get("weights", {})))]
+THEME_RATE = 0.01
+BASE62 = np.frombuffer(b"0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz", dtype=np.uint8)
+
+FEATURES = ["danceability", "energy", "speechiness", "acousticness", "instrumentalness", "liveness", "valence"]
+
+
+def parse_rows(text: str) -> int:
+    """"10k", "100k", "1m" ou un entier."""
+    text = str(text).lower().strip()
+    scale = {"k": 1_000, "m": 1_000_000}.get(text[-1:], 1)
+    return int(float(text.rstrip("km")) * scale)
+
+
+def track_ids(rng, n: int) -> np.ndarray:
+    """Identifiants base62 de 22 caractères, comme Spotify."""
+    return BASE62[rng.integers(0, 62, (n, 22))].view("S22").ravel().astype(str).astype(object)
+
+
+def make_tracks(n: int, rng) -> pd.DataFrame:
+    """Titres distincts et leurs features ; environ 10 % hors des filtres de clean.py."""
+    n_artists = max(1, n // 8)
+    with open(os.path.join(ROOT, ARTISTES_FR_FILE), encoding="utf-8") as f:
+        french = [line.strip() for line in f if line.strip() and not line.startswith("#")]
+    names = np.array([f"artist {i}" for i in range(n_artists)], dtype=object)
+    names[rng.choice(n_artists, min(len(french), n_artists), replace=False)] = french[:n_artists]
+    artist = names[rng.integers(0, n_artists, n)]
+    collab = rng.random(n) < 0.05
+    artist[collab] = artist[collab] + ";" + names[rng.integers(0, n_artists, collab.sum())]
+
+    df = pd.DataFrame({
+        "track_id": track_ids(rng, n),
+        "artist": artist,
+        "track_name": [f"Title {i}" for i in range(n)],
+        "album": [f"Album {i}" for i in rng.integers(0, max(1, n // 4), n)],
+        "popularity": rng.integers(0, 100, n),
+        "duration_ms": rng.integers(90_000, 330_000, n),
+        **{col: rng.random(n) for col in FEATURES},
+        "loudness": -rng.random(n) * 20,
+        "tempo": 60 + rng.random(n) * 120,
+        "key": rng.integers(0, 12, n),
+        "mode": rng.integers(0, 2, n),
+        "time_signature": rng.choice([3, 4, 4, 4], n),
+    })
+    df["speechiness"] *= 0.6
+    df["liveness"] *= 0.75
+    # Lignes rejetées par quality_mask
+    bad = rng.random(n) < 0.1
+    column = rng.choice(["tempo", "duration_ms", "speechiness", "time_signature"], bad.sum())
+    for col, value in (("tempo", 220.0), ("duration_ms", 30_000), ("speechiness", 0.9), ("time_signature", 1)):
+        df.loc[np.flatnonzero(bad)[column == col], col] = value
+    return df
+
+
+def source_rows(tracks: pd.DataFrame, rng, share: float) -> pd.DataFrame:
+    """Sous-ensemble des titres (part `share`), popularité bruitée comme entre deux exports."""
+    rows = tracks[rng.random(len(tracks)) < share].copy()
+    rows["popularity"] = np.clip(rows["popularity"] + rng.integers(-5, 6, len(rows)), 0, 100)
+    return rows
+
+
+def write_sources(tracks: pd.DataFrame, out: str, rng):
+    """Les trois exports Kaggle / TidyTuesday, colonnes et formats d'origine."""
+    features = source_rows(tracks, rng, 0.5)
+    pd.DataFrame({
+        "genre": rng.choice(["Pop", "Rap", "Rock", "Dance"], len(features)),
+        "artist_name": features["artist"].str.split(";").str[0], "track_name": features["track_name"],
+        "track_id": features["track_id"], "popularity": features["popularity"],
+        **{col: features[col] for col in ["acousticness", "danceability", "duration_ms", "energy",
+                                          "instrumentalness", "key", "liveness", "loudness"]},
+        "mode": np.where(features["mode"] == 1, "Major", "Minor"), "speechiness": features["speechiness"],
+        "tempo": features["tempo"], "time_signature": features["time_signature"].astype(str) + "/4",
+        "valence": features["valence"],
+    }).to_csv(os.path.join(out, SOURCES[0]), index=False)
+
+    dataset = source_rows(tracks, rng, 0.45)
+    pd.DataFrame({
+        "track_id": dataset["track_id"], "artists": dataset["artist"], "album_name": dataset["album"],
+        "track_name": dataset["track_name"], "popularity": dataset["popularity"],
+        "duration_ms": dataset["duration_ms"], "explicit": rng.random(len(dataset)) < 0.1,
+        **{col: dataset[col] for col in ["danceability", "energy", "key", "loudness", "mode", "speechiness",
+                                         "acousticness", "instrumentalness", "liveness", "valence", "tempo",
+                                         "time_signature"]},
+        "track_genre": rng.choice(["pop", "hip-hop", "rock", "edm"], len(dataset)),
+    }).to_csv(os.path.join(out, SOURCES[1]))
+
+    songs = source_rows(tracks, rng, 0.35)
+    pd.DataFrame({
+        "track_id": songs["track_id"], "track_name": songs["track_name"],
+        "track_artist": songs["artist"].str.split(";").str[0], "track_popularity": songs["popularity"],
+        "track_album_id": track_ids(rng, len(songs)), "track_album_name": songs["album"],
+        "track_album_release_date": "2019-06-14", "playlist_name": "playlist", "playlist_id": "37i9dQZF1DX",
+        "playlist_genre": rng.choice(["pop", "rap", "rock", "latin", "r&b", "edm"], len(songs)),
+        "playlist_subgenre": "subgenre",
+        **{col: songs[col] for col in ["danceability", "energy", "key", "loudness", "mode", "speechiness",
+                                       "acousticness", "instrumentalness", "liveness", "valence", "tempo",
+                                       "duration_ms"]},
+    }).to_csv(os.path.join(out, SOURCES[2]), index=False)
+
+
+def write_genre_cache(tracks: pd.DataFrame, out: str, rng):
+    """Genres Spotify de chaque artiste (clé en minuscules, comme artist_genre.py) ; 15 % sans genre."""
+    artists = tracks["artist"].str.split(";").str[0].str.lower().unique()
+    counts = np.where(rng.random(len(artists)) < 0.15, 0, rng.integers(1, 4, len(artists)))
+    genres = {artist: list(rng.choice(SPOTIFY_GENRES, k, replace=False)) for artist, k in zip(artists, counts)}
+    with GenreCache(os.path.join(out, CACHE_DB)) as cache:
+        cache.put_many(genres)
+
+
+def make_lyrics(n: int, rng, words: int = 120) -> np.ndarray:
+    """Paroles : 60 % des titres, longueur variable, un texte sur dix partagé avec un autre titre."""
+    lengths = rng.integers(words // 2, words * 2, n)
+    flat = np.array(LYRIC_WORDS, dtype=object)[rng.integers(0, len(LYRIC_WORDS), int(lengths.sum()))]
+    themed = np.flatnonzero(rng.random(len(flat)) < THEME_RATE)
+    flat[themed] = np.array(THEME_WORDS, dtype=object)[rng.integers(0, len(THEME_WORDS), len(themed))]
+    bounds = np.concatenate([[0], np.cumsum(lengths)])
+    lyrics = np.array([" ".join(flat[bounds[i]:bounds[i + 1]]) for i in range(n)], dtype=object)
+    shared = np.flatnonzero(rng.random(n) < 0.1)
+    lyrics[shared] = lyrics[rng.integers(0, n, len(shared))]
+    lyrics[rng.random(n) >= 0.6] = ""
+    return lyrics
+
+
+def make_tags(n: int, rng) -> np.ndarray:
+    """Tags Last.fm "tag1, tag2, ..." ; 30 % des titres sans tags."""
+    tags = np.array(LASTFM_TAGS, dtype=object)
+    picks = rng.integers(0, len(tags), (n, 4))
+    joined = np.array([", ".join(row) for row in tags[picks]], dtype=object)
+    joined[rng.random(n) < 0.3] = ""
+    return joined
+
+
+def generate(rows: int, out: str, seed: int = 0):
+    """Écrit le jeu complet dans out (remplacé s'il existe)."""
+    rng = np.random.default_rng(seed)
+    tmp = out + ".tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    tracks = make_tracks(rows, rng)
+    write_sources(tracks, tmp, rng)
+    write_genre_cache(tracks, tmp, rng)
+    shutil.copy(os.path.join(ROOT, ARTISTES_FR_FILE), tmp)
+    pd.DataFrame({"track_id": tracks["track_id"], "lyrics": make_lyrics(rows, rng),
+                  "lastfm_tags": make_tags(rows, rng)}).to_parquet(os.path.join(tmp, ENRICHMENT_TABLE + ".parquet"))
+    shutil.rmtree(out, ignore_errors=True)
+    os.replace(tmp, out)
+
+
+def dataset_dir(rows: int, seed: int = 0, root: str = DATA_DIR) -> str:
+    """Dossier du jeu (rows, seed), généré au premier appel seulement."""
+    out = os.path.join(root, f"{rows}_{seed}")
+    if not os.path.exists(out):
+        print(f"Génération du jeu synthétique ({rows} titres, graine {seed}) → {out}")
+        generate(rows, out, seed)
+    return out
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Jeu de données synthétique des benchmarks")
+    parser.add_argument("--rows", default="100k", help="10k, 100k, 1m ou un entier")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default=DATA_DIR)
+    parser.add_argument("--force", action="store_true", help="Regénère même si le dossier existe")
+    args = parser.parse_args()
+    rows = parse_rows(args.rows)
+    if args.force:
+        shutil.rmtree(os.path.join(args.out, f"{rows}_{args.seed}"), ignore_errors=True)
+    out = dataset_dir(rows, args.seed, args.out)
+    for name in sorted(os.listdir(out)):
+        print(f"{name:32} {os.path.getsize(os.path.join(out, name)) / 1e6:8.1f} Mo")
@@ -0,0 +1,109 @@
+"""
+Catalogue de l'app Streamlit : dataset projeté et typé, pools précalculés.
+
+Le dataset est chargé une fois (colonnes utiles seulement) et chaque pool
+(cardio, dynamique, chill, dansant) est calculé pour tous les genres au
+chargement. Générer une playlist revient ensuite à une lecture de dictionnaire
+et un tirage. L'app garde le catalogue en cache tant que le fichier de la
+table ne change pas (voir catalog_version). Les pools de paroles de
+lyrics_index.py (rupture, empowerment FR...) sont chargés comme thèmes, qui
+restreignent les pools du programme.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+from dataset_io import read_table, table_file
+from lyrics_index import LYRICS_INDEX, load_lyric_pools
+from pool_index import POOL_DEFINITIONS, PoolIndex
+
+CATALOG_TABLE = "dataset_mood_activity"
+
+# Seules colonnes utiles à l'app : les paroles et tags ne sont pas chargés
+APP_COLUMNS = ["track_id", "track_name", "artist", "genre", "energy", "danceability", "tempo", "valence", "activity"]
+
+TRACK_DURATION = 3.5  # minutes par morceau, pour convertir la durée des phases en nombre de titres
+
+# Programme -> phases (nom affiché, pool, durée en minutes)
+PROGRAMMES = {
+    "renfo": [("Cardio", "cardio", 15), ("Dynamique", "dynamic", 75), ("Chill", "chill", 15)],
+    "flex": [("Dynamique", "dynamic", 15), ("Chill", "chill", 45)],
+    "pole dance": [("Dynamique", "dynamic", 15), ("Dansant", "dansant", 75)],
+}
+
+
+def catalog_version(name: str = CATALOG_TABLE) -> float:
+    """mtime du fichier lu pour la table : change dès que la table est régénérée."""
+    return os.path.getmtime(table_file(name))
+
+
+class Catalog:
+    """
+    Parameters:
+    df (pd.DataFrame): Colonnes APP_COLUMNS (au moins track_id, genre et celles des pools).
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        self.genres = sorted(df["genre"].dropna().unique())
+        self.index = PoolIndex(df)
+        self.tracks = df[["track_id", "track_name", "artist", "genre"]].reset_index(drop=True)
+        self._search_text = (self.tracks["artist"].astype(str) + " - " + self.tracks["track_name"].astype(str)).str.lower()
+        # Tableaux par ligne pour le séquenceur
+        self.energy = df["energy"].to_numpy(dtype=float)
+        self.tempo = df["tempo"].to_numpy(dtype=float)
+        self.artist_codes = pd.factorize(df["artist"])[0]
+
+        # Positions des titres de chaque pool, par genre (comparé sans la casse, comme dans l'ancienne app)
+        pools = {pool for phases in PROGRAMMES.values() for _, pool, _ in phases}
+        self.pools = {}
+        for pool in pools:
+            pool_bitmap = self.index.bitmap(POOL_DEFINITIONS[pool])
+            for genre in self.genres:
+                mask = np.unpackbits(pool_bitmap & self.index.value_bitmap("genre", genre), count=len(df))
+                self.pools.setdefault(genre.lower(), {})[pool] = np.flatnonzero(mask)
+        self.themes = {}
+
+    @classmethod
+    def load(cls, name: str = CATALOG_TABLE, lyrics_index: str = LYRICS_INDEX) -> "Catalog":
+        catalog = cls(read_table(name, columns=APP_COLUMNS))
+        catalog.add_lyric_pools(lyrics_index)
+        return catalog
+
+    def add_lyric_pools(self, path: str = LYRICS_INDEX):
+        """Thèmes de paroles (lyrics_index.LYRIC_POOLS), si l'index a été construit."""
+        for name in load_lyric_pools(self.index, path):
+            self.themes[name] = self.mask({name: True})
+
+    def pool_positions(self, genre: str, pool: str, theme: str = None) -> np.ndarray:
+        """Positions (lignes du catalogue) du pool pour le genre (tableau vide si aucun titre), restreint au thème."""
+        rows = self.pools.get(str(genre).lower(), {}).get(pool, np.array([], dtype=np.intp))
+        return rows[self.themes[theme][rows]] if theme else rows
+
+    def pool(self, genre: str, pool: str) -> np.ndarray:
+        """track_id du pool pour le genre."""
+        return self.index.track_ids[self.pool_positions(genre, pool)]
+
+    def mask(self, conditions: dict) -> np.ndarray:
+        """Lignes du catalogue qui vérifient les conditions (voir PoolIndex.bitmap), en booléens."""
+        return np.unpackbits(self.index.bitmap(conditions), count=self.index.size).astype(bool)
+
+    def find(self, text: str, limit: int = 50) -> pd.DataFrame:
+        """Titres dont "artiste - titre" contient le texte (sans la casse)."""
+        return self.tracks[self._search_text.str.contains(text.lower(), regex=False)].head(limit)
+
+    def describe(self, track_ids) -> pd.DataFrame:
+        """Titre, artiste et genre des track_id, dans l'ordre donné."""
+        return self.tracks.set_index("track_id").loc[list(track_ids)].reset_index()
+
+    def playlist(self, genre: str, programme: str, rng=None) -> list:
+        """track_id tirés au hasard (sans remise) pour chaque phase du programme."""
+        rng = np.random.default_rng() if rng is None else rng
+        track_ids = []
+        for _, pool, duration in PROGRAMMES[programme]:
+            ids = self.pool(genre, pool)
+            if len(ids) == 0:
+                continue
+            n_tracks = int(duration / TRACK_DURATION)
+            track_ids.extend(rng.choice(ids, min(len(ids), n_tracks), replace=False).tolist())
+        return track_ids
@@ -1,5 +1,44 @@
+import argparse
+
+import numpy as np
 import pandas as pd
 
+from dataset_io import read_table, write_table
+
+# Colonnes conservées par standardize_columns (time_signature n'en fait pas partie)
+BASE_COLUMNS = [
+    'track_id', 'artist', 'track_name', 'album', 'popularity',
+    'duration_ms', 'danceability', 'energy', 'loudness',
+    'speechiness', 'acousticness', 'instrumentalness', 'liveness',
+    'valence', 'tempo', 'track_genre', 'playlist_genre', 'playlist_subgenre'
+]
+
+# Colonnes du dataset propre
+CLEAN_COLUMNS = [
+    'track_id', 'artist', 'track_name', 'album', 'popularity',
+    'duration_ms', 'danceability', 'energy', 'loudness',
+    'speechiness', 'acousticness', 'instrumentalness', 'liveness',
+    'valence', 'tempo', 'time_signature'
+]
+
+COLUMN_MAPPING = {
+    'artists': 'artist',
+    'track_artist': 'artist',
+    'artist_name': 'artist',
+    'album_name': 'album',
+    'track_album_name': 'album',
+    'track_popularity': 'popularity'
+}
+
+# Mode streaming : lignes lues à la fois et types explicites par colonne standardisée.
+# Les features restent en float64 : en float32, les valeurs écrites dans clean.csv changeraient.
+CHUNK_SIZE = 100000
+TEXT_COLUMNS = ['track_id', 'artist', 'track_name', 'album']
+STREAM_DTYPES = {'popularity': 'Int32', 'duration_ms': 'Int32'}
+
+# Ingestion incrémentale : liste des titres ajoutés / modifiés par le dernier passage
+DELTA_FILE = "clean_delta.csv"
+
 def load_data(file_path: str) -> pd.DataFrame:
     """
     Loads data from a CSV file into a pandas DataFrame.
@@ -38,7 +77,8 @@ def clean_data(df: pd.DataFrame) -> pd.DataFrame:
 def standardize_columns(df: pd.DataFrame, dataset_name: str) -> pd.DataFrame:
     """
     Standardizes column names and selects relevant columns based on the dataset.
-    Toutes les valeurs string sont passées en minuscules.
+    Toutes les valeurs string sont passées en minuscules, sauf track_id
+    (identifiant Spotify base62, sensible à la casse).
     
     Parameters:
     df (pd.DataFrame): The DataFrame to standardize.
@@ -89,20 +129,11 @@ def standardize_columns(df: pd.DataFrame, dataset_name: str) -> pd.DataFrame:
     # Apply column renaming
     df_std = df_std.rename(columns=column_mapping)
     
-    # Define the columns to keep
-    base_columns = [
-        'track_id', 'artist', 'track_name', 'album', 'popularity',
-        'duration_ms', 'danceability', 'energy', 'loudness', 
-        'speechiness', 'acousticness', 'instrumentalness', 'liveness',
-        'valence', 'tempo','track_genre', 'playlist_genre', 'playlist_subgenre'
-    ]
-    
-    
     # Select only existing columns
-    existing_columns = [col for col in base_columns if col in df_std.columns]
+    existing_columns = [col for col in BASE_COLUMNS if col in df_std.columns]
     df_std = df_std[existing_columns]
-    # Mise en minuscules de toutes les colonnes de type string
-    for col in df_std.select_dtypes(include='object').columns:
+    # Mise en minuscules de toutes les colonnes de type string (sauf track_id)
+    for col in df_std.select_dtypes(include='object').columns.drop('track_id', errors='ignore'):
         df_std[col] = df_std[col].str.lower()
     return df_std
 
@@ -157,63 +188,241 @@ def process_datasets(spotify_features_path: str, dataset_path: str, spotify_song
     return final_df
 
 
+def normalize_rows(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Transformations ligne à ligne du dataset propre : minuscules (sauf track_id),
+    artiste principal (avant le point-virgule), time_signature numérique.
+    """
+    # Mise en minuscules de toutes les colonnes de type string (sauf track_id)
+    for col in df.select_dtypes(include='object').columns.drop('track_id', errors='ignore'):
+        df[col] = df[col].str.lower()
+    # Retirer tout ce qui suit un point-virgule dans la colonne 'artist' (conversion en str pour éviter les erreurs)
+    if 'artist' in df.columns:
+        df['artist'] = df['artist'].apply(lambda x: str(x).split(';')[0].strip())
+    # Conversion de time_signature en numérique si besoin
+    if 'time_signature' in df.columns:
+        df['time_signature'] = df['time_signature'].astype(str).str.extract(r'(\d+)').astype(float)
+    return df
+
+
+def quality_mask(df: pd.DataFrame) -> pd.Series:
+    """
+    Filtres sur tempo, loudness, speechiness, liveness, time_signature, duration_ms.
+
+    Returns:
+    pd.Series: True pour les lignes conservées (valeur manquante = rejetée).
+    """
+    mask = pd.Series(True, index=df.index)
+    if 'tempo' in df.columns:
+        mask &= (df['tempo'] >= 23.82) & (df['tempo'] <= 208.20)
+    if 'loudness' in df.columns:
+        mask &= df['loudness'] <= 0
+    if 'speechiness' in df.columns:
+        mask &= df['speechiness'] <= 0.66
+    if 'liveness' in df.columns:
+        mask &= df['liveness'] < 0.8
+    if 'time_signature' in df.columns:
+        mask &= df['time_signature'].isin([2, 3, 4, 5])
+    if 'duration_ms' in df.columns:
+        mask &= (df['duration_ms'] >= 60000) & (df['duration_ms'] <= 360000)
+    return mask.fillna(False).astype(bool)
+
+
 def create_clean_dataset(spotify_features_path: str, dataset_path: str, spotify_songs_path: str) -> pd.DataFrame:
     """
     Crée un dataset propre selon les critères demandés :
     - Colonnes spécifiques
     - Pas de valeurs nulles
-    - Toutes les valeurs string en minuscules
+    - Toutes les valeurs string en minuscules (sauf track_id, sensible à la casse)
     - Noms d'artistes, titres et albums en minuscules
     - Dans 'artist', retire tout ce qui suit un point-virgule
-    - Unicité sur track_id (meilleure popularité)
-    - Unicité sur (artist, track_name) (meilleure popularité)
+    - Unicité sur track_id (meilleure popularité, puis première occurrence)
+    - Unicité sur (artist, track_name) (meilleure popularité, puis première occurrence)
     - Filtres sur tempo, loudness, speechiness, liveness, time_signature, duration_ms
-    """
-    keep_cols = [
-        'track_id', 'artist', 'track_name', 'album', 'popularity',
-        'duration_ms', 'danceability', 'energy', 'loudness', 
-        'speechiness', 'acousticness', 'instrumentalness', 'liveness',
-        'valence', 'tempo', 'time_signature'
-    ]
 
+    Les tris sont stables : à popularité égale, la ligne lue en premier gagne,
+    ce qui rend le résultat reproductible (et identique au mode streaming).
+    """
     df1 = standardize_columns(load_data(spotify_features_path), 'SpotifyFeatures')
     df2 = standardize_columns(load_data(dataset_path), 'dataset')
     df3 = standardize_columns(load_data(spotify_songs_path), 'spotify_songs')
     df = pd.concat([df1, df2, df3], ignore_index=True)
-    df = df[[col for col in keep_cols if col in df.columns]]
-    
-    # Mise en minuscules de toutes les colonnes de type string
-    for col in df.select_dtypes(include='object').columns:
-        df[col] = df[col].str.lower()
-    # Retirer tout ce qui suit un point-virgule dans la colonne 'artist' (conversion en str pour éviter les erreurs)
-    if 'artist' in df.columns:
-        df['artist'] = df['artist'].apply(lambda x: str(x).split(';')[0].strip())
+    df = normalize_rows(df[[col for col in CLEAN_COLUMNS if col in df.columns]].copy())
+
     if 'track_id' in df.columns:
-        df = df.sort_values('popularity', ascending=False)
+        df = df.sort_values('popularity', ascending=False, kind='stable')
         df = df.drop_duplicates(subset=['track_id'], keep='first')
     if 'artist' in df.columns and 'track_name' in df.columns:
-        df = df.sort_values('popularity', ascending=False)
+        df = df.sort_values('popularity', ascending=False, kind='stable')
         df = df.drop_duplicates(subset=['artist', 'track_name'], keep='first')
-    # Conversion de time_signature en numérique si besoin
-    if 'time_signature' in df.columns:
-        df['time_signature'] = df['time_signature'].astype(str).str.extract(r'(\d+)').astype(float)
     # Application des filtres
-    if 'tempo' in df.columns:
-        df = df[(df['tempo'] >= 23.82) & (df['tempo'] <= 208.20)]
-    if 'loudness' in df.columns:
-        df = df[df['loudness'] <= 0]
-    if 'speechiness' in df.columns:
-        df = df[df['speechiness'] <= 0.66]
-    if 'liveness' in df.columns:
-        df = df[df['liveness'] < 0.8]
-    if 'time_signature' in df.columns:
-        df = df[df['time_signature'].isin([2, 3, 4, 5])]
-    if 'duration_ms' in df.columns:
-        df = df[(df['duration_ms'] >= 60000) & (df['duration_ms'] <= 360000)]
+    df = df[quality_mask(df)]
+    df = df.reset_index(drop=True)
+    return df
+
+
+def _stream_columns(path: str) -> dict:
+    """Colonnes brutes d'une source à lire -> nom standardisé (comme standardize_columns)."""
+    header = pd.read_csv(path, nrows=0).columns
+    return {raw: COLUMN_MAPPING.get(raw, raw) for raw in header
+            if COLUMN_MAPPING.get(raw, raw) in BASE_COLUMNS and COLUMN_MAPPING.get(raw, raw) in CLEAN_COLUMNS}
+
+
+def iter_source_chunks(paths: list, chunksize: int = CHUNK_SIZE):
+    """
+    Lit les sources l'une après l'autre par morceaux, colonnes standardisées et
+    normalisées. L'index de chaque morceau est la position de la ligne dans la
+    concaténation des sources (celle du mode en mémoire).
+    """
+    mappings = [_stream_columns(path) for path in paths]
+    found = {std for mapping in mappings for std in mapping.values()}
+    columns = [col for col in CLEAN_COLUMNS if col in found]
+    position = 0
+    for path, mapping in zip(paths, mappings):
+        dtypes = {raw: str if std in TEXT_COLUMNS else STREAM_DTYPES.get(std, 'float64') for raw, std in mapping.items()}
+        for chunk in pd.read_csv(path, usecols=list(mapping), dtype=dtypes, chunksize=chunksize):
+            chunk = chunk.rename(columns=mapping).reindex(columns=columns)
+            chunk.index = pd.RangeIndex(position, position + len(chunk))
+            position += len(chunk)
+            yield normalize_rows(chunk)
+
+
+def _best_per_key(index: pd.DataFrame, keys: list) -> pd.DataFrame:
+    """Meilleure popularité par clé, première position à égalité (index trié par position)."""
+    best = index.groupby(keys, dropna=False, sort=False)['score'].idxmax()
+    return index[index.index.isin(best.to_numpy())]
+
+
+def create_clean_dataset_streaming(spotify_features_path: str, dataset_path: str, spotify_songs_path: str,
+                                   chunksize: int = CHUNK_SIZE) -> pd.DataFrame:
+    """
+    Même résultat que create_clean_dataset, en lisant les sources par morceaux.
+
+    Les dédoublonnages se font sur un index courant compact (clés, popularité,
+    position, filtre) qui ne garde que la meilleure ligne par track_id ; les
+    colonnes complètes ne sont conservées que pour ces gagnants s'ils passent
+    les filtres. La mémoire dépend du nombre de titres distincts, pas du
+    volume ni des doublons des sources. Un seul tri final, sur le résultat.
+
+    Parameters:
+    chunksize (int): Lignes lues à la fois par source.
+    """
+    return clean_sources([spotify_features_path, dataset_path, spotify_songs_path], chunksize)
+
+
+def clean_sources(paths: list, chunksize: int = CHUNK_SIZE) -> pd.DataFrame:
+    """Dataset propre (mode streaming) d'une liste quelconque d'exports, dans l'ordre donné."""
+    index, rows = None, None
+    with_missing = set()  # Colonnes entières où read_csv aurait produit des float (valeur manquante)
+    for chunk in iter_source_chunks(paths, chunksize):
+        with_missing |= {col for col in STREAM_DTYPES if col in chunk.columns and chunk[col].isna().any()}
+        keys = [col for col in ('track_id', 'artist', 'track_name') if col in chunk.columns]
+        chunk_index = chunk[keys].assign(
+            score=chunk['popularity'].astype('float64').fillna(-np.inf),
+            passes=quality_mask(chunk),
+        )
+        index = chunk_index if index is None else pd.concat([index, chunk_index])
+        if 'track_id' in keys:
+            index = _best_per_key(index, ['track_id'])
+        kept = chunk[chunk_index['passes'] & chunk.index.isin(index.index)]
+        rows = kept if rows is None else pd.concat([rows[rows.index.isin(index.index)], kept])
+
+    if {'artist', 'track_name'} <= set(index.columns):
+        index = _best_per_key(index, ['artist', 'track_name'])
+    df = rows[rows.index.isin(index.index[index['passes']])]
+    df = df.astype({col: 'float64' if col in with_missing else 'int64' for col in STREAM_DTYPES if col in df.columns})
+    df = df.sort_values('popularity', ascending=False, kind='stable')
     df = df.reset_index(drop=True)
     return df
 
 
+def merge_delta(existing: pd.DataFrame, new: pd.DataFrame):
+    """
+    Fusionne des lignes propres (voir clean_sources) dans le dataset existant,
+    sans changer l'ordre des lignes déjà présentes.
+
+    Mêmes règles que le nettoyage complet, la ligne déjà présente gagnant à
+    popularité égale :
+    - même track_id, meilleure popularité : la ligne est mise à jour sur place
+    - nouveau track_id, même (artist, track_name) qu'une ligne existante moins
+      populaire : il prend sa place (la ligne remplacée est indiquée)
+    - nouveau track_id sinon : ajouté en fin de dataset
+    - une mise à jour qui change (artist, track_name) peut rejoindre un autre
+      titre : la ligne la moins populaire des deux est retirée
+
+    Returns:
+    tuple: (dataset fusionné, DataFrame track_id / change / replaces).
+    """
+    merged = existing.reset_index(drop=True).copy()
+    new = new.reindex(columns=merged.columns)
+    # Entiers compacts relus du Parquet : élargis au type des lignes entrantes
+    for col in STREAM_DTYPES:
+        if col in merged.columns:
+            merged[col] = merged[col].astype(np.result_type(merged[col].dtype, new[col].dtype))
+    position = pd.Series(np.arange(len(merged)), index=merged['track_id'].to_numpy())
+
+    known = new['track_id'].isin(position.index)
+    updates = new[known]
+    slots = position[updates['track_id']].to_numpy()
+    better = (updates['popularity'].to_numpy(dtype=float) > merged['popularity'].iloc[slots].to_numpy(dtype=float))
+    updates, update_slots = updates[better], slots[better]
+
+    fresh = new[~known]
+    by_title = pd.Series(np.arange(len(merged)), index=pd.MultiIndex.from_frame(merged[['artist', 'track_name']]))
+    by_title = by_title[~by_title.index.duplicated()]
+    title_slots = by_title.reindex(pd.MultiIndex.from_frame(fresh[['artist', 'track_name']])).to_numpy()
+    same_title = ~np.isnan(title_slots)
+    title_slots = title_slots[same_title].astype(np.intp)
+    wins = (fresh['popularity'].to_numpy(dtype=float)[same_title]
+            > merged['popularity'].iloc[title_slots].to_numpy(dtype=float))
+    replacing, replace_slots = fresh[same_title][wins], title_slots[wins]
+    added = fresh[~same_title]
+
+    replaced_ids = merged['track_id'].iloc[replace_slots].to_numpy()
+    for rows, target in ((updates, update_slots), (replacing, replace_slots)):
+        for i, col in enumerate(merged.columns):
+            merged.iloc[target, i] = rows[col].to_numpy()
+    merged = pd.concat([merged, added], ignore_index=True)
+
+    titles = merged[['artist', 'track_name']].assign(score=merged['popularity'].astype('float64').fillna(-np.inf))
+    kept = merged.index.isin(_best_per_key(titles, ['artist', 'track_name']).index)
+    removed = merged['track_id'][~kept]
+    merged = merged[kept].reset_index(drop=True)
+
+    delta = pd.concat([
+        pd.DataFrame({'track_id': updates['track_id'], 'change': 'updated', 'replaces': None}),
+        pd.DataFrame({'track_id': replacing['track_id'], 'change': 'replaced', 'replaces': replaced_ids}),
+        pd.DataFrame({'track_id': added['track_id'], 'change': 'new', 'replaces': None}),
+    ], ignore_index=True)
+    delta = pd.concat([
+        delta[~delta['track_id'].isin(removed)],
+        pd.DataFrame({'track_id': removed.to_numpy(), 'change': 'removed', 'replaces': None}),
+    ], ignore_index=True)
+    return merged, delta
+
+
+def ingest(paths: list, name: str = "clean", chunksize: int = CHUNK_SIZE) -> pd.DataFrame:
+    """
+    Ingère de nouveaux exports dans le dataset propre existant, sans le reconstruire.
+
+    Les lignes existantes gardent leur ordre et les nouveaux titres sont
+    ajoutés à la fin. Les étapes en aval (albums.py, lyrics_enrichment.py,
+    lastfm_tags.py, tags.py) refont les batchs dont les lignes ont changé
+    (batch_merge.saved_batch) en reprenant les résultats des titres inchangés.
+    La liste des changements est écrite dans DELTA_FILE.
+    """
+    existing = read_table(name)
+    merged, delta = merge_delta(existing, clean_sources(paths, chunksize))
+    if len(delta):
+        write_table(merged, name)
+    delta.to_csv(DELTA_FILE, index=False)
+    counts = delta['change'].value_counts()
+    print(f"Ingestion : {counts.get('new', 0)} nouveaux, {counts.get('updated', 0)} mis à jour, "
+          f"{counts.get('replaced', 0)} remplacés, {counts.get('removed', 0)} retirés ({len(merged)} titres) "
+          f"→ {DELTA_FILE}")
+    return delta
+
+
 def save_clean_csv(spotify_features_path: str, dataset_path: str, spotify_songs_path: str, output_path: str = "clean.csv"):
     """
     Crée et sauvegarde le dataset propre dans un fichier CSV.
@@ -222,12 +431,25 @@ def save_clean_csv(spotify_features_path: str, dataset_path: str, spotify_songs_
     df.to_csv(output_path, index=False)
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Nettoyage et fusion des trois sources Spotify.")
+    parser.add_argument("--stream", action="store_true", help="Lecture par morceaux, mémoire bornée")
+    parser.add_argument("--chunksize", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--ingest", nargs="+", metavar="CSV", help="Nouveaux exports à fusionner dans clean existant")
+    args = parser.parse_args()
+
     # Chemins des fichiers (adaptez si besoin)
     spotify_features_path = "SpotifyFeatures.csv"
     dataset_path = "dataset.csv"
     spotify_songs_path = "spotify_songs.csv"
 
-    # Nettoyage et fusion
-    df = create_clean_dataset(spotify_features_path, dataset_path, spotify_songs_path)
-    df.to_csv("clean.csv", index=False)
-    print("Fichier clean.csv généré avec succès.")
\ No newline at end of file
+    if args.ingest:
+        # Ajout de nouveaux exports au dataset propre existant
+        ingest(args.ingest, chunksize=args.chunksize)
+    else:
+        # Nettoyage et fusion
+        if args.stream:
+            df = create_clean_dataset_streaming(spotify_features_path, dataset_path, spotify_songs_path, args.chunksize)
+        else:
+            df = create_clean_dataset(spotify_features_path, dataset_path, spotify_songs_path)
+        write_table(df, "clean")
+        print("Fichier clean.parquet (+ clean.csv) généré avec succès.")
@@ -0,0 +1,166 @@
+"""
+Format intermédiaire de la chaîne d'enrichissement.
+
+Chaque étape écrit un fichier Parquet typé et compressé (zstd), relu avec
+projection de colonnes : une étape qui n'a besoin que de quelques colonnes ne
+décode plus les paroles. Un export CSV est conservé pour compatibilité
+(CSV_EXPORT).
+
+Les tables gardent les noms des anciens CSV : "clean.csv" et "clean"
+désignent toutes deux clean.parquet (ou clean.csv s'il est plus récent).
+"""
+import os
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+CSV_EXPORT = True
+COMPRESSION = "zstd"
+
+# Colonnes à faible cardinalité stockées en dictionnaire / category
+CATEGORY_COLUMNS = ["genre", "mood", "activity", "era"]
+# Entiers réduits quand la colonne n'a pas de valeur manquante
+INT_COLUMNS = {"popularity": "int16", "duration_ms": "int32", "empowerment_hits": "int16"}
+
+
+def _stem(name: str) -> str:
+    for ext in (".csv", ".parquet"):
+        if name.endswith(ext):
+            return name[: -len(ext)]
+    return name
+
+
+def parquet_path(name: str) -> str:
+    return _stem(name) + ".parquet"
+
+
+def csv_path(name: str) -> str:
+    return _stem(name) + ".csv"
+
+
+def _use_parquet(name: str) -> bool:
+    """Parquet s'il existe et n'est pas plus ancien que le CSV (ex. CSV régénéré par un script de fusion)."""
+    pq_file, csv_file = parquet_path(name), csv_path(name)
+    if not os.path.exists(pq_file):
+        return False
+    return not os.path.exists(csv_file) or os.path.getmtime(pq_file) >= os.path.getmtime(csv_file)
+
+
+def table_file(name: str) -> str:
+    """Fichier effectivement lu par read_table pour cette table."""
+    return parquet_path(name) if _use_parquet(name) else csv_path(name)
+
+
+def table_columns(name: str) -> list:
+    """Colonnes d'une table, sans la charger."""
+    if _use_parquet(name):
+        return pq.read_schema(parquet_path(name)).names
+    return pd.read_csv(csv_path(name), nrows=0).columns.tolist()
+
+
+def table_rows(name: str) -> int:
+    """Nombre de lignes d'une table (métadonnées Parquet, sinon parcours du CSV)."""
+    if _use_parquet(name):
+        return pq.ParquetFile(parquet_path(name)).metadata.num_rows
+    first = pd.read_csv(csv_path(name), nrows=0).columns[:1].tolist()
+    return sum(len(chunk) for chunk in pd.read_csv(csv_path(name), usecols=first, chunksize=100000))
+
+
+def compact_dtypes(df: pd.DataFrame) -> pd.DataFrame:
+    """Types compacts : category pour CATEGORY_COLUMNS, entiers réduits pour INT_COLUMNS."""
+    df = df.copy(deep=False)
+    for col in CATEGORY_COLUMNS:
+        if col in df.columns and not isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype("category")
+    for col, dtype in INT_COLUMNS.items():
+        if col in df.columns and pd.api.types.is_numeric_dtype(df[col]) and df[col].notna().all():
+            if (df[col] % 1 == 0).all():
+                df[col] = df[col].astype(dtype)
+    return df
+
+
+def read_table(name: str, columns=None) -> pd.DataFrame:
+    """
+    Charge une table de la chaîne.
+
+    Parameters:
+    name (str): Nom de la table ("clean", "clean.csv"...).
+    columns (list): Colonnes à lire (toutes si None).
+    """
+    if _use_parquet(name):
+        return pd.read_parquet(parquet_path(name), columns=columns)
+    return pd.read_csv(csv_path(name), usecols=columns)
+
+
+def iter_table(name: str, chunksize: int, columns=None):
+    """Parcourt une table par morceaux de `chunksize` lignes (mémoire bornée)."""
+    if _use_parquet(name):
+        for batch in pq.ParquetFile(parquet_path(name)).iter_batches(batch_size=chunksize, columns=columns):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(csv_path(name), usecols=columns, chunksize=chunksize)
+
+
+def write_table(df: pd.DataFrame, name: str, csv: bool = None):
+    """
+    Écrit une table en Parquet (fichier temporaire puis renommage atomique),
+    plus un export CSV si `csv` (par défaut CSV_EXPORT), écrit en premier pour
+    que le Parquet reste la version la plus récente.
+    """
+    if CSV_EXPORT if csv is None else csv:
+        df.to_csv(csv_path(name), index=False)
+    tmp = parquet_path(name) + ".tmp"
+    compact_dtypes(df).to_parquet(tmp, index=False, compression=COMPRESSION)
+    os.replace(tmp, parquet_path(name))
+
+
+class TableWriter:
+    """
+    Écriture d'une table morceau par morceau (voir iter_table).
+
+    Le schéma est fixé par le premier morceau (ou par `schema`) ; les suivants y
+    sont convertis. Pas de compact_dtypes ici : les category et entiers réduits
+    varieraient d'un morceau à l'autre. Parquet encode de lui-même les chaînes
+    répétées en dictionnaire. Parquet et CSV sont écrits dans des fichiers
+    temporaires, renommés à la fermeture seulement (rien en cas d'erreur).
+    """
+
+    def __init__(self, name: str, csv: bool = None, schema: pa.Schema = None):
+        self.name = name
+        self.csv = CSV_EXPORT if csv is None else csv
+        self.schema = schema
+        self._tmp = parquet_path(name) + ".tmp"
+        self._writer = None
+        self._chunks = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        if exc_type is None:
+            self.close()
+        elif self._writer is not None:
+            self._writer.close()
+            os.remove(self._tmp)
+            if self.csv:
+                os.remove(csv_path(self.name) + ".tmp")
+
+    def write(self, df: pd.DataFrame):
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        if self._writer is None:
+            self._writer = pq.ParquetWriter(self._tmp, self.schema or table.schema, compression=COMPRESSION)
+        if table.schema != self._writer.schema:
+            table = table.cast(self._writer.schema)
+        self._writer.write_table(table)
+        if self.csv:
+            df.to_csv(csv_path(self.name) + ".tmp", index=False, mode="w" if self._chunks == 0 else "a",
+                      header=self._chunks == 0)
+        self._chunks += 1
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            if self.csv:
+                os.replace(csv_path(self.name) + ".tmp", csv_path(self.name))
+            os.replace(self._tmp, parquet_path(self.name))
@@ -1,7 +1,15 @@
+import string
+from itertools import chain
+
+import numpy as np
 import pandas as pd
 
-INPUT_CSV = "dataset_with_lyrics.csv"
-OUTPUT_CSV = "dataset_with_empowerment.csv"
+from dataset_io import iter_table, TableWriter
+from lyrics_store import lyrics_column
+
+INPUT_TABLE = "dataset_with_lyrics"
+OUTPUT_TABLE = "dataset_with_empowerment"
+CHUNK_SIZE = 20000  # Lignes lues à la fois : la mémoire reste bornée quel que soit le volume de paroles
 
 # === Mots-clés empowerment ===
 KEYWORDS = [
@@ -12,18 +20,51 @@ KEYWORDS = [
     "brave", "fearless", "confident", "survivor", "resilient"
 ]
 
-df = pd.read_csv(INPUT_CSV)
+# Correspondance sur mots entiers : "rise" ne matche plus "surprise" ni "power" "powerful".
+# Chaque forme (mot-clé ou pluriel simple : girls -> girl) pointe vers l'index de son mot-clé.
+KEYWORD_FORMS = {form: i for i, kw in enumerate(KEYWORDS) for form in (kw, kw + "s")}
+
+# Toute ponctuation (ASCII et typographique des paroles Genius) devient une frontière de mot
+WORD_SEPARATORS = str.maketrans({c: " " for c in string.punctuation + "’‘“”«»…–—¿¡"})
+
+
+def keyword_hits(lyrics: pd.Series) -> pd.DataFrame:
+    """
+    Compte les occurrences de chaque mot-clé dans chaque texte, en une passe
+    par texte (découpage en mots + lookup dans KEYWORD_FORMS).
+
+    Parameters:
+    lyrics (pd.Series): Paroles (NaN accepté).
+
+    Returns:
+    pd.DataFrame: Une colonne par mot-clé (ordre de KEYWORDS), même index que `lyrics`.
+    """
+    texts = lyrics.fillna("").astype(str).str.lower().str.translate(WORD_SEPARATORS)
+    found = [[KEYWORD_FORMS[w] for w in text.split() if w in KEYWORD_FORMS] for text in texts]
+    rows = np.repeat(np.arange(len(found)), [len(f) for f in found])
+    counts = np.zeros((len(found), len(KEYWORDS)), dtype=np.int32)
+    np.add.at(counts, (rows, np.fromiter(chain.from_iterable(found), dtype=np.intp, count=len(rows))), 1)
+    return pd.DataFrame(counts, index=lyrics.index, columns=KEYWORDS)
+
+
+def score_empowerment(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Ajoute empowerment (bool) et empowerment_hits (nombre de mots-clés distincts présents).
+    Paroles lues dans la colonne lyrics, ou dans lyrics_store via lyrics_ref.
+    """
+    lyrics = lyrics_column(df)
+    hits = (keyword_hits(lyrics) > 0).sum(axis=1) if lyrics is not None else 0
+    df["empowerment"] = hits > 0
+    df["empowerment_hits"] = hits
+    return df
 
-df["empowerment"] = False
-df["empowerment_hits"] = 0
 
-for idx, row in df.iterrows():
-    lyrics = str(row.get("lyrics", "")).lower()
-    hits = sum(1 for kw in KEYWORDS if kw in lyrics)
+def main():
+    with TableWriter(OUTPUT_TABLE) as writer:
+        for chunk in iter_table(INPUT_TABLE, CHUNK_SIZE):
+            writer.write(score_empowerment(chunk))
+    print(f"Fichier enrichi avec score empowerment → {OUTPUT_TABLE}")
 
-    if hits > 0:
-        df.at[idx, "empowerment"] = True
-        df.at[idx, "empowerment_hits"] = hits
 
-df.to_csv(OUTPUT_CSV, index=False)
-print(f"Fichier enrichi avec score empowerment → {OUTPUT_CSV}")
+if __name__ == "__main__":
+    main()
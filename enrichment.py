@@ -0,0 +1,179 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from tqdm import tqdm
+
+
+class TokenBucket:
+    """
+    Limiteur de débit partagé entre tous les threads d'enrichissement.
+
+    Parameters:
+    rate (float): Nombre de requêtes autorisées par seconde.
+    capacity (int): Taille du seau (rafale maximale), par défaut égale à rate.
+    """
+
+    def __init__(self, rate: float, capacity: int = None):
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(1, rate))
+        self._tokens = self.capacity
+        self._last = time.monotonic()
+        self._resume_at = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Bloque jusqu'à obtenir un jeton (et jusqu'à la fin d'une éventuelle pause 429)."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                if now < self._resume_at:
+                    wait = self._resume_at - now
+                else:
+                    self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+                    self._last = now
+                    if self._tokens >= 1:
+                        self._tokens -= 1
+                        return
+                    wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+    def pause(self, seconds: float):
+        """Suspend tous les appels pendant `seconds` (Retry-After renvoyé par l'API)."""
+        with self._lock:
+            self._resume_at = max(self._resume_at, time.monotonic() + seconds)
+            self._tokens = 0.0
+            self._last = self._resume_at
+
+
+class AdaptiveConcurrency:
+    """
+    Nombre de requêtes en vol ajusté aux réponses du serveur (AIMD) : +1
+    après `limit` succès d'affilée, divisé par deux sur une réponse 429 ou 5xx.
+
+    Parameters:
+    initial (int): Requêtes simultanées au départ.
+    minimum (int): Plancher après les replis.
+    maximum (int): Plafond (taille du pool de threads et de connexions).
+    """
+
+    def __init__(self, initial: int = 4, minimum: int = 1, maximum: int = 16):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.limit = float(min(max(initial, minimum), maximum))
+        self.backoffs = 0
+        self._in_flight = 0
+        self._successes = 0
+        self._cond = threading.Condition()
+
+    def acquire(self):
+        with self._cond:
+            while self._in_flight >= int(self.limit):
+                self._cond.wait()
+            self._in_flight += 1
+
+    def release(self, overloaded: bool = False):
+        """Fin d'un appel ; overloaded=True si le serveur a répondu 429 ou 5xx."""
+        with self._cond:
+            self._in_flight -= 1
+            if overloaded:
+                self.limit = max(self.minimum, self.limit / 2)
+                self._successes = 0
+                self.backoffs += 1
+            else:
+                self._successes += 1
+                if self._successes >= self.limit:
+                    self.limit = min(self.maximum, self.limit + 1)
+                    self._successes = 0
+            self._cond.notify_all()
+
+
+def http_status(exc: Exception):
+    """Code HTTP porté par une exception spotipy (http_status) ou requests (response)."""
+    status = getattr(exc, "http_status", None)
+    if status is None and getattr(exc, "response", None) is not None:
+        status = exc.response.status_code
+    return status
+
+
+def retry_after_seconds(exc: Exception, default: float = 1.0) -> float:
+    """Lit l'en-tête Retry-After d'une réponse 429, avec une valeur par défaut."""
+    headers = getattr(exc, "headers", None)
+    if not headers and getattr(exc, "response", None) is not None:
+        headers = exc.response.headers
+    try:
+        return max(float((headers or {}).get("Retry-After", default)), 0.0)
+    except (TypeError, ValueError):
+        return default
+
+
+def call_with_limit(fn, limiter: TokenBucket, *args, max_retries: int = 5, adaptive: AdaptiveConcurrency = None):
+    """
+    Appelle fn(*args) sous le limiteur. Une réponse 429 met tout le limiteur
+    en pause pendant Retry-After puis l'appel est rejoué. Sans limiteur
+    (limiter=None), fn gère lui-même le débit (ex. ResponseCache.wrap).
+
+    Avec `adaptive`, l'appel occupe une place de la fenêtre de concurrence,
+    et les 429/5xx la réduisent ; les 5xx sont alors aussi rejoués, après un
+    délai exponentiel.
+    """
+    for attempt in range(max_retries + 1):
+        if limiter is None and adaptive is None:
+            return fn(*args)
+        if adaptive is not None:
+            adaptive.acquire()
+        try:
+            if limiter is not None:
+                limiter.acquire()
+            result = fn(*args)
+        except Exception as e:
+            status = http_status(e)
+            overloaded = status == 429 or (adaptive is not None and status is not None and status >= 500)
+            if adaptive is not None:
+                adaptive.release(overloaded)
+            if not overloaded or attempt == max_retries:
+                raise
+            if status == 429 and limiter is not None:
+                limiter.pause(retry_after_seconds(e))
+            else:
+                time.sleep(retry_after_seconds(e, default=min(0.5 * 2 ** attempt, 8)))
+            continue
+        if adaptive is not None:
+            adaptive.release()
+        return result
+
+
+def run_concurrent(fetch, jobs, limiter: TokenBucket, concurrency: int = 8,
+                   default=None, desc: str = None, max_retries: int = 5,
+                   return_exceptions: bool = False, on_result=None, adaptive: AdaptiveConcurrency = None) -> dict:
+    """
+    Exécute fetch(*args) pour chaque (clé, args) de `jobs` avec au plus
+    `concurrency` requêtes en vol, toutes soumises au même limiteur.
+    on_result(clé, résultat ou exception), si fourni, est appelé dès qu'un
+    appel se termine (journal.py), depuis le thread appelant. Avec `adaptive`,
+    les requêtes en vol suivent sa fenêtre (au plus adaptive.maximum).
+
+    Returns:
+    dict: clé -> résultat. Si l'appel a échoué : l'exception elle-même quand
+    return_exceptions=True, sinon `default`.
+    """
+    jobs = list(jobs)
+    results = {}
+    if adaptive is not None:
+        concurrency = adaptive.maximum
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        futures = {
+            pool.submit(call_with_limit, fetch, limiter, *args, max_retries=max_retries, adaptive=adaptive): key
+            for key, args in jobs
+        }
+        for future in tqdm(as_completed(futures), total=len(futures), desc=desc, disable=desc is None):
+            key = futures[future]
+            try:
+                result = results[key] = future.result()
+            except Exception as e:
+                print(f"Erreur pour {key} : {e}")
+                result = e
+                results[key] = e if return_exceptions else default
+            if on_result is not None:
+                on_result(key, result)
+    return results
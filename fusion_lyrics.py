@@ -1,12 +1,27 @@
-import pandas as pd
-import glob
+from batch_merge import merge_batches, merge_summary
+from dataset_io import table_rows
+from lyrics_index import update_index
+from lyrics_store import STORE_DIR, LyricsStore
 
-# Chemin vers tous tes batchs
-batch_files = glob.glob("lyrics_batches/batch_*.csv")
+# === CONFIG (importée par lyrics_enrichment.py : les batchs sont vérifiés avec les mêmes valeurs) ===
+INPUT_TABLE = "dataset_avec_genres_ml"
+OUTPUT_DIR = "lyrics_batches"
+BATCH_PATTERN = f"{OUTPUT_DIR}/batch_*.csv"
+BATCH_SIZE = 500
+OUTPUT_TABLE = "dataset_with_lyrics"  # Paroles versées dans le store (STORE_DIR), la table ne garde que lyrics_ref
 
-dfs = [pd.read_csv(f) for f in batch_files]
-final_df = pd.concat(dfs, ignore_index=True)
 
-# Sauvegarde unique finale
-final_df.to_csv("dataset_with_lyrics.csv", index=False)
-print("Dataset final enrichi sauvegardé sous : dataset_with_lyrics.csv")
+def main():
+    # Batchs dans l'ordre, un par un, vérifiés contre la taille de la table source
+    with LyricsStore(STORE_DIR) as store:
+        stats = merge_batches(BATCH_PATTERN, OUTPUT_TABLE, expected_rows=table_rows(INPUT_TABLE),
+                              batch_size=BATCH_SIZE, transform=store.externalize)
+        s = store.stats()
+        # Index inversé : seules les paroles ajoutées par cette fusion sont découpées
+        update_index(store)
+    print(f"Dataset final enrichi sauvegardé sous : {OUTPUT_TABLE} ({merge_summary(stats)})")
+    print(f"Paroles → {STORE_DIR} : {s['blobs']} textes distincts, {s['compressed_bytes'] / 1e6:.1f} Mo compressés")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,15 @@
-import pandas as pd
-import glob
-
-batch_files = glob.glob("lastfm_batches/lastfm_batch_*.csv")
-dfs = [pd.read_csv(f) for f in batch_files]
-final_df = pd.concat(dfs, ignore_index=True)
-final_df.to_csv("dataset_with_lastfm_tags.csv", index=False)
-print("Fusion finale → dataset_with_lastfm_tags.csv")
+from batch_merge import merge_batches, merge_summary
+from dataset_io import table_rows
+from lastfm_tags import BATCH_SIZE, INPUT_TABLE, OUTPUT_DIR
+
+BATCH_PATTERN = f"{OUTPUT_DIR}/lastfm_batch_*.csv"
+OUTPUT_TABLE = "dataset_with_lastfm_tags"
+
+
+def main():
+    stats = merge_batches(BATCH_PATTERN, OUTPUT_TABLE, expected_rows=table_rows(INPUT_TABLE), batch_size=BATCH_SIZE)
+    print(f"Fusion finale → {OUTPUT_TABLE} ({merge_summary(stats)})")
+
+
+if __name__ == "__main__":
+    main()
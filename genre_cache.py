@@ -0,0 +1,177 @@
+"""
+Cache des genres d'artistes Spotify, stocké en SQLite.
+
+Remplace artist_genre_cache.json : chaque résultat est écrit dans sa propre
+transaction (journal WAL, donc pas de fichier corrompu en cas de crash), les
+lookups se font par clé, et chaque entrée garde sa date de récupération et son
+statut pour être rafraîchie selon un TTL.
+
+Le JSON historique est importé automatiquement à la première ouverture
+(open_genre_cache, base vide), ou à la main :
+    python genre_cache.py import artist_genre_cache.json
+"""
+import argparse
+import json
+import os
+import sqlite3
+import time
+
+DB_FILE = "artist_genre_cache.sqlite"
+LEGACY_JSON = "artist_genre_cache.json"  # Cache historique versionné, importé une seule fois
+
+STATUS_OK = "ok"                # Artiste trouvé ; genres peut être une liste vide
+STATUS_NOT_FOUND = "not_found"  # La recherche n'a renvoyé aucun artiste
+STATUS_FAILED = "failed"        # Erreur réseau / API : à retenter
+
+DAY = 24 * 3600
+TTL = {
+    STATUS_OK: 180 * DAY,
+    STATUS_NOT_FOUND: 30 * DAY,
+    STATUS_FAILED: 0,
+}
+
+SQL_BATCH = 500  # Taille des clauses IN (...) pour rester sous la limite de variables SQLite
+
+
+class GenreCache:
+    """
+    Parameters:
+    path (str): Chemin de la base SQLite (créée si absente).
+    """
+
+    def __init__(self, path: str = DB_FILE):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            """CREATE TABLE IF NOT EXISTS artist_genres (
+                   artist TEXT PRIMARY KEY,
+                   genres TEXT NOT NULL,
+                   status TEXT NOT NULL,
+                   fetched_at REAL NOT NULL,
+                   attempts INTEGER NOT NULL DEFAULT 0,
+                   error TEXT
+               )"""
+        )
+        self.conn.commit()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.conn.close()
+
+    def __len__(self):
+        return self.conn.execute("SELECT COUNT(*) FROM artist_genres").fetchone()[0]
+
+    def _select(self, columns, artists):
+        artists = list(artists)
+        for start in range(0, len(artists), SQL_BATCH):
+            chunk = artists[start:start + SQL_BATCH]
+            placeholders = ",".join("?" * len(chunk))
+            yield from self.conn.execute(
+                f"SELECT {columns} FROM artist_genres WHERE artist IN ({placeholders})", chunk
+            )
+
+    def get(self, artist: str):
+        """Genres connus de l'artiste, ou None s'il est absent du cache ou en échec."""
+        return self.get_many([artist]).get(artist)
+
+    def get_many(self, artists) -> dict:
+        """
+        Returns:
+        dict: artiste -> liste de genres, pour les artistes connus (statut ok ou not_found).
+        """
+        return {
+            artist: json.loads(genres)
+            for artist, genres, status in self._select("artist, genres, status", artists)
+            if status != STATUS_FAILED
+        }
+
+    def as_dict(self) -> dict:
+        rows = self.conn.execute("SELECT artist, genres FROM artist_genres WHERE status != ?", (STATUS_FAILED,))
+        return {artist: json.loads(genres) for artist, genres in rows}
+
+    def artists_to_fetch(self, artists, now: float = None) -> list:
+        """Artistes absents du cache, en échec, ou dont l'entrée a dépassé son TTL."""
+        now = time.time() if now is None else now
+        fresh = {
+            artist
+            for artist, status, fetched_at in self._select("artist, status, fetched_at", artists)
+            if now - fetched_at < TTL.get(status, 0)
+        }
+        return [a for a in artists if a not in fresh]
+
+    def put_many(self, genres_by_artist: dict, status: str = STATUS_OK, fetched_at: float = None):
+        """Enregistre des résultats de lookup (une transaction pour tout le lot)."""
+        fetched_at = time.time() if fetched_at is None else fetched_at
+        with self.conn:
+            self.conn.executemany(
+                """INSERT INTO artist_genres (artist, genres, status, fetched_at, attempts, error)
+                   VALUES (?, ?, ?, ?, 1, NULL)
+                   ON CONFLICT(artist) DO UPDATE SET
+                       genres = excluded.genres, status = excluded.status,
+                       fetched_at = excluded.fetched_at, attempts = attempts + 1, error = NULL""",
+                [(artist, json.dumps(genres or []), status, fetched_at) for artist, genres in genres_by_artist.items()],
+            )
+
+    def put(self, artist: str, genres, status: str = STATUS_OK):
+        self.put_many({artist: genres}, status)
+
+    def record_failures(self, errors_by_artist: dict):
+        """Marque des lookups en échec. Les genres déjà connus sont conservés, mais l'entrée sera retentée."""
+        now = time.time()
+        with self.conn:
+            self.conn.executemany(
+                """INSERT INTO artist_genres (artist, genres, status, fetched_at, attempts, error)
+                   VALUES (?, '[]', ?, ?, 1, ?)
+                   ON CONFLICT(artist) DO UPDATE SET
+                       status = CASE WHEN status = 'ok' THEN status ELSE excluded.status END,
+                       fetched_at = CASE WHEN status = 'ok' THEN fetched_at ELSE excluded.fetched_at END,
+                       attempts = attempts + 1, error = excluded.error""",
+                [(artist, STATUS_FAILED, now, str(error)) for artist, error in errors_by_artist.items()],
+            )
+
+    def import_json(self, json_path: str) -> int:
+        """
+        Importe un artist_genre_cache.json historique (artiste -> genres).
+
+        Les listes non vides sont datées du fichier JSON. Les listes vides
+        mélangeaient "aucun genre" et "lookup échoué" : elles sont importées
+        avec une date nulle pour être revérifiées au prochain passage.
+        """
+        with open(json_path, "r") as f:
+            legacy = json.load(f)
+        mtime = os.path.getmtime(json_path)
+        self.put_many({a: g for a, g in legacy.items() if g}, STATUS_OK, fetched_at=mtime)
+        self.put_many({a: g for a, g in legacy.items() if not g}, STATUS_OK, fetched_at=0.0)
+        return len(legacy)
+
+
+def open_genre_cache(path: str = DB_FILE, legacy_json: str = LEGACY_JSON) -> GenreCache:
+    """Cache SQLite ; si la base est vide et que l'ancien JSON existe, il est importé d'abord."""
+    cache = GenreCache(path)
+    if len(cache) == 0:
+        if legacy_json and os.path.exists(legacy_json):
+            print(f"Import de {legacy_json} : {cache.import_json(legacy_json)} artistes")
+        else:
+            print(f"Attention : cache de genres {path} vide (lancer artist_genre.py), "
+                  f"les règles classeront tout en \"Autre\"")
+    return cache
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cache SQLite des genres d'artistes")
+    sub = parser.add_subparsers(dest="command", required=True)
+    imp = sub.add_parser("import", help="Importer un cache JSON historique")
+    imp.add_argument("json_path", nargs="?", default=LEGACY_JSON)
+    imp.add_argument("--db", default=DB_FILE)
+    args = parser.parse_args()
+
+    with GenreCache(args.db) as cache:
+        n = cache.import_json(args.json_path)
+        print(f"{n} artistes importés depuis {args.json_path} → {args.db}")
@@ -0,0 +1,197 @@
+"""
+Journal d'enrichissement ligne à ligne (JSONL, ajout seul), clé track_id.
+
+Chaque résultat est écrit dès qu'il est obtenu, avant la sauvegarde du
+batch : un crash, un Ctrl-C ou un jeton expiré ne perd que les requêtes en
+vol. Au démarrage le fichier est relu une fois (dernière entrée par clé,
+ligne tronquée par un crash ignorée), puis chaque ligne se reprend par une
+simple recherche dans un dict.
+
+Statuts :
+- ok : valeur trouvée
+- not_found : l'API n'a rien (définitif)
+- failed : erreur (réseau, 429, jeton...) avec sa raison et le nombre
+  d'essais ; retentée selon la politique (MAX_ATTEMPTS, RETRY_AFTER)
+
+Une entrée peut garder la requête qui l'a produite (ex. "artiste|titre") :
+si la ligne du dataset a changé depuis (clean.py --ingest), elle est à refaire.
+
+    python journal.py lyrics_batches/journal.jsonl            # résumé
+    python journal.py lyrics_batches/journal.jsonl --compact  # une ligne par clé
+"""
+import argparse
+import json
+import os
+import threading
+import time
+from collections import Counter
+
+STATUS_OK = "ok"
+STATUS_NOT_FOUND = "not_found"
+STATUS_FAILED = "failed"
+
+MAX_ATTEMPTS = 3  # Essais avant d'abandonner une ligne en échec
+RETRY_AFTER = 0   # Délai minimal (secondes) avant de retenter un échec ; 0 = au run suivant
+
+
+def batch_keys(df, key: str = "track_id"):
+    """Clés de journal des lignes : track_id, ou "artiste|titre" à défaut."""
+    fallback = df["artist"].astype(str) + "|" + df["track_name"].astype(str)
+    if key not in df.columns:
+        return fallback
+    ids = df[key]
+    return ids.where(ids.map(lambda v: isinstance(v, str) and v != ""), fallback)
+
+
+class Journal:
+    """
+    Parameters:
+    path (str): Fichier JSONL (créé si absent).
+    max_attempts (int): Essais maximum d'une ligne en échec.
+    retry_after (float): Délai avant de retenter une ligne en échec.
+    fsync (bool): Forcer l'écriture disque à chaque entrée (survit à un arrêt machine).
+    """
+
+    def __init__(self, path: str, max_attempts: int = MAX_ATTEMPTS, retry_after: float = RETRY_AFTER,
+                 fsync: bool = True):
+        self.path = path
+        self.max_attempts = max_attempts
+        self.retry_after = retry_after
+        self.fsync = fsync
+        self.started = time.time()
+        self._entries = {}
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            self._entries = self._replay(path)
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._file = open(path, "a", encoding="utf-8")
+
+    @staticmethod
+    def _replay(path: str) -> dict:
+        entries = {}
+        complete = 0  # Fin de la dernière ligne entière
+        with open(path, "rb") as f:
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break  # Dernière ligne coupée par un crash
+                complete += len(line)
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                entries[entry["key"]] = entry
+        if complete < os.path.getsize(path):
+            # Sinon la prochaine entrée serait collée à la ligne coupée, et perdue
+            os.truncate(path, complete)
+        return entries
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        with self._lock:
+            if not self._file.closed:
+                self._file.close()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def get(self, key) -> dict:
+        """Dernière entrée de la clé (key, status, value, reason, attempts, at), ou None."""
+        return self._entries.get(key)
+
+    def value(self, key, default=None):
+        entry = self._entries.get(key)
+        return entry["value"] if entry is not None and entry["status"] == STATUS_OK else default
+
+    def retryable(self, entry: dict, now: float = None) -> bool:
+        """Échec à retenter : essais restants, délai écoulé, et pas déjà tenté pendant ce run."""
+        now = time.time() if now is None else now
+        return (entry["status"] == STATUS_FAILED and entry["attempts"] < self.max_attempts
+                and entry["at"] < self.started and now - entry["at"] >= self.retry_after)
+
+    def pending(self, key, now: float = None, query: str = None) -> bool:
+        """La ligne est à (re)traiter : jamais vue, obtenue pour une autre requête, ou échec retentable."""
+        entry = self._entries.get(key)
+        return (entry is None or self.retryable(entry, now)
+                or query is not None and entry.get("query", query) != query)
+
+    def retry_due(self, key, now: float = None) -> bool:
+        """La ligne a échoué et doit être retentée (un batch déjà sauvegardé est alors refait)."""
+        entry = self._entries.get(key)
+        return entry is not None and self.retryable(entry, now)
+
+    def _append(self, entry: dict):
+        line = json.dumps(entry, ensure_ascii=False) + "\n"
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+            if self.fsync:
+                os.fsync(self._file.fileno())
+            self._entries[entry["key"]] = entry
+
+    def _attempts(self, key, query: str = None) -> int:
+        previous = self._entries.get(key)
+        same = previous is not None and (query is None or previous.get("query", query) == query)
+        return (previous["attempts"] if same else 0) + 1
+
+    def record(self, key, value=None, status: str = STATUS_OK, query: str = None):
+        """Résultat obtenu pour la clé (None ou "" = not_found), pour la requête `query` si donnée."""
+        if status == STATUS_OK and (value is None or value == ""):
+            status = STATUS_NOT_FOUND
+        entry = {"key": key, "status": status, "value": value if status == STATUS_OK else None,
+                 "reason": None, "attempts": self._attempts(key, query), "at": time.time()}
+        self._append(entry if query is None else {**entry, "query": query})
+
+    def record_failure(self, key, error, query: str = None):
+        """Échec explicite : raison (type et message de l'erreur) et nombre d'essais."""
+        reason = f"{type(error).__name__}: {error}" if isinstance(error, BaseException) else str(error)
+        entry = {"key": key, "status": STATUS_FAILED, "value": None, "reason": reason[:300],
+                 "attempts": self._attempts(key, query), "at": time.time()}
+        self._append(entry if query is None else {**entry, "query": query})
+
+    def counts(self) -> Counter:
+        return Counter(entry["status"] for entry in self._entries.values())
+
+    def failure_reasons(self, top: int = 5) -> list:
+        """Raisons d'échec les plus fréquentes (message tronqué pour regrouper)."""
+        return Counter(entry["reason"][:80] for entry in self._entries.values()
+                       if entry["status"] == STATUS_FAILED).most_common(top)
+
+    def summary(self) -> str:
+        counts = self.counts()
+        text = (f"Journal {self.path} : {counts[STATUS_OK]} ok, {counts[STATUS_NOT_FOUND]} introuvables, "
+                f"{counts[STATUS_FAILED]} en échec")
+        for reason, n in self.failure_reasons():
+            text += f"\n  {n:6} x {reason}"
+        return text
+
+    def compact(self):
+        """Réécrit le journal avec une seule entrée par clé (fichier temporaire puis renommage)."""
+        with self._lock:
+            tmp = self.path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                for entry in self._entries.values():
+                    f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            self._file.close()
+            os.replace(tmp, self.path)
+            self._file = open(self.path, "a", encoding="utf-8")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Journal d'enrichissement (JSONL)")
+    parser.add_argument("path")
+    parser.add_argument("--compact", action="store_true", help="Une seule ligne par track_id")
+    args = parser.parse_args()
+
+    with Journal(args.path) as journal:
+        print(journal.summary())
+        if args.compact:
+            journal.compact()
+            print(f"Compacté : {len(journal)} lignes")
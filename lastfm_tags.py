@@ -0,0 +1,208 @@
+"""
+Tags Last.fm de chaque titre (colonne lastfm_tags lue par tags.py).
+
+Écrit lastfm_batches/lastfm_batch_XXXX.csv, fusionnés ensuite par fusion_tag.py.
+- une requête track.getTopTags par couple (artiste, titre) distinct, en
+  parallèle sous le limiteur de débit partagé (enrichment.py)
+- titre sans tags : repli sur artist.getTopTags, une requête par artiste
+- réponses dans le cache partagé (response_cache.py), par titre et par
+  artiste : un run interrompu reprend sans redemander les lignes résolues
+- poids des tags conservés (lastfm_tag_weights, JSON tag -> poids 0-100)
+- lignes en erreur (lastfm_tag_source = "error") retentées au run suivant,
+  même dans un batch déjà écrit
+
+Le client HTTP (LastfmClient) prend l'URL de l'API en paramètre : voir
+benchmarks/fake_lastfm.py pour un serveur local.
+"""
+import json
+import os
+
+import dotenv
+import pandas as pd
+
+from batch_merge import remove_extra_batches, saved_batch
+from dataset_io import read_table
+from enrichment import TokenBucket, run_concurrent
+from response_cache import format_stats, normalize, open_cache
+from spotify_api import pooled_session
+
+# === CONFIG ===
+INPUT_TABLE = "dataset_with_empowerment"
+OUTPUT_DIR = "lastfm_batches"
+API_ROOT = "https://ws.audioscrobbler.com/2.0/"
+
+BATCH_SIZE = 500
+CONCURRENCY = 8
+REQUESTS_PER_SECOND = 5  # Limite conseillée par Last.fm
+MAX_TAGS = 10            # Tags gardés par titre, par poids décroissant
+MIN_WEIGHT = 5           # Poids Last.fm minimum (0-100) pour garder un tag
+
+LASTFM_COLUMNS = ["lastfm_tags", "lastfm_tag_weights", "lastfm_tag_source"]
+SOURCE_TRACK, SOURCE_ARTIST, SOURCE_NONE, SOURCE_ERROR = "track", "artist", "none", "error"
+LASTFM_STATUS = {29: 429, 11: 503, 16: 503}  # Codes d'erreur Last.fm -> statut HTTP équivalent
+
+
+class LastfmError(Exception):
+    """Erreur renvoyée dans le corps de la réponse ; http_status / headers lus par call_with_limit."""
+
+    def __init__(self, code: int, message: str, http_status: int = None):
+        super().__init__(f"Last.fm {code} : {message}")
+        self.code = code
+        self.http_status = http_status or LASTFM_STATUS.get(code)
+        self.headers = {}
+
+
+class LastfmClient:
+    """
+    Parameters:
+    api_key (str): Clé API Last.fm (LASTFM_API_KEY du .env par défaut).
+    root (str): URL de l'API (ex. serveur factice local).
+    session (requests.Session): Session HTTP, poolée par défaut.
+    """
+
+    def __init__(self, api_key: str = None, root: str = API_ROOT, session=None, timeout: float = 15):
+        if api_key is None:
+            dotenv.load_dotenv()
+            api_key = os.getenv("LASTFM_API_KEY")
+            if not api_key:
+                raise ValueError("Clé Last.fm API manquante. Vérifie ton .env !")
+        self.api_key = api_key
+        self.root = root
+        self.session = session or pooled_session(CONCURRENCY)
+        self.timeout = timeout
+
+    def _top_tags(self, **params):
+        """[[tag, poids], ...] ou None si l'artiste / le titre est inconnu de Last.fm."""
+        response = self.session.get(self.root, params={**params, "api_key": self.api_key, "format": "json"},
+                                    timeout=self.timeout)
+        try:
+            payload = response.json()
+        except ValueError:
+            payload = {}
+        if "error" in payload:
+            if payload["error"] == 6:  # Artiste / titre introuvable
+                return None
+            error = LastfmError(payload["error"], payload.get("message", ""),
+                                response.status_code if response.status_code >= 400 else None)
+            error.headers = response.headers
+            raise error
+        response.raise_for_status()
+        tags = payload.get("toptags", {}).get("tag", [])
+        if isinstance(tags, dict):  # Un seul tag : objet au lieu de liste
+            tags = [tags]
+        return [[t["name"], int(t.get("count", 0))] for t in tags]
+
+    def track_top_tags(self, artist: str, track: str):
+        return self._top_tags(method="track.gettoptags", artist=artist, track=track, autocorrect=1)
+
+    def artist_top_tags(self, artist: str):
+        return self._top_tags(method="artist.gettoptags", artist=artist, autocorrect=1)
+
+
+def keep_tags(tags) -> list:
+    """Tags au-dessus de MIN_WEIGHT, MAX_TAGS au plus, par poids décroissant."""
+    kept = sorted((t for t in tags or [] if t[1] >= MIN_WEIGHT), key=lambda t: -t[1])
+    return kept[:MAX_TAGS]
+
+
+def fetch_tags(rows: pd.DataFrame, client, cache, limiter, concurrency: int = CONCURRENCY, desc: str = None) -> pd.DataFrame:
+    """
+    lastfm_tags, lastfm_tag_weights et lastfm_tag_source pour chaque ligne (artist, track_name).
+
+    Une requête par couple (artiste, titre) normalisé distinct, puis une par
+    artiste distinct pour les titres sans tags.
+    """
+    artists = rows["artist"].fillna("").astype(str)
+    titles = rows["track_name"].fillna("").astype(str)
+    track_keys = pd.Series(list(zip(artists.map(normalize), titles.map(normalize))), index=rows.index)
+    artist_keys = artists.map(normalize)
+
+    # Un couple distinct = un appel ; les lignes reprennent le résultat de leur couple
+    first = ~track_keys.duplicated()
+    track_fetch = cache.wrap(client.track_top_tags, "lastfm", "track.gettoptags", lambda a, t: (a, t), limiter)
+    jobs = [(track_keys[i], (artists[i], titles[i])) for i in rows.index[first]]
+    by_track = run_concurrent(track_fetch, jobs, None, concurrency=concurrency, desc=desc, return_exceptions=True)
+
+    tags = track_keys.map(lambda k: by_track[k])
+    source = tags.map(lambda t: SOURCE_ERROR if isinstance(t, Exception) else SOURCE_TRACK if keep_tags(t) else SOURCE_NONE)
+
+    # Repli artiste : une requête par artiste, partagée par tous ses titres sans tags
+    fallback = source == SOURCE_NONE
+    first = artist_keys[fallback & (artist_keys != "")].drop_duplicates().index
+    artist_fetch = cache.wrap(client.artist_top_tags, "lastfm", "artist.gettoptags", lambda a: (a,), limiter)
+    jobs = [(artist_keys[i], (artists[i],)) for i in first]
+    by_artist = run_concurrent(artist_fetch, jobs, None, concurrency=concurrency, return_exceptions=True)
+
+    artist_tags = artist_keys[fallback].map(lambda k: by_artist.get(k))
+    tags[fallback] = artist_tags
+    source[fallback] = artist_tags.map(
+        lambda t: SOURCE_ERROR if isinstance(t, Exception) else SOURCE_ARTIST if keep_tags(t) else SOURCE_NONE)
+
+    kept = tags.map(lambda t: [] if isinstance(t, Exception) else keep_tags(t))
+    return pd.DataFrame({
+        "lastfm_tags": kept.map(lambda ts: ", ".join(name for name, _ in ts)),
+        "lastfm_tag_weights": kept.map(lambda ts: json.dumps(dict(ts), ensure_ascii=False)),
+        "lastfm_tag_source": source,
+    }, index=rows.index)
+
+
+def rows_to_fetch(batch: pd.DataFrame) -> pd.Index:
+    """Lignes jamais traitées ou en erreur."""
+    if "lastfm_tag_source" not in batch.columns:
+        return batch.index
+    source = batch["lastfm_tag_source"].fillna("")
+    return batch.index[(source == "") | (source == SOURCE_ERROR)]
+
+
+def enrich_batch(batch, client, cache, limiter, concurrency=CONCURRENCY, desc=None):
+    """Complète les colonnes Last.fm des lignes à traiter du batch (voir rows_to_fetch)."""
+    for col in LASTFM_COLUMNS:
+        if col not in batch.columns:
+            batch[col] = ""
+        batch[col] = batch[col].fillna("").astype(object)
+    todo = rows_to_fetch(batch)
+    if len(todo):
+        batch.loc[todo, LASTFM_COLUMNS] = \
+            fetch_tags(batch.loc[todo], client, cache, limiter, concurrency, desc)
+    return batch
+
+
+def main(client=None, cache=None):
+    client = client or LastfmClient()
+    cache = cache or open_cache()
+    limiter = TokenBucket(REQUESTS_PER_SECOND)
+
+    # === Charger dataset ===
+    df = read_table(INPUT_TABLE)
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+
+    # === Boucle par lots ===
+    for batch_num, start_idx in enumerate(range(0, len(df), BATCH_SIZE)):
+        end_idx = min(start_idx + BATCH_SIZE, len(df))
+        batch_file = os.path.join(OUTPUT_DIR, f"lastfm_batch_{batch_num:04d}.csv")
+
+        # Batch déjà écrit : on ne reprend que ses lignes en erreur, ou nouvelles (ingestion)
+        batch = df.iloc[start_idx:end_idx].copy()
+        unchanged, saved = saved_batch(batch_file, batch, LASTFM_COLUMNS)
+        for col in saved.columns:
+            batch[col] = saved[col]
+        todo = rows_to_fetch(batch)
+        if unchanged and len(todo) == 0:
+            continue
+        if len(saved):
+            print(f"Reprise batch {batch_num} : {len(todo)} lignes à traiter")
+        else:
+            print(f"Traitement batch {batch_num} : lignes {start_idx} à {end_idx}")
+
+        enrich_batch(batch, client, cache, limiter, desc=f"Batch {batch_num}")
+        batch.to_csv(batch_file, index=False)
+        errors = (batch["lastfm_tag_source"] == SOURCE_ERROR).sum()
+        print(f"Batch {batch_num} sauvegardé → {batch_file}" + (f" ({errors} lignes en erreur)" if errors else ""))
+
+    remove_extra_batches(os.path.join(OUTPUT_DIR, "lastfm_batch_*.csv"), len(df), BATCH_SIZE)
+    print("Tous les lots sont traités ! Lance fusion_tag.py pour finaliser.")
+    print(format_stats(cache))
+
+
+if __name__ == "__main__":
+    main()
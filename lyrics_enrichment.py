@@ -1,85 +1,261 @@
-import pandas as pd
-import lyricsgenius
-import dotenv
 import os
-import time
-from tqdm import tqdm  
-import glob
+import re
+from collections import defaultdict
 
+from bs4 import BeautifulSoup, SoupStrainer
+from lyricsgenius import Genius
+from lyricsgenius.utils import clean_str
+
+import fusion_lyrics
+from batch_merge import remove_extra_batches, saved_batch
+from dataset_io import read_table
+from enrichment import AdaptiveConcurrency, TokenBucket, run_concurrent
+from fusion_lyrics import BATCH_PATTERN, BATCH_SIZE, INPUT_TABLE, OUTPUT_DIR  # Mêmes batchs que la fusion
+from journal import Journal, batch_keys
+from response_cache import cache_key, format_stats, open_cache
+from spotify_api import pooled_session
 
-dotenv.load_dotenv()
 
 # === CONFIG ===
-INPUT_CSV = "dataset_avec_genres_ml.csv"
-OUTPUT_DIR = "lyrics_batches"
-GENIUS_API_TOKEN = os.getenv("GENIUS_API_KEY")
-BATCH_SIZE = 500
-PAUSE_SECONDS = 1
-
-
-# Load dataset
-df = pd.read_csv(INPUT_CSV)
-
-# Init Genius API
-genius = lyricsgenius.Genius(GENIUS_API_TOKEN, timeout=15, retries=3)
-
-# Crée dossier batches
-os.makedirs(OUTPUT_DIR, exist_ok=True)
-
-# Ajoute colonne lyrics si manquante
-if "lyrics" not in df.columns:
-    df["lyrics"] = ""
-
-# Détecte les batchs déjà traités
-existing_batches = set()
-for f in glob.glob(os.path.join(OUTPUT_DIR, "batch_*.csv")):
-    try:
-        num = int(os.path.basename(f).split('_')[1].split('.')[0])
-        existing_batches.add(num)
-    except Exception:
-        pass
-
-# Boucle par batch
-for batch_num, start_idx in enumerate(range(0, len(df), BATCH_SIZE)):
-    if batch_num in existing_batches:
-        continue  # Batch déjà traité, on saute
-    end_idx = min(start_idx + BATCH_SIZE, len(df))
-    batch = df.iloc[start_idx:end_idx].copy()
-
-    print(f"Traitement du batch {batch_num} : lignes {start_idx} à {end_idx}")
-
-    for idx, row in tqdm(batch.iterrows(), total=len(batch), desc=f"Batch {batch_num}"):
-        if isinstance(row["lyrics"], str) and len(row["lyrics"]) > 5:
-            continue  # Déjà enrichi
+JOURNAL = os.path.join(OUTPUT_DIR, "journal.jsonl")  # Paroles ligne à ligne (reprise après crash)
+GENIUS_ROOT = "https://genius.com/"  # Recherche publique (comme lyricsgenius.search_song) et pages de paroles
+REQUESTS_PER_SECOND = 5    # Débit genius.com partagé par les recherches et les pages
+CONCURRENCY = 4            # Requêtes en vol au départ, ajustées sur les 429/5xx
+MAX_CONCURRENCY = 16
+TIMEOUT = 15
+
+# Mêmes règles que lyricsgenius : bloc de paroles (Genius.lyrics) et titres écartés (Genius.excluded_terms)
+LYRICS_DIV = re.compile(r"^Lyrics-\w{2}.\w+.[1]|Lyrics__Container")
+EXCLUDED_TERMS = re.compile("|".join(f"({term})" for term in Genius.default_terms), re.IGNORECASE)
+# Balises des blocs de paroles, repérées dans le texte avant d'appeler BeautifulSoup
+LYRICS_TAG = re.compile(r'<div[^>]*class="[^"]*(?:Lyrics-\w{2}.\w+.1|Lyrics__Container)')
+DIV_TAG = re.compile(r"<div\b|</div>")
+
+
+def is_lyrics(song: dict) -> bool:
+    """Résultat de recherche avec de vraies paroles (ni instrumental, ni tracklist, ni interview...)."""
+    return (song.get("lyrics_state") == "complete" and not song.get("instrumental")
+            and not EXCLUDED_TERMS.search(clean_str(song["title"])))
+
+
+def pick_song(response: dict, title: str) -> dict:
+    """
+    Choix de lyricsgenius.search_song dans une réponse api/search/multi : le
+    titre identique s'il a des paroles, sinon le premier résultat avec paroles.
+
+    Returns:
+    dict: Résultat choisi (id, url, title...), ou None.
+    """
+    sections = response.get("sections") or []
+    if not sections:
+        return None
+    songs = [hit["result"] for hit in sections[0]["hits"] if hit["index"] == "song"]
+    songs += [hit["result"] for section in sorted(sections, key=lambda s: s["type"] == "song")
+              for hit in section["hits"] if hit["index"] == "song"]
+    for song in songs:
+        if clean_str(song["title"]) == clean_str(title):
+            return song if is_lyrics(song) else None
+    return next((song for song in songs if is_lyrics(song)), None)
+
+
+def lyrics_region(html: str) -> str:
+    """Extrait de la page allant du premier bloc de paroles à la fin du dernier (la page entière sinon)."""
+    starts = [m.start() for m in LYRICS_TAG.finditer(html)]
+    if not starts:
+        return html
+    depth = 0
+    for m in DIV_TAG.finditer(html, starts[-1]):
+        depth += 1 if m.group() == "<div" else -1
+        if depth == 0:
+            return html[starts[0]:m.end()]
+    return html[starts[0]:]
+
+
+def _extract_lyrics(html: str) -> str:
+    only = SoupStrainer("div", class_=LYRICS_DIV)
+    soup = BeautifulSoup(html.replace("<br/>", "\n"), "html.parser", parse_only=only)
+    divs = soup.find_all("div", class_=LYRICS_DIV)
+    return "\n".join(div.get_text() for div in divs).strip("\n") or None
+
+
+def parse_lyrics(html: str) -> str:
+    """
+    Paroles d'une page Genius, extraites comme Genius.lyrics. Seul l'extrait
+    contenant les blocs de paroles (quelques Ko sur plusieurs centaines) est
+    analysé, et BeautifulSoup n'y construit que ces blocs.
+    """
+    region = lyrics_region(html)
+    lyrics = _extract_lyrics(region)
+    if lyrics is None and region is not html:
+        lyrics = _extract_lyrics(html)
+    return lyrics
+
+
+class GeniusFetcher:
+    """
+    Paroles Genius en deux phases, sur une session keep-alive partagée :
+    1. recherche de la page de chaque titre (api/search/multi) ;
+    2. téléchargement et extraction des pages trouvées, une fois par page.
+
+    Les deux phases partagent le débit (TokenBucket) et une fenêtre de
+    concurrence adaptative, qui grandit tant que Genius répond et se divise
+    par deux sur un 429 ou un 5xx (voir enrichment.AdaptiveConcurrency).
+
+    Parameters:
+    root (str): Racine genius.com (ou serveur factice, benchmarks/fake_genius.py).
+    rate (float): Requêtes par seconde.
+    concurrency (int): Requêtes en vol au départ.
+    max_concurrency (int): Plafond de la fenêtre (et du pool de connexions).
+    """
+
+    def __init__(self, root: str = GENIUS_ROOT, rate: float = REQUESTS_PER_SECOND, concurrency: int = CONCURRENCY,
+                 max_concurrency: int = MAX_CONCURRENCY, timeout: float = TIMEOUT):
+        self.root = root
+        self.timeout = timeout
+        self.session = pooled_session(max_concurrency)
+        self.limiter = TokenBucket(rate)
+        self.adaptive = AdaptiveConcurrency(concurrency, maximum=max_concurrency)
+
+    def _get(self, url: str, **params):
+        response = self.session.get(url, params=params or None, timeout=self.timeout)
+        response.raise_for_status()
+        return response
+
+    def search_url(self, title: str, artist: str) -> str:
+        """URL de la page de paroles du titre, None si Genius n'a rien."""
+        data = self._get(self.root + "api/search/multi", q=f"{title} {artist}".strip()).json()
+        song = pick_song(data.get("response", data), title)
+        return self.root + song["path"].lstrip("/") if song else None
 
-        artist = row["artist"]
-        title = row["track_name"]
+    def page_lyrics(self, url: str) -> str:
+        return parse_lyrics(self._get(url).text)
 
-        try:
-            song = genius.search_song(title, artist)
-            if song and song.lyrics:
-                batch.at[idx, "lyrics"] = song.lyrics
+    def fetch(self, queries: dict, on_result=None, desc: str = None) -> dict:
+        """
+        Parameters:
+        queries (dict): clé -> (titre, artiste).
+        on_result (callable): on_result(clé, résultat), appelé dès que le résultat d'une clé est connu.
+
+        Returns:
+        dict: clé -> paroles, None (introuvable) ou exception (échec après retries).
+        """
+        results = {}
+
+        def settle(key, result):
+            results[key] = result
+            if on_result is not None:
+                on_result(key, result)
+
+        # Phase 1 : pages à télécharger (plusieurs titres peuvent mener à la même)
+        pages = defaultdict(list)
+
+        def resolved(key, url):
+            if isinstance(url, str):
+                pages[url].append(key)
             else:
-                batch.at[idx, "lyrics"] = ""
-        except Exception as e:
-            print(f"Erreur pour {title} - {artist}: {e}")
-            batch.at[idx, "lyrics"] = ""
+                settle(key, url)
+
+        run_concurrent(self.search_url, queries.items(), self.limiter, adaptive=self.adaptive,
+                       return_exceptions=True, on_result=resolved, desc=desc and f"{desc} (recherche)")
+
+        # Phase 2 : pages téléchargées et analysées en parallèle
+        def downloaded(url, lyrics):
+            for key in pages[url]:
+                settle(key, lyrics)
+
+        run_concurrent(self.page_lyrics, ((url, (url,)) for url in pages), self.limiter, adaptive=self.adaptive,
+                       return_exceptions=True, on_result=downloaded, desc=desc and f"{desc} (pages)")
+        return results
+
+
+def process_batch(batch, fetcher: GeniusFetcher, cache=None, journal=None, desc: str = None):
+    """
+    Complète la colonne lyrics du batch : journal, puis cache de réponses,
+    puis Genius (un titre présent plusieurs fois n'est demandé qu'une fois).
+    Chaque résultat ou échec est journalisé dès qu'il est connu, avec la
+    requête (artiste|titre) : une entrée obtenue pour un autre titre (ligne
+    modifiée par clean.py --ingest) est refaite.
+    """
+    keys = batch_keys(batch)
+    queries, rows = {}, defaultdict(list)
+    for idx, artist, title, lyrics in zip(batch.index, batch["artist"], batch["track_name"], batch["lyrics"]):
+        if isinstance(lyrics, str) and len(lyrics) > 5:
+            continue  # Déjà enrichi
+        if journal is not None and not journal.pending(keys[idx], query=f"{artist}|{title}"):
+            batch.at[idx, "lyrics"] = journal.value(keys[idx], "")
+            continue  # Déjà obtenu (ou abandonné) lors d'un run précédent
+        key = cache_key("genius", "search_song", artist, title)
+        queries[key] = (title, artist)
+        rows[key].append(idx)
+
+    def record(key, result):
+        title, artist = queries[key]
+        for idx in rows[key]:
+            if journal is not None:
+                if isinstance(result, Exception):
+                    journal.record_failure(keys[idx], result, query=f"{artist}|{title}")
+                else:
+                    journal.record(keys[idx], result, query=f"{artist}|{title}")
+            batch.at[idx, "lyrics"] = result if isinstance(result, str) else ""
+
+    cached = cache.get_many(queries, count_misses=True) if cache is not None else {}
+    for key, lyrics in cached.items():
+        record(key, lyrics)
+    fetched = fetcher.fetch({k: q for k, q in queries.items() if k not in cached}, on_result=record, desc=desc)
+    if cache is not None:
+        cache.set_many({k: v for k, v in fetched.items() if not isinstance(v, Exception)})
+    return batch
+
+
+def main(fetcher=None, cache=None):
+    # Load dataset
+    df = read_table(INPUT_TABLE)
+
+    fetcher = fetcher or GeniusFetcher()
+
+    # Cache de réponses partagé : paroles déjà trouvées (ou introuvables) par un autre run / worker
+    cache = cache or open_cache()
+
+    # Crée dossier batches
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+
+    # Ajoute colonne lyrics si manquante
+    if "lyrics" not in df.columns:
+        df["lyrics"] = ""
+
+    # Journal : chaque résultat écrit dès qu'il est obtenu, échecs retentés selon sa politique
+    journal = Journal(JOURNAL)
+    if len(journal):
+        print(journal.summary())
+
+    # Boucle par batch
+    for batch_num, start_idx in enumerate(range(0, len(df), BATCH_SIZE)):
+        end_idx = min(start_idx + BATCH_SIZE, len(df))
+        batch_file = os.path.join(OUTPUT_DIR, f"batch_{batch_num:04d}.csv")
+        batch = df.iloc[start_idx:end_idx].copy()
+        unchanged, saved = saved_batch(batch_file, batch, ["lyrics"])
+        if unchanged and not batch_keys(batch).map(journal.retry_due).any():
+            continue  # Batch sauvegardé à jour, sans échec à retenter
+        # Lignes déjà traitées (run sans journal, batch modifié par une ingestion) : paroles reprises
+        batch.loc[saved.index, "lyrics"] = saved["lyrics"].fillna("")
 
-        time.sleep(PAUSE_SECONDS)
+        print(f"Traitement du batch {batch_num} : lignes {start_idx} à {end_idx}")
+        process_batch(batch, fetcher, cache, journal, desc=f"Batch {batch_num}")
 
-    # Sauvegarde du batch
-    batch_file = os.path.join(OUTPUT_DIR, f"batch_{batch_num:04d}.csv")
-    batch.to_csv(batch_file, index=False)
-    print(f" Batch {batch_num} sauvegardé : {batch_file}")
+        # Sauvegarde du batch
+        batch.to_csv(batch_file, index=False)
+        print(f" Batch {batch_num} sauvegardé : {batch_file}")
 
-print("Tous les lots sont traités !")
+    print("Tous les lots sont traités !")
+    print(format_stats(cache))
+    print(f"Concurrence Genius : {fetcher.adaptive.limit:.0f} requêtes en vol, {fetcher.adaptive.backoffs} replis")
+    print(journal.summary())
+    journal.close()
 
-# === Fusion finale ===
-batch_files = glob.glob("lyrics_batches/batch_*.csv")
+    # === Fusion finale ===
+    remove_extra_batches(BATCH_PATTERN, len(df), BATCH_SIZE)
+    fusion_lyrics.main()
 
-dfs = [pd.read_csv(f) for f in batch_files]
-final_df = pd.concat(dfs, ignore_index=True)
 
-# Sauvegarde unique finale
-final_df.to_csv("dataset_with_lyrics.csv", index=False)
-print("Dataset final enrichi sauvegardé sous : dataset_with_lyrics.csv")
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,290 @@
+"""
+Index inversé des paroles : pools par mots-clés ou par thème sans relire les
+paroles.
+
+Les paroles sont indexées une fois, par référence du store (lyrics_store.py) :
+des paroles partagées par plusieurs track_id ne sont découpées qu'une fois, et
+comme le store ne fait qu'ajouter, une mise à jour n'indexe que les références
+nouvelles (fusion_lyrics.py l'appelle après chaque fusion). Mots normalisés
+comme empower_tag.py (minuscules, ponctuation = frontière), accents retirés
+pour que "guerrière" et "guerriere" se rejoignent.
+
+Pour chaque terme, une liste triée de références avec le nombre
+d'occurrences (postings), le tout dans LYRICS_INDEX. Une requête ne lit que
+les listes de ses termes ; les track_id viennent de tracks.tsv.
+
+    index = LyricsIndex.load()
+    index.query(any_of=["heartbreak*", "goodbye"], none_of=["party"])
+    index.query(weights={"breakup": 2, "tears": 1, "alone": 1}, min_score=2)
+    index.pool("breakup")         # défini dans LYRIC_POOLS
+
+    python lyrics_index.py update
+    python lyrics_index.py query heartbreak* goodbye --min-score 2
+    python lyrics_index.py terms <track_id>
+"""
+import argparse
+import os
+import re
+import unicodedata
+from itertools import chain
+
+import numpy as np
+import pandas as pd
+
+from empower_tag import WORD_SEPARATORS
+from lyrics_store import STORE_DIR, LyricsStore
+
+# === CONFIG ===
+LYRICS_INDEX = "lyrics_index.npz"
+UPDATE_CHUNK = 5000   # Paroles décompressées et découpées à la fois
+MAX_TOKEN = 30        # Mots plus longs ignorés (suites de symboles, URL...)
+COMBINING = re.compile(r"[\u0300-\u036f]")  # Accents isolés par la décomposition NFKD
+
+# === Pools de paroles (arguments de LyricsIndex.query), utilisables comme le flag empowerment ===
+# "mot*" : tous les mots qui commencent par "mot" ; un mot simple couvre aussi son pluriel en -s
+LYRIC_POOLS = {
+    "breakup": {"weights": {"breakup": 2, "heartbreak*": 2, "heartbroken": 2, "goodbye": 2, "rupture": 2,
+                            "adieu": 2, "tears": 1, "cry*": 1, "alone": 1, "lonely": 1, "apart": 1, "miss": 1,
+                            "larme": 1, "pleur*": 1, "seul": 1, "seule": 1, "quitte*": 1},
+                "min_score": 3},
+    "empowerment_fr": {"any_of": ["femme", "reine", "forte", "puissante", "guerriere", "combat*", "victoire",
+                                  "independante", "courage*", "survivante", "fiere", "battante", "debout"]},
+}
+LYRIC_POOL_LABELS = {"breakup": "Rupture", "empowerment_fr": "Empowerment (FR)"}
+
+
+def normalize(texts: pd.Series) -> pd.Series:
+    """Minuscules, sans accents, ponctuation remplacée par des espaces."""
+    return (texts.fillna("").astype(str).str.lower().str.normalize("NFKD")
+            .str.replace(COMBINING, "", regex=True).str.translate(WORD_SEPARATORS))
+
+
+def normalize_term(term: str) -> str:
+    """normalize pour un terme de requête."""
+    return COMBINING.sub("", unicodedata.normalize("NFKD", term.lower())).translate(WORD_SEPARATORS)
+
+
+def _postings(texts: pd.Series, refs: np.ndarray) -> tuple:
+    """(termes, terme de chaque posting, référence, occurrences) d'un lot de paroles, trié par référence."""
+    words = normalize(texts).str.split()
+    lengths = words.str.len().to_numpy()
+    flat = np.fromiter(chain.from_iterable(words), dtype=object, count=int(lengths.sum()))
+    codes, terms = pd.factorize(flat)
+    terms = terms.astype(str)
+    keep = (np.char.str_len(terms) <= MAX_TOKEN)[codes]
+    n_terms = max(len(terms), 1)
+    docs = np.repeat(np.arange(len(refs)), lengths)[keep]
+    pairs, counts = np.unique(docs * n_terms + codes[keep], return_counts=True)
+    return terms, pairs % n_terms, refs[pairs // n_terms], np.minimum(counts, np.iinfo(np.uint16).max)
+
+
+class LyricsIndex:
+    """
+    Parameters:
+    vocab (np.ndarray): Termes triés.
+    offsets (np.ndarray): Postings du terme i : refs[offsets[i]:offsets[i + 1]].
+    refs, counts (np.ndarray): Références du store (croissantes par terme) et occurrences.
+    indexed (int): Références du store déjà indexées (0 .. indexed - 1).
+    track_ids, track_refs (np.ndarray): track_id -> référence (tracks.tsv du store).
+    tracks_bytes (int): Taille de tracks.tsv lors de la dernière mise à jour.
+    """
+
+    def __init__(self, vocab, offsets, refs, counts, indexed=0, track_ids=None, track_refs=None, tracks_bytes=0):
+        self.vocab, self.offsets, self.refs, self.counts = vocab, offsets, refs, counts
+        self.indexed = int(indexed)
+        self.track_ids = np.asarray(track_ids if track_ids is not None else [], dtype=object)
+        self.track_refs = np.asarray(track_refs if track_refs is not None else [], dtype=np.int64)
+        self.tracks_bytes = int(tracks_bytes)
+
+    @classmethod
+    def empty(cls) -> "LyricsIndex":
+        return cls(np.array([], dtype=str), np.zeros(1, dtype=np.int64), np.array([], dtype=np.int32),
+                   np.array([], dtype=np.uint16))
+
+    def __len__(self):
+        return len(self.vocab)
+
+    # === Persistance ===
+    def save(self, path: str = LYRICS_INDEX):
+        tmp = path + ".tmp.npz"
+        np.savez(tmp, vocab=self.vocab, offsets=self.offsets, refs=self.refs, counts=self.counts,
+                 indexed=np.int64(self.indexed), track_ids=self.track_ids.astype(str), track_refs=self.track_refs,
+                 tracks_bytes=np.int64(self.tracks_bytes))
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str = LYRICS_INDEX) -> "LyricsIndex":
+        with np.load(path) as data:
+            return cls(data["vocab"], data["offsets"], data["refs"], data["counts"], int(data["indexed"]),
+                       data["track_ids"].astype(object), data["track_refs"], int(data["tracks_bytes"]))
+
+    # === Mise à jour incrémentale ===
+    def stale(self, store: LyricsStore) -> bool:
+        return len(store) != self.indexed or os.path.getsize(store._file("tracks.tsv")) != self.tracks_bytes
+
+    def update(self, store: LyricsStore, chunk: int = UPDATE_CHUNK) -> int:
+        """
+        Indexe les références ajoutées au store depuis la dernière mise à jour et
+        recharge la correspondance track_id -> référence.
+
+        Returns:
+        int: Nombre de paroles indexées.
+        """
+        if len(store) < self.indexed:
+            # Store recréé : l'index repart de zéro
+            self.__dict__.update(LyricsIndex.empty().__dict__)
+        start = self.indexed
+        parts = []
+        for lo in range(start, len(store), chunk):
+            refs = np.arange(lo, min(lo + chunk, len(store)), dtype=np.int32)
+            parts.append(_postings(pd.Series(store.get_many(refs), dtype=object), refs))
+        if parts:
+            self._merge(parts)
+            self.indexed = len(store)
+
+        tracks = store.tracks().drop_duplicates("track_id", keep="last")
+        tracks = tracks.sort_values("ref", kind="stable")
+        self.track_ids, self.track_refs = tracks["track_id"].to_numpy(dtype=object), tracks["ref"].to_numpy()
+        self.tracks_bytes = os.path.getsize(store._file("tracks.tsv"))
+        return self.indexed - start
+
+    def _merge(self, parts: list):
+        """Fusionne les postings des nouvelles références (toutes supérieures aux anciennes) dans l'index."""
+        vocab = self.vocab
+        for terms, *_ in parts:
+            vocab = np.union1d(vocab, terms)
+        term_ids = [np.repeat(np.searchsorted(vocab, self.vocab), np.diff(self.offsets))]
+        refs, counts = [self.refs], [self.counts]
+        for terms, codes, part_refs, part_counts in parts:
+            term_ids.append(np.searchsorted(vocab, terms)[codes])
+            refs.append(part_refs)
+            counts.append(part_counts)
+        term_ids = np.concatenate(term_ids)
+        # Tri stable par terme : références déjà croissantes (anciennes puis lots dans l'ordre)
+        order = np.argsort(term_ids, kind="stable")
+        self.vocab = vocab
+        self.refs = np.concatenate(refs).astype(np.int32)[order]
+        self.counts = np.concatenate(counts).astype(np.uint16)[order]
+        self.offsets = np.concatenate([[0], np.cumsum(np.bincount(term_ids, minlength=len(vocab)))])
+
+    # === Requêtes ===
+    def term_ids(self, term: str) -> np.ndarray:
+        """Termes du vocabulaire couverts : le mot et son pluriel en -s, ou tous les mots du préfixe "mot*"."""
+        prefix = term.endswith("*")
+        words = normalize_term(term.rstrip("*")).split()
+        if len(words) != 1:
+            raise ValueError(f"Un terme = un mot : {term!r}")
+        word = words[0]
+        if prefix:
+            lo = np.searchsorted(self.vocab, word, side="left")
+            hi = np.searchsorted(self.vocab, word + "\U0010ffff", side="left")
+            return np.arange(lo, hi)
+        forms = np.array([word, word + "s"])
+        ids = np.searchsorted(self.vocab, forms)
+        found = ids < len(self.vocab)
+        found[found] = self.vocab[ids[found]] == forms[found]
+        return ids[found]
+
+    def postings(self, term: str) -> tuple:
+        """(références, occurrences) du terme, toutes formes confondues."""
+        slices = [slice(self.offsets[i], self.offsets[i + 1]) for i in self.term_ids(term)]
+        return (np.concatenate([self.refs[:0]] + [self.refs[s] for s in slices]),
+                np.concatenate([self.counts[:0]] + [self.counts[s] for s in slices]))
+
+    def ref_mask(self, term: str) -> np.ndarray:
+        mask = np.zeros(self.indexed, dtype=bool)
+        mask[self.postings(term)[0]] = True
+        return mask
+
+    def ref_scores(self, weights: dict) -> np.ndarray:
+        """Somme des poids des termes présents dans chaque référence (un terme compte une fois)."""
+        scores = np.zeros(self.indexed)
+        for term, weight in weights.items():
+            scores += weight * self.ref_mask(term)
+        return scores
+
+    def tracks(self, ref_mask: np.ndarray) -> np.ndarray:
+        """track_id dont les paroles vérifient le masque (par référence)."""
+        known = self.track_refs < self.indexed
+        return self.track_ids[known][ref_mask[self.track_refs[known]]]
+
+    def query(self, all_of=(), any_of=(), none_of=(), weights: dict = None, min_score: float = 1) -> np.ndarray:
+        """
+        track_id des paroles qui contiennent tous les termes de all_of, au moins
+        un de any_of, aucun de none_of et, si weights est donné, dont la somme
+        des poids des termes présents atteint min_score.
+        """
+        mask = np.ones(self.indexed, dtype=bool)
+        for term in all_of:
+            mask &= self.ref_mask(term)
+        if any_of:
+            mask &= np.logical_or.reduce([self.ref_mask(term) for term in any_of])
+        for term in none_of:
+            mask &= ~self.ref_mask(term)
+        if weights:
+            mask &= self.ref_scores(weights) >= min_score
+        return self.tracks(mask)
+
+    def scores(self, weights: dict) -> pd.Series:
+        """Score pondéré de chaque track_id ayant au moins un terme, du plus haut au plus bas."""
+        scores = self.ref_scores(weights)
+        known = self.track_refs < self.indexed
+        track_scores = pd.Series(scores[self.track_refs[known]], index=self.track_ids[known])
+        return track_scores[track_scores > 0].sort_values(ascending=False, kind="stable")
+
+    def pool(self, name: str) -> np.ndarray:
+        return self.query(**LYRIC_POOLS[name])
+
+    def terms_of(self, track_id: str) -> dict:
+        """Occurrences de chaque terme dans les paroles du titre (parcours des postings, sans le store)."""
+        rows = np.flatnonzero(self.track_ids == track_id)
+        if not len(rows):
+            return {}
+        positions = np.flatnonzero(self.refs == self.track_refs[rows[-1]])
+        terms = self.vocab[np.searchsorted(self.offsets, positions, side="right") - 1]
+        return dict(sorted(zip(terms.tolist(), self.counts[positions].tolist()), key=lambda kv: -kv[1]))
+
+
+def update_index(store: LyricsStore = None, path: str = LYRICS_INDEX) -> LyricsIndex:
+    """Index enregistré, mis à jour et réenregistré si le store a changé depuis."""
+    store = store or LyricsStore(STORE_DIR)
+    index = LyricsIndex.load(path) if os.path.exists(path) else LyricsIndex.empty()
+    if index.stale(store):
+        added = index.update(store)
+        index.save(path)
+        print(f"Index des paroles : {added} paroles ajoutées ({index.indexed} indexées, {len(index)} termes)")
+    return index
+
+
+def load_lyric_pools(pool_index, path: str = LYRICS_INDEX) -> list:
+    """Ajoute chaque pool de LYRIC_POOLS comme flag de pool_index (PoolIndex) ; liste des pools ajoutés."""
+    if not os.path.exists(path):
+        return []
+    index = LyricsIndex.load(path)
+    for name in LYRIC_POOLS:
+        pool_index.add_flag(name, index.pool(name))
+    return list(LYRIC_POOLS)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Index inversé des paroles")
+    parser.add_argument("command", choices=["update", "query", "pool", "terms"])
+    parser.add_argument("args", nargs="*", help="query : termes (au moins un) ; pool : nom ; terms : track_id")
+    parser.add_argument("--all", action="store_true", help="query : tous les termes au lieu d'au moins un")
+    parser.add_argument("--min-score", type=float, default=None, help="query : nombre de termes présents requis")
+    args = parser.parse_args()
+
+    index = update_index()
+    if args.command == "query":
+        if args.min_score is not None:
+            ids = index.query(weights=dict.fromkeys(args.args, 1), min_score=args.min_score)
+        else:
+            ids = index.query(all_of=args.args) if args.all else index.query(any_of=args.args)
+        print(f"{len(ids)} titres")
+        print("\n".join(ids[:20]))
+    elif args.command == "pool":
+        for name in args.args or LYRIC_POOLS:
+            print(f"{LYRIC_POOL_LABELS.get(name, name)} : {len(index.pool(name))} titres")
+    elif args.command == "terms":
+        for track_id in args.args:
+            print(track_id, list(index.terms_of(track_id).items())[:30])
@@ -0,0 +1,308 @@
+"""
+Paroles stockées hors des tables : blobs compressés (zstd) adressés par
+contenu, et index d'offsets mappé en mémoire.
+
+    lyrics_store/
+      blobs.bin   paroles compressées bout à bout (ajout seul)
+      index.bin   une entrée de taille fixe par blob : offset, taille
+                  compressée, taille, nombre de caractères, hash du texte
+      tracks.tsv  track_id -> référence (ajout seul, la dernière l'emporte)
+
+Les tables ne portent que lyrics_ref (numéro d'entrée de l'index, -1 sans
+paroles) : une lecture est index[ref] puis un accès direct au blob, en O(1).
+Des paroles identiques (même titre sous plusieurs track_id) ne sont stockées
+qu'une fois. Un seul écrivain à la fois (fusion_lyrics.py) ; après un crash
+pendant un ajout, l'entrée incomplète est retirée au premier ajout suivant.
+Les lecteurs ne modifient jamais les fichiers : ils ignorent ce qu'un ajout
+en cours n'a pas encore indexé.
+
+    python lyrics_store.py stats
+    python lyrics_store.py migrate dataset_with_lyrics dataset_with_empowerment   # lyrics -> lyrics_ref
+    python lyrics_store.py get <track_id>
+"""
+import argparse
+import hashlib
+import io
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from dataset_io import TableWriter, iter_table, table_columns
+
+# === CONFIG ===
+STORE_DIR = "lyrics_store"
+LEVEL = 9             # Niveau zstd (compression une fois, lectures nombreuses)
+REF_COLUMN = "lyrics_ref"
+MISSING = -1          # lyrics_ref d'une ligne sans paroles
+MIGRATE_CHUNK = 20000
+
+INDEX_DTYPE = np.dtype([("offset", "<u8"), ("length", "<u4"), ("size", "<u4"), ("chars", "<u4"), ("hash", "V16")])
+
+
+def text_hash(raw: bytes) -> bytes:
+    return hashlib.blake2b(raw, digest_size=16).digest()
+
+
+class LyricsStore:
+    """
+    Parameters:
+    path (str): Dossier du store (créé si absent).
+    level (int): Niveau de compression zstd des nouveaux blobs.
+    """
+
+    def __init__(self, path: str = STORE_DIR, level: int = LEVEL):
+        self.path = path
+        self.codec = pa.Codec("zstd", compression_level=level)
+        self._lock = threading.Lock()
+        self._index = self._blobs = None
+        self._hashes = None   # hash -> ref, construit à la première écriture
+        self._tracks = None   # track_id -> ref, chargé à la première recherche par track_id
+        self._files = None    # (blobs, index, tracks) ouverts en ajout
+        os.makedirs(path, exist_ok=True)
+        for name in ("blobs.bin", "index.bin", "tracks.tsv"):
+            open(self._file(name), "ab").close()
+
+    def _file(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+    def _recover(self):
+        """
+        Avant d'écrire : index tronqué aux entrées complètes, blobs à la fin du
+        dernier blob indexé, tracks.tsv à sa dernière ligne entière. Jamais à
+        l'ouverture : un lecteur effacerait les blobs d'un ajout en cours.
+        """
+        entries = os.path.getsize(self._file("index.bin")) // INDEX_DTYPE.itemsize
+        os.truncate(self._file("index.bin"), entries * INDEX_DTYPE.itemsize)
+        end = 0
+        if entries:
+            last = np.fromfile(self._file("index.bin"), dtype=INDEX_DTYPE, offset=(entries - 1) * INDEX_DTYPE.itemsize)
+            end = int(last["offset"][0]) + int(last["length"][0])
+        if os.path.getsize(self._file("blobs.bin")) > end:
+            os.truncate(self._file("blobs.bin"), end)
+        with open(self._file("tracks.tsv"), "rb") as f:
+            end = f.seek(0, os.SEEK_END)
+            while end > 0:
+                start = max(0, end - 65536)
+                f.seek(start)
+                newline = f.read(end - start).rfind(b"\n")
+                if newline >= 0:
+                    end = start + newline + 1
+                    break
+                end = start
+        os.truncate(self._file("tracks.tsv"), end)
+
+    def _view(self):
+        """Index et blobs mappés en mémoire, remappés si le store a grandi (ajouts de ce process ou d'un autre)."""
+        entries = os.path.getsize(self._file("index.bin")) // INDEX_DTYPE.itemsize
+        if self._index is None or len(self._index) != entries:
+            if entries:
+                self._index = np.memmap(self._file("index.bin"), dtype=INDEX_DTYPE, mode="r", shape=(entries,))
+                self._blobs = np.memmap(self._file("blobs.bin"), dtype=np.uint8, mode="r")
+            else:
+                self._index, self._blobs = np.zeros(0, INDEX_DTYPE), np.zeros(0, np.uint8)
+        return self._index, self._blobs
+
+    def __len__(self):
+        return len(self._view()[0])
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        with self._lock:
+            if self._files is not None:
+                for f in self._files:
+                    f.close()
+                self._files = None
+
+    # === Lecture ===
+    @staticmethod
+    def _refs(refs) -> np.ndarray:
+        refs = pd.Series(refs)
+        if refs.dtype.kind != "i":
+            refs = pd.to_numeric(refs).fillna(MISSING)  # NaN : ligne relue depuis un CSV sans référence
+        return refs.to_numpy(dtype=np.int64)
+
+    def get(self, ref) -> str:
+        """Paroles de la référence, None pour -1 / NaN."""
+        if ref is None or pd.isna(ref) or ref < 0:
+            return None
+        index, blobs = self._view()
+        entry = index[int(ref)]
+        start = int(entry["offset"])
+        raw = self.codec.decompress(blobs[start:start + int(entry["length"])], int(entry["size"]), asbytes=True)
+        return raw.decode("utf-8")
+
+    def get_many(self, refs) -> list:
+        """Paroles de chaque référence (None sans paroles), lues dans l'ordre des blobs sur le disque."""
+        refs = self._refs(refs)
+        index, blobs = self._view()
+        out = [None] * len(refs)
+        rows = np.flatnonzero(refs >= 0)
+        entries = index[refs[rows]]
+        order = np.argsort(entries["offset"], kind="stable")
+        for row, start, length, size in zip(rows[order].tolist(), entries["offset"][order].tolist(),
+                                            entries["length"][order].tolist(), entries["size"][order].tolist()):
+            out[row] = self.codec.decompress(blobs[start:start + length], size, asbytes=True).decode("utf-8")
+        return out
+
+    def chars(self, refs) -> np.ndarray:
+        """Nombre de caractères des paroles de chaque référence (0 sans paroles), sans décompresser."""
+        refs = self._refs(refs)
+        out = np.zeros(len(refs), dtype=np.int64)
+        valid = refs >= 0
+        out[valid] = self._view()[0]["chars"][refs[valid]]
+        return out
+
+    def tracks(self) -> pd.DataFrame:
+        """Lignes de tracks.tsv (track_id, ref), sans la dernière si un ajout ou un crash l'a laissée incomplète."""
+        with open(self._file("tracks.tsv"), "rb") as f:
+            data = f.read()
+        data = data[:data.rfind(b"\n") + 1]
+        if not data:
+            return pd.DataFrame({"track_id": pd.Series(dtype=object), "ref": pd.Series(dtype=np.int64)})
+        return pd.read_csv(io.BytesIO(data), sep="\t", names=["track_id", "ref"],
+                           dtype={"track_id": str, "ref": np.int64})
+
+    def ref_of(self, track_id: str) -> int:
+        if self._tracks is None:
+            tracks = self.tracks()
+            self._tracks = dict(zip(tracks["track_id"], tracks["ref"]))
+        return int(self._tracks.get(track_id, MISSING))
+
+    def lyrics_of(self, track_id: str) -> str:
+        return self.get(self.ref_of(track_id))
+
+    # === Écriture ===
+    def put_many(self, texts, track_ids=None) -> np.ndarray:
+        """
+        Ajoute les paroles (chaque texte distinct une seule fois) et renvoie leurs références.
+
+        Parameters:
+        texts (iterable): Paroles ; None, NaN ou "" -> MISSING.
+        track_ids (iterable): track_id de chaque texte, pour ref_of / lyrics_of (optionnel).
+        """
+        texts = list(texts)
+        refs = np.full(len(texts), MISSING, dtype=np.int64)
+        with self._lock:
+            if self._files is None:
+                self._recover()
+                self._files = tuple(open(self._file(name), "ab") for name in ("blobs.bin", "index.bin", "tracks.tsv"))
+            blobs_file, index_file, tracks_file = self._files
+            if self._hashes is None:
+                index = self._view()[0]
+                self._hashes = {h.tobytes(): ref for ref, h in enumerate(index["hash"])}
+            entries = []
+            offset = blobs_file.seek(0, os.SEEK_END)
+            count = len(self._hashes)
+            for i, text in enumerate(texts):
+                if not isinstance(text, str) or not text:
+                    continue
+                raw = text.encode("utf-8")
+                digest = text_hash(raw)
+                ref = self._hashes.get(digest)
+                if ref is None:
+                    data = self.codec.compress(raw, asbytes=True)
+                    blobs_file.write(data)
+                    entries.append((offset, len(data), len(raw), len(text), digest))
+                    offset += len(data)
+                    ref = self._hashes[digest] = count
+                    count += 1
+                refs[i] = ref
+            # Blobs sur disque avant leurs entrées d'index : un crash laisse au pire des blobs orphelins
+            blobs_file.flush()
+            index_file.write(np.array(entries, dtype=INDEX_DTYPE).tobytes())
+            index_file.flush()
+            if track_ids is not None:
+                lines = [(t, r) for t, r in zip(track_ids, refs.tolist()) if isinstance(t, str) and r != MISSING]
+                tracks_file.write("".join(f"{t}\t{r}\n" for t, r in lines).encode("utf-8"))
+                tracks_file.flush()
+                if self._tracks is not None:
+                    self._tracks.update(lines)
+        return refs
+
+    def externalize(self, df: pd.DataFrame, column: str = "lyrics") -> pd.DataFrame:
+        """Verse la colonne de paroles dans le store et la remplace par lyrics_ref (même position)."""
+        if column not in df.columns:
+            return df
+        track_ids = df["track_id"].tolist() if "track_id" in df.columns else None
+        refs = self.put_many(df[column].tolist(), track_ids)
+        position = df.columns.get_loc(column)
+        df = df.drop(columns=[column])
+        df.insert(position, REF_COLUMN, refs)
+        return df
+
+    def stats(self) -> dict:
+        index = self._view()[0]
+        return {"blobs": len(index), "compressed_bytes": int(index["length"].sum()),
+                "text_bytes": int(index["size"].sum())}
+
+
+_stores = {}
+
+
+def open_store(path: str = STORE_DIR) -> LyricsStore:
+    """Store partagé par les lecteurs d'un même process (index et blobs mappés une seule fois)."""
+    if path not in _stores:
+        _stores[path] = LyricsStore(path)
+    return _stores[path]
+
+
+def lyrics_column(df: pd.DataFrame, store: LyricsStore = None) -> pd.Series:
+    """
+    Paroles des lignes : colonne lyrics si la table la porte encore, sinon lues
+    dans le store via lyrics_ref. None si la table n'a ni l'une ni l'autre.
+    """
+    if "lyrics" in df.columns:
+        return df["lyrics"]
+    if REF_COLUMN in df.columns:
+        store = store or open_store()
+        return pd.Series(store.get_many(df[REF_COLUMN]), index=df.index, dtype=object)
+    return None
+
+
+def lyrics_lengths(df: pd.DataFrame, store: LyricsStore = None) -> pd.Series:
+    """Nombre de caractères des paroles (0 sans paroles) ; via l'index seul pour lyrics_ref."""
+    if "lyrics" in df.columns:
+        return df["lyrics"].map(lambda v: len(v) if isinstance(v, str) else 0)
+    if REF_COLUMN in df.columns:
+        store = store or open_store()
+        return pd.Series(store.chars(df[REF_COLUMN]), index=df.index)
+    return None
+
+
+def migrate_table(name: str, store: LyricsStore) -> int:
+    """Réécrit une table avec lyrics_ref à la place de lyrics (en streaming). Retourne le nombre de lignes."""
+    if "lyrics" not in table_columns(name):
+        return 0
+    rows = 0
+    with TableWriter(name) as writer:
+        for chunk in iter_table(name, MIGRATE_CHUNK):
+            writer.write(store.externalize(chunk))
+            rows += len(chunk)
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Store des paroles (blobs zstd + index mappé)")
+    parser.add_argument("command", choices=["stats", "migrate", "get"])
+    parser.add_argument("args", nargs="*", help="migrate : tables ; get : track_id")
+    parser.add_argument("--path", default=STORE_DIR)
+    args = parser.parse_args()
+
+    with LyricsStore(args.path) as store:
+        if args.command == "migrate":
+            for name in args.args:
+                print(f"{name} : {migrate_table(name, store)} lignes migrées vers {REF_COLUMN}")
+        elif args.command == "get":
+            for track_id in args.args:
+                print(store.lyrics_of(track_id))
+        s = store.stats()
+        print(f"Store {args.path} : {s['blobs']} paroles distinctes, {s['text_bytes'] / 1e6:.1f} Mo de texte, "
+              f"{s['compressed_bytes'] / 1e6:.1f} Mo compressés")
@@ -0,0 +1,335 @@
+"""
+Orchestrateur incrémental de la chaîne d'enrichissement.
+
+Chaque étape déclare ses entrées, ses sorties, son code et sa config. Son
+empreinte (sha256 des entrées, du code et de la config) est comparée à celle
+du dernier passage (.pipeline/state.json) : seules les étapes périmées sont
+relancées, dans l'ordre du graphe, et les étapes indépendantes (paroles et
+pochettes d'album par exemple) tournent en parallèle.
+
+Les étapes "transform" (fonction DataFrame -> DataFrame, ligne à ligne) sont
+en plus incrémentales par ligne : si seul l'amont a changé (code et config
+identiques), la fonction ne voit que les lignes nouvelles ou modifiées
+(hash par track_id) et le résultat est fusionné dans la sortie précédente.
+Elles chargent toute la table en mémoire : empower et tags passent donc par
+leurs scripts (lecture par blocs pour empower_tag.py, reprise par batch pour
+tags.py).
+
+    python pipeline.py                  # tout ce qui est périmé
+    python pipeline.py tags --dry-run   # ce que demanderait tags (et son amont)
+    python pipeline.py empower --force
+"""
+import argparse
+import glob
+import hashlib
+import importlib
+import json
+import os
+import subprocess
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from dataclasses import dataclass, field
+
+import pandas as pd
+
+from dataset_io import read_table, table_file, write_table
+
+STATE_DIR = ".pipeline"
+STATE_FILE = os.path.join(STATE_DIR, "state.json")
+MAX_PARALLEL = 2
+HASH_BLOCK = 1 << 20
+
+
+@dataclass
+class Stage:
+    """
+    Une étape de la chaîne.
+
+    Parameters:
+    name (str): Nom de l'étape.
+    inputs (list): Tables ("clean"), fichiers ou motifs glob lus par l'étape.
+    outputs (list): Tables ou fichiers produits.
+    code (list): Fichiers source dont dépend le résultat.
+    scripts (list): Scripts lancés (dans l'ordre) en sous-processus, ou
+    transform (str): "module:fonction" DataFrame -> DataFrame appliquée ligne à
+        ligne sur inputs[0] (chargée en entier), résultat écrit dans outputs[0].
+    config (dict): Paramètres supplémentaires pris en compte dans l'empreinte.
+    key (str): Clé de ligne des étapes transform.
+    """
+    name: str
+    inputs: list
+    outputs: list
+    code: list
+    scripts: list = field(default_factory=list)
+    transform: str = None
+    config: dict = field(default_factory=dict)
+    key: str = "track_id"
+
+
+# === DAG de la chaîne (les dépendances se déduisent des entrées / sorties) ===
+STAGES = [
+    Stage("clean", ["SpotifyFeatures.csv", "dataset.csv", "spotify_songs.csv"], ["clean"],
+          ["clean.py", "dataset_io.py"], scripts=["clean.py"]),
+    Stage("artist_genre", ["clean"], ["artist_genre_cache.sqlite"],
+          ["artist_genre.py", "genre_cache.py", "spotify_api.py", "enrichment.py"], scripts=["artist_genre.py"]),
+    Stage("genre", ["clean", "artist_genre_cache.sqlite"], ["dataset_avec_genres_ml"],
+          ["smart_genre_mapper.py", "genre_cache.py", "dataset_io.py"], scripts=["smart_genre_mapper.py"]),
+    Stage("lyrics", ["dataset_avec_genres_ml"], ["dataset_with_lyrics", "lyrics_store/index.bin", "lyrics_index.npz"],
+          ["lyrics_enrichment.py", "fusion_lyrics.py", "batch_merge.py", "journal.py", "response_cache.py",
+           "enrichment.py", "spotify_api.py", "lyrics_store.py", "lyrics_index.py"], scripts=["lyrics_enrichment.py"]),
+    Stage("albums", ["dataset_avec_genres_ml"], ["dataset_with_album_cover"],
+          ["albums.py", "spotify_api.py", "enrichment.py", "batch_merge.py", "journal.py", "response_cache.py"],
+          scripts=["albums.py"]),
+    Stage("empower", ["dataset_with_lyrics", "lyrics_store/index.bin"], ["dataset_with_empowerment"],
+          ["empower_tag.py", "lyrics_store.py", "dataset_io.py"], scripts=["empower_tag.py"]),
+    Stage("lastfm", ["dataset_with_empowerment"], ["dataset_with_lastfm_tags"],
+          ["lastfm_tags.py", "fusion_tag.py", "batch_merge.py", "response_cache.py", "enrichment.py"],
+          scripts=["lastfm_tags.py", "fusion_tag.py"]),
+    Stage("tags", ["dataset_with_lastfm_tags", "lyrics_store/index.bin"], ["dataset_mood_activity"],
+          ["tags.py", "sentiment.py", "lyrics_store.py", "batch_merge.py"], scripts=["tags.py"]),
+]
+
+
+# === Empreintes ===
+def _resolve(name: str) -> list:
+    """Fichiers réels derrière une entrée : table (Parquet ou CSV), fichier ou motif glob."""
+    if any(c in name for c in "*?["):
+        return sorted(glob.glob(name))
+    if os.path.splitext(name)[1] not in ("", ".csv", ".parquet"):
+        return [name] if os.path.exists(name) else []
+    path = table_file(name)
+    return [path] if os.path.exists(path) else []
+
+
+def _exists(name: str) -> bool:
+    return bool(_resolve(name))
+
+
+def file_hash(path: str, cache: dict) -> str:
+    """sha256 du contenu, recalculé seulement si taille ou mtime ont changé."""
+    st = os.stat(path)
+    cached = cache.get(path)
+    if cached and cached["size"] == st.st_size and cached["mtime_ns"] == st.st_mtime_ns:
+        return cached["sha256"]
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(HASH_BLOCK), b""):
+            h.update(block)
+    cache[path] = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha256": h.hexdigest()}
+    return h.hexdigest()
+
+
+def _digest(parts) -> str:
+    return hashlib.sha256(json.dumps(parts, sort_keys=True).encode()).hexdigest()
+
+
+def code_fingerprint(stage: Stage, cache: dict) -> str:
+    code = {path: file_hash(path, cache) for path in stage.code if os.path.exists(path)}
+    return _digest({"code": code, "config": stage.config, "transform": stage.transform, "scripts": stage.scripts})
+
+
+def input_fingerprint(stage: Stage, cache: dict) -> str:
+    return _digest({name: [(path, file_hash(path, cache)) for path in _resolve(name)] for name in stage.inputs})
+
+
+def output_fingerprint(stage: Stage, cache: dict) -> str:
+    return _digest({name: [(path, file_hash(path, cache)) for path in _resolve(name)] for name in stage.outputs})
+
+
+def row_hashes(df: pd.DataFrame, key: str) -> pd.Series:
+    """Hash de chaque ligne (toutes colonnes), indexé par la clé."""
+    values = df.drop(columns=[key]).astype(str)
+    return pd.Series(pd.util.hash_pandas_object(values, index=False).to_numpy(), index=df[key].to_numpy())
+
+
+def _rows_file(stage: Stage) -> str:
+    return os.path.join(STATE_DIR, f"{stage.name}.rows.parquet")
+
+
+# === État ===
+def load_state() -> dict:
+    if not os.path.exists(STATE_FILE):
+        return {"stages": {}, "files": {}}
+    with open(STATE_FILE, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_state(state: dict):
+    os.makedirs(STATE_DIR, exist_ok=True)
+    tmp = STATE_FILE + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp, STATE_FILE)
+
+
+class Pipeline:
+    """
+    Exécution du DAG.
+
+    Parameters:
+    stages (list): Étapes (voir STAGES).
+    max_parallel (int): Étapes lancées en même temps au maximum.
+    """
+
+    def __init__(self, stages=None, max_parallel: int = MAX_PARALLEL):
+        self.stages = {s.name: s for s in (stages or STAGES)}
+        self.max_parallel = max_parallel
+        self.state = load_state()
+        self._lock = threading.Lock()
+        producers = {out: s.name for s in self.stages.values() for out in s.outputs}
+        self.deps = {s.name: sorted({producers[i] for i in s.inputs if producers.get(i, s.name) != s.name})
+                     for s in self.stages.values()}
+
+    def upstream(self, targets) -> list:
+        """Étapes nécessaires aux cibles, dans un ordre topologique."""
+        order, seen = [], set()
+
+        def visit(name, path=()):
+            if name in path:
+                raise ValueError(f"Cycle dans le pipeline : {' -> '.join(path + (name,))}")
+            if name in seen:
+                return
+            for dep in self.deps[name]:
+                visit(dep, path + (name,))
+            seen.add(name)
+            order.append(name)
+
+        for name in targets or self.stages:
+            if name not in self.stages:
+                raise ValueError(f"Étape inconnue : {name} (attendu : {', '.join(self.stages)})")
+            visit(name)
+        return order
+
+    def staleness(self, stage: Stage) -> str:
+        """Raison de relancer l'étape, ou None si elle est à jour."""
+        with self._lock:
+            files = self.state["files"]
+            previous = self.state["stages"].get(stage.name)
+            if not all(_exists(out) for out in stage.outputs):
+                return "sortie absente"
+            if previous is None:
+                return "jamais exécutée"
+            if previous["code"] != code_fingerprint(stage, files):
+                return "code ou config modifiés"
+            if previous["inputs"] != input_fingerprint(stage, files):
+                return "entrées modifiées"
+            if previous["outputs"] != output_fingerprint(stage, files):
+                return "sortie modifiée hors pipeline"
+        return None
+
+    def _record(self, stage: Stage):
+        with self._lock:
+            files = self.state["files"]
+            self.state["stages"][stage.name] = {
+                "code": code_fingerprint(stage, files),
+                "inputs": input_fingerprint(stage, files),
+                "outputs": output_fingerprint(stage, files),
+            }
+            save_state(self.state)
+
+    def _run_scripts(self, stage: Stage):
+        for script in stage.scripts:
+            print(f"[{stage.name}] python {script}")
+            result = subprocess.run([sys.executable, script])
+            if result.returncode != 0:
+                raise RuntimeError(f"{script} a échoué (code {result.returncode})")
+
+    def _run_transform(self, stage: Stage, reason: str):
+        module, func = stage.transform.split(":")
+        transform = getattr(importlib.import_module(module), func)
+        df = read_table(stage.inputs[0])
+        if df[stage.key].duplicated().any():
+            raise ValueError(f"[{stage.name}] clé {stage.key} non unique dans {stage.inputs[0]}")
+        hashes = row_hashes(df, stage.key)
+        output = stage.outputs[0]
+
+        # Incrémental seulement si le code n'a pas bougé et que la sortie précédente est intacte
+        incremental = reason == "entrées modifiées" and os.path.exists(_rows_file(stage))
+        if incremental:
+            previous = pd.read_parquet(_rows_file(stage))["hash"]
+            known = hashes.index.isin(previous.index)
+            changed = ~known
+            changed[known] = hashes[known].to_numpy() != previous.loc[hashes.index[known]].to_numpy()
+            print(f"[{stage.name}] {changed.sum()} lignes nouvelles ou modifiées sur {len(df)}")
+            done = read_table(output).set_index(stage.key)
+            parts = [done[done.index.isin(hashes.index[~changed])]]
+            if changed.any():
+                parts.append(transform(df[changed].copy()).set_index(stage.key))
+            result = pd.concat(parts).loc[hashes.index].reset_index(names=stage.key)
+        else:
+            print(f"[{stage.name}] {len(df)} lignes")
+            result = transform(df)
+
+        write_table(result, output)
+        os.makedirs(STATE_DIR, exist_ok=True)
+        hashes.rename("hash").rename_axis(stage.key).to_frame().to_parquet(_rows_file(stage))
+
+    def run_stage(self, name: str, force: bool = False, dry_run: bool = False) -> bool:
+        """Relance l'étape si elle est périmée. Retourne True si elle a tourné (ou tournerait)."""
+        stage = self.stages[name]
+        missing = [i for i in stage.inputs if not _exists(i)]
+        if missing:
+            raise FileNotFoundError(f"[{name}] entrée(s) introuvable(s) : {', '.join(missing)}")
+        reason = "forcée" if force else self.staleness(stage)
+        if reason is None:
+            print(f"[{name}] à jour")
+            return False
+        print(f"[{name}] à relancer : {reason}")
+        if dry_run:
+            return True
+        if stage.transform:
+            self._run_transform(stage, reason)
+        else:
+            self._run_scripts(stage)
+        self._record(stage)
+        return True
+
+    def run(self, targets=None, force=(), dry_run: bool = False) -> list:
+        """
+        Lance les étapes nécessaires aux cibles : chaque étape démarre dès que
+        ses dépendances sont terminées.
+
+        Returns:
+        list: Étapes effectivement relancées.
+        """
+        todo = self.upstream(targets)
+        if dry_run:
+            # Sans exécution, une étape en aval d'une étape périmée l'est aussi
+            stale = []
+            for name in todo:
+                upstream_stale = any(dep in stale for dep in self.deps[name])
+                if upstream_stale:
+                    print(f"[{name}] à relancer : amont périmé")
+                if upstream_stale or self.run_stage(name, force=name in force, dry_run=True):
+                    stale.append(name)
+            return stale
+
+        ran, done, running = [], set(), {}
+        with ThreadPoolExecutor(max_workers=self.max_parallel) as pool:
+            while todo or running:
+                for name in [n for n in todo if all(d in done for d in self.deps[n])]:
+                    todo.remove(name)
+                    running[pool.submit(self.run_stage, name, name in force)] = name
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    name = running.pop(future)
+                    if future.result():
+                        ran.append(name)
+                    done.add(name)
+        return ran
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Relance les étapes périmées de la chaîne.")
+    parser.add_argument("targets", nargs="*", help="Étapes cibles (toutes par défaut)")
+    parser.add_argument("--force", nargs="*", default=None, help="Étapes à relancer quoi qu'il arrive (cibles si vide)")
+    parser.add_argument("--dry-run", action="store_true", help="Affiche seulement ce qui serait relancé")
+    parser.add_argument("--parallel", type=int, default=MAX_PARALLEL)
+    args = parser.parse_args()
+
+    force = set()
+    if args.force is not None:
+        force = set(args.force or args.targets)
+    ran = Pipeline(max_parallel=args.parallel).run(args.targets, force=force, dry_run=args.dry_run)
+    print(f"Étapes relancées : {', '.join(ran) if ran else 'aucune'}")
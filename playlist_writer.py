@@ -0,0 +1,121 @@
+"""
+Écriture de playlists Spotify au nom de l'utilisateur.
+
+- ajout des titres par lots de 100 (limite de POST /playlists/{id}/tracks),
+  dans l'ordre, sur une seule connexion keep-alive (session poolée)
+- reprise des 429 (Retry-After) et 5xx avec backoff exponentiel ; les POST
+  (création, ajout) ne sont pas idempotents : un 5xx peut avoir été appliqué,
+  ils ne sont rejoués qu'après avoir relu la playlist (nombre de titres), et
+  la création n'est jamais rejouée sur 5xx (pas de doublon de playlist)
+- profil utilisateur (current_user) lu une fois par writer ; le jeton OAuth
+  est gardé par le cache_handler du client (voir spotify_api.make_user_client)
+
+Un PlaylistWriter par session utilisateur : testable contre le serveur
+factice (benchmarks/fake_spotify.py), voir benchmarks/bench_playlist_writer.py.
+"""
+import random
+import time
+
+from enrichment import http_status, retry_after_seconds
+from spotify_api import chunked, make_user_client
+
+# === CONFIG ===
+SCOPE = "playlist-modify-public"
+MAX_ITEMS_PER_CALL = 100  # Limite de l'endpoint d'ajout de titres
+MAX_RETRIES = 5
+BACKOFF = 0.5             # Attente avant la 1re reprise d'un 5xx (doublée à chaque essai)
+MAX_BACKOFF = 8.0
+
+
+def is_retryable(exc: Exception) -> bool:
+    status = http_status(exc)
+    return status == 429 or (status is not None and 500 <= status < 600)
+
+
+def call_with_retry(fn, *args, max_retries: int = MAX_RETRIES, backoff: float = BACKOFF, idempotent: bool = True,
+                    landed=None, **kwargs):
+    """
+    Appelle fn(*args, **kwargs) ; un 429 attend Retry-After, un 5xx attend
+    backoff x 2^essai (plafonné, avec un peu d'aléa) avant de rejouer l'appel.
+
+    Un appel non idempotent (idempotent=False) n'est rejoué sur 5xx que si
+    `landed()` (relecture côté serveur) montre que l'essai n'a pas été
+    appliqué ; s'il l'a été, l'appel s'arrête là (None). Sans `landed`, seul
+    le 429, refusé avant traitement, est rejoué.
+    """
+    for attempt in range(max_retries + 1):
+        try:
+            return fn(*args, **kwargs)
+        except Exception as e:
+            if not is_retryable(e) or attempt == max_retries:
+                raise
+            if http_status(e) != 429 and not idempotent:
+                if landed is None:
+                    raise
+                if landed():
+                    return None
+            if http_status(e) == 429:
+                wait = retry_after_seconds(e)
+            else:
+                wait = min(MAX_BACKOFF, backoff * 2 ** attempt) * random.uniform(0.5, 1.0)
+            time.sleep(wait)
+
+
+class PlaylistWriter:
+    """
+    Parameters:
+    sp (spotipy.Spotify): Client utilisateur (make_user_client), retries spotipy désactivés.
+    max_retries (int): Reprises par appel sur 429 / 5xx.
+    backoff (float): Attente de base avant la reprise d'un 5xx (secondes).
+    """
+
+    def __init__(self, sp, max_retries: int = MAX_RETRIES, backoff: float = BACKOFF):
+        self.sp = sp
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self._user = None
+
+    @classmethod
+    def from_env(cls, scope: str = SCOPE, prefix: str = None, auth: str = None, **kwargs) -> "PlaylistWriter":
+        return cls(make_user_client(scope, prefix=prefix, auth=auth), **kwargs)
+
+    def _call(self, fn, *args, **kwargs):
+        return call_with_retry(fn, *args, max_retries=self.max_retries, backoff=self.backoff, **kwargs)
+
+    def track_count(self, playlist_id: str) -> int:
+        return self._call(self.sp.playlist, playlist_id, fields="tracks.total")["tracks"]["total"]
+
+    @property
+    def user(self) -> dict:
+        """Profil de l'utilisateur connecté (un seul appel /me par writer)."""
+        if self._user is None:
+            self._user = self._call(self.sp.current_user)
+        return self._user
+
+    def add_items(self, playlist_id: str, track_uris: list, total: int = None):
+        """
+        Ajoute les titres (ids, URIs ou URLs) par lots de 100, dans l'ordre.
+
+        Parameters:
+        total (int): Titres déjà dans la playlist. Connu, un lot en 5xx est
+            rejoué si la playlist n'a pas grandi ; inconnu, le 5xx est levé.
+        """
+        for position, chunk in zip(range(0, len(track_uris), MAX_ITEMS_PER_CALL),
+                                   chunked(track_uris, MAX_ITEMS_PER_CALL)):
+            expected = None if total is None else total + position + len(chunk)
+            landed = None if expected is None else lambda: self.track_count(playlist_id) >= expected
+            self._call(self.sp.playlist_add_items, playlist_id, chunk, position=position,
+                       idempotent=False, landed=landed)
+
+    def create(self, name: str, track_uris: list, public: bool = True, description: str = "") -> dict:
+        """
+        Crée la playlist et y ajoute tous les titres.
+
+        Returns:
+        dict: Objet playlist renvoyé par Spotify (id, external_urls, ...).
+        """
+        # Jamais rejouée sur 5xx : une création appliquée malgré l'erreur donnerait deux playlists
+        playlist = self._call(self.sp.user_playlist_create, self.user["id"], name,
+                              public=public, description=description, idempotent=False)
+        self.add_items(playlist["id"], list(track_uris), total=0)
+        return playlist
@@ -0,0 +1,159 @@
+"""
+Définitions des pools (cardio, dynamique, chill, dansant, empowerment) et
+index multi-attributs pour les requêtes.
+
+Colonnes numériques : valeurs triées + permutation, une borne = un
+searchsorted, et le bitmap d'un intervalle déjà demandé est gardé en cache
+(les bornes des pools reviennent à chaque requête). Colonnes catégorielles :
+un bitmap (bits compactés) par valeur. Une requête (ET de conditions, avec
+groupes OU) combine les bitmaps puis renvoie les track_id, sans parcourir le
+DataFrame ; seule la matérialisation des track_id dépend du nombre de titres
+renvoyés.
+
+    index = PoolIndex(df)
+    index.query({"energy": above(0.8), "genre": "rap"})
+    index.pool("dansant", genre="rap")
+
+Un flag calculé ailleurs (pools de paroles de lyrics_index.py) s'ajoute avec
+add_flag et s'interroge ensuite comme la colonne empowerment :
+{"breakup": True}.
+"""
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+NUMERIC_COLUMNS = ["energy", "danceability", "tempo", "valence"]
+CATEGORY_COLUMNS = ["genre", "activity", "mood", "empowerment"]
+
+
+class Range(NamedTuple):
+    """Intervalle sur une colonne numérique (borne None = ouverte)."""
+    low: float = None
+    high: float = None
+    low_inclusive: bool = False
+    high_inclusive: bool = False
+
+
+def above(x):
+    return Range(low=x)
+
+
+def below(x):
+    return Range(high=x)
+
+
+def between(low, high):
+    """low < valeur <= high."""
+    return Range(low=low, high=high, high_inclusive=True)
+
+
+# === Définitions uniques des pools (utilisées par pools.py et l'app) ===
+# "any" : liste de conditions dont au moins une doit être vraie
+POOL_DEFINITIONS = {
+    "cardio": {"energy": above(0.8), "danceability": above(0.7), "tempo": above(120)},
+    "dynamic": {"energy": between(0.5, 0.8), "danceability": above(0.6)},
+    "chill": {"energy": below(0.4)},
+    # activity = party, ou valence haute en backup (pas de tag Last.fm)
+    "dansant": {"danceability": above(0.8), "any": [{"activity": "party"}, {"valence": above(0.5)}]},
+    "empowerment": {"empowerment": True},
+}
+
+
+def _normalize(value):
+    return value.lower() if isinstance(value, str) else value
+
+
+class PoolIndex:
+    """
+    Parameters:
+    df (pd.DataFrame): track_id plus les colonnes de NUMERIC_COLUMNS et
+        CATEGORY_COLUMNS présentes (les autres sont ignorées).
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        self.track_ids = df["track_id"].to_numpy()
+        self.size = len(df)
+        self._sorted = {}
+        for col in NUMERIC_COLUMNS:
+            if col in df.columns:
+                values = df[col].to_numpy(dtype=float)
+                order = np.argsort(values, kind="stable")
+                valid = order[~np.isnan(values[order])]  # NaN : hors de tout intervalle
+                self._sorted[col] = (values[valid], valid, np.flatnonzero(np.isnan(values)))
+        self._bitmaps = {}
+        for col in CATEGORY_COLUMNS:
+            if col in df.columns:
+                codes, uniques = pd.factorize(df[col].map(_normalize))
+                self._bitmaps[col] = {value: np.packbits(codes == i) for i, value in enumerate(uniques)}
+        self._ranges = {}
+        self._ones = np.packbits(np.ones(self.size, dtype=bool))
+        self._zeros = np.zeros_like(self._ones)
+
+    def add_flag(self, name: str, track_ids):
+        """Ajoute une colonne booléenne : vraie pour les track_id donnés."""
+        mask = pd.Index(self.track_ids).isin(track_ids)  # Hachage : np.isin compare les objets deux à deux
+        self._bitmaps[name] = {True: np.packbits(mask), False: np.packbits(~mask)}
+
+    def range_bitmap(self, col: str, condition: Range) -> np.ndarray:
+        if col not in self._sorted:
+            return self._zeros
+        if (col, condition) not in self._ranges:
+            self._ranges[col, condition] = self._range_bitmap(col, condition)
+        return self._ranges[col, condition]
+
+    def _range_bitmap(self, col: str, condition: Range) -> np.ndarray:
+        values, order, missing = self._sorted[col]
+        lo, hi = 0, len(order)
+        if condition.low is not None:
+            lo = np.searchsorted(values, condition.low, side="left" if condition.low_inclusive else "right")
+        if condition.high is not None:
+            hi = np.searchsorted(values, condition.high, side="right" if condition.high_inclusive else "left")
+        if hi - lo <= self.size // 2:
+            mask = np.zeros(self.size, dtype=bool)
+            mask[order[lo:hi]] = True
+        else:
+            # Intervalle large : on efface le complément, plus court à écrire
+            mask = np.ones(self.size, dtype=bool)
+            mask[order[:lo]] = False
+            mask[order[hi:]] = False
+            mask[missing] = False
+        return np.packbits(mask)
+
+    def value_bitmap(self, col: str, values) -> np.ndarray:
+        if not isinstance(values, (list, tuple, set, frozenset)):
+            values = [values]
+        bitmaps = self._bitmaps.get(col, {})
+        result = self._zeros
+        for value in values:
+            if _normalize(value) in bitmaps:
+                result = result | bitmaps[_normalize(value)]
+        return result
+
+    def bitmap(self, conditions: dict) -> np.ndarray:
+        """ET des conditions : Range (numérique), valeur ou liste de valeurs (catégoriel), "any" (OU)."""
+        # Opérations sans modification sur place : les bitmaps de l'index et du cache sont partagés
+        result = self._ones
+        for col, condition in conditions.items():
+            if col == "any":
+                alternatives = self._zeros
+                for alternative in condition:
+                    alternatives = alternatives | self.bitmap(alternative)
+                result = result & alternatives
+            elif isinstance(condition, Range):
+                result = result & self.range_bitmap(col, condition)
+            else:
+                result = result & self.value_bitmap(col, condition)
+        return result
+
+    def query(self, conditions: dict) -> np.ndarray:
+        """track_id des lignes qui vérifient toutes les conditions (ordre du DataFrame)."""
+        mask = np.unpackbits(self.bitmap(conditions), count=self.size).astype(bool)
+        return self.track_ids[mask]
+
+    def count(self, conditions: dict) -> int:
+        return int(np.bitwise_count(self.bitmap(conditions)).sum())
+
+    def pool(self, name: str, **extra) -> np.ndarray:
+        """track_id d'un pool de POOL_DEFINITIONS, restreint par des conditions supplémentaires (genre="rap"...)."""
+        return self.query({**POOL_DEFINITIONS[name], **extra})
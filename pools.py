@@ -1,42 +1,30 @@
-import pandas as pd
+from dataset_io import read_table, table_columns
+from lyrics_index import LYRIC_POOL_LABELS, load_lyric_pools
+from pool_index import POOL_DEFINITIONS, PoolIndex
 
-# === Charger le dataset ===
-df = pd.read_csv("dataset_with_features.csv")
+INPUT_TABLE = "dataset_with_features"
+POOL_COLUMNS = ["track_id", "energy", "tempo", "danceability", "valence", "activity", "empowerment"]
 
-# === Créer 5 pools ===
+POOL_LABELS = {"cardio": "Cardio", "dynamic": "Dynamic", "chill": "Chill", "dansant": "Dansant",
+               "empowerment": "Empowerment", **LYRIC_POOL_LABELS}
 
-# Cardio pool ➜ energy élevé & tempo rapide
-cardio_pool = df[
-    (df["energy"] > 0.8) &
-    (df["tempo"] > 120)
-]
 
-# Dynamic pool ➜ energy moyen-haut
-dynamic_pool = df[
-    (df["energy"] > 0.5) & 
-    (df["energy"] <= 0.8)
-]
+def main():
+    # === Charger le dataset (colonnes des filtres uniquement, si présentes) ===
+    available = table_columns(INPUT_TABLE)
+    df = read_table(INPUT_TABLE, columns=[col for col in POOL_COLUMNS if col in available])
 
-# Chill pool ➜ energy bas
-chill_pool = df[
-    (df["energy"] < 0.4)
-]
+    # === Pools : définitions partagées avec l'app (pool_index.POOL_DEFINITIONS) ===
+    index = PoolIndex(df)
 
-# Dansant pool ➜ danceability max & activity = party (ou valence haut en backup)
-dansant_pool = df[
-    (df["danceability"] > 0.8) & 
-    (df["valence"] > 0.5)]
+    # === Vérifie les tailles ===
+    for name in POOL_DEFINITIONS:
+        print(f"{POOL_LABELS.get(name, name)} pool : {index.count(POOL_DEFINITIONS[name])} titres")
 
-# Empowerment pool ➜ empowerment True
-empower_pool = df[
-    (df["empowerment"] == True)
-]
-
-# === Vérifie les tailles ===
-print(f"Cardio pool : {len(cardio_pool)} titres")
-print(f"Dynamic pool : {len(dynamic_pool)} titres")
-print(f"Chill pool : {len(chill_pool)} titres")
-print(f"Dansant pool : {len(dansant_pool)} titres")
-print(f"Empowerment pool : {len(empower_pool)} titres")
+    # === Pools de paroles (index inversé, s'il a été construit) ===
+    for name in load_lyric_pools(index):
+        print(f"{POOL_LABELS.get(name, name)} pool : {index.count({name: True})} titres")
 
 
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,341 @@
+"""
+Cache partagé des réponses d'API (Spotify, Genius) entre runs et workers.
+
+Clé normalisée sur (service, endpoint, artiste, titre / id) : casse, accents
+et espaces ignorés, donc "Beyoncé" et " beyonce " partagent la même entrée.
+Les résultats vides (None : titre introuvable, id inconnu) sont aussi mis en
+cache, avec un TTL plus court. Les erreurs (réseau, 429, 5xx) ne le sont pas.
+
+Deux requêtes identiques simultanées n'appellent l'API qu'une fois :
+- dans un process, les threads suivants attendent le résultat du premier
+- entre workers, le premier pose un verrou court dans le backend (SET NX)
+  et les autres relisent le cache jusqu'à son expiration
+
+Backends : mémoire (tests, un seul process), SQLite (un poste, plusieurs
+process) et Redis (plusieurs machines), choisis par RESPONSE_CACHE_URL :
+    memory://    sqlite:///response_cache.sqlite    redis://host:6379/0
+
+    python response_cache.py stats
+    python response_cache.py clear genius
+"""
+import argparse
+import json
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+
+import dotenv
+
+from enrichment import call_with_limit
+
+# === CONFIG ===
+DEFAULT_URL = "sqlite:///response_cache.sqlite"
+PREFIX = "spectral"
+
+DAY = 24 * 3600
+TTL = 90 * DAY           # Réponse trouvée
+NEGATIVE_TTL = 14 * DAY  # Réponse vide (None)
+LOCK_TTL = 30            # Durée max d'un verrou single-flight entre workers (secondes)
+POLL_INTERVAL = 0.1
+
+NEGATIVE = "null"        # Valeur stockée pour un résultat vide
+
+
+def normalize(part) -> str:
+    """Minuscules, sans accents, espaces multiples réduits ; ':' réservé au séparateur."""
+    text = unicodedata.normalize("NFKD", str(part).strip().lower())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return " ".join(text.split()).replace(":", " ")
+
+
+def cache_key(service: str, endpoint: str, *parts) -> str:
+    """ex. cache_key("genius", "search_song", "Beyoncé", "Halo") -> "spectral:genius:search_song:beyonce:halo" """
+    return ":".join([PREFIX, service, endpoint] + [normalize(p) for p in parts])
+
+
+class MemoryBackend:
+    """Dictionnaire en mémoire avec expiration (un seul process)."""
+
+    def __init__(self):
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def get_many(self, keys) -> dict:
+        now = time.time()
+        with self._lock:
+            entries = {k: self._data.get(k) for k in keys}
+        return {k: e[0] for k, e in entries.items() if e is not None and e[1] > now}
+
+    def set_many(self, values: dict, ttl: float):
+        expires = time.time() + ttl
+        with self._lock:
+            self._data.update({k: (v, expires) for k, v in values.items()})
+
+    def claim(self, key: str, ttl: float) -> bool:
+        # Un seul process : le single-flight en mémoire suffit
+        return True
+
+    def release(self, key: str):
+        pass
+
+    def delete_prefix(self, prefix: str) -> int:
+        with self._lock:
+            keys = [k for k in self._data if k.startswith(prefix)]
+            for k in keys:
+                del self._data[k]
+        return len(keys)
+
+    def __len__(self):
+        return len(self._data)
+
+
+class SQLiteBackend:
+    """Table clé / valeur / expiration en SQLite (WAL), partageable entre process d'une machine."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        with self._conn() as conn:
+            conn.execute("""CREATE TABLE IF NOT EXISTS responses (
+                                key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)""")
+            conn.execute("CREATE TABLE IF NOT EXISTS locks (key TEXT PRIMARY KEY, expires_at REAL NOT NULL)")
+
+    def _conn(self) -> sqlite3.Connection:
+        # Une connexion par thread (les workers de run_concurrent)
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get_many(self, keys) -> dict:
+        keys, found, now = list(keys), {}, time.time()
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            rows = self._conn().execute(
+                f"SELECT key, value FROM responses WHERE key IN ({','.join('?' * len(chunk))}) AND expires_at > ?",
+                chunk + [now])
+            found.update(rows)
+        return found
+
+    def set_many(self, values: dict, ttl: float):
+        expires = time.time() + ttl
+        with self._conn() as conn:
+            conn.executemany("INSERT OR REPLACE INTO responses (key, value, expires_at) VALUES (?, ?, ?)",
+                             [(k, v, expires) for k, v in values.items()])
+
+    def claim(self, key: str, ttl: float) -> bool:
+        now = time.time()
+        with self._conn() as conn:
+            conn.execute("DELETE FROM locks WHERE key = ? AND expires_at <= ?", (key, now))
+            return conn.execute("INSERT OR IGNORE INTO locks (key, expires_at) VALUES (?, ?)",
+                                (key, now + ttl)).rowcount == 1
+
+    def release(self, key: str):
+        with self._conn() as conn:
+            conn.execute("DELETE FROM locks WHERE key = ?", (key,))
+
+    def delete_prefix(self, prefix: str) -> int:
+        with self._conn() as conn:
+            return conn.execute("DELETE FROM responses WHERE substr(key, 1, ?) = ?", (len(prefix), prefix)).rowcount
+
+    def __len__(self):
+        return self._conn().execute("SELECT COUNT(*) FROM responses WHERE expires_at > ?", (time.time(),)).fetchone()[0]
+
+
+class RedisBackend:
+    """
+    Parameters:
+    client (redis.Redis): Client Redis (ou fakeredis.FakeRedis pour les tests).
+    """
+
+    def __init__(self, client):
+        self.client = client
+
+    def get_many(self, keys) -> dict:
+        keys = list(keys)
+        values = self.client.mget(keys) if keys else []
+        return {k: v.decode("utf-8") if isinstance(v, bytes) else v for k, v in zip(keys, values) if v is not None}
+
+    def set_many(self, values: dict, ttl: float):
+        with self.client.pipeline(transaction=False) as pipe:
+            for k, v in values.items():
+                pipe.set(k, v, ex=max(1, int(ttl)))
+            pipe.execute()
+
+    def claim(self, key: str, ttl: float) -> bool:
+        return bool(self.client.set(key + ":lock", "1", nx=True, ex=max(1, int(ttl))))
+
+    def release(self, key: str):
+        self.client.delete(key + ":lock")
+
+    def delete_prefix(self, prefix: str) -> int:
+        keys = list(self.client.scan_iter(match=prefix + "*", count=1000))
+        return self.client.delete(*keys) if keys else 0
+
+    def __len__(self):
+        return sum(1 for k in self.client.scan_iter(match=PREFIX + ":*", count=1000) if not k.endswith(b":lock"))
+
+
+class ResponseCache:
+    """
+    Parameters:
+    backend: MemoryBackend, SQLiteBackend ou RedisBackend.
+    ttl (float): Durée de vie d'une réponse trouvée (secondes).
+    negative_ttl (float): Durée de vie d'une réponse vide (None).
+    """
+
+    COUNTERS = ("hits", "negative_hits", "misses", "coalesced", "errors")
+
+    def __init__(self, backend, ttl: float = TTL, negative_ttl: float = NEGATIVE_TTL):
+        self.backend = backend
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.counters = dict.fromkeys(self.COUNTERS, 0)
+        self._lock = threading.Lock()
+        self._inflight = {}  # clé -> [Event, résultat, exception] du premier appelant
+
+    def _count(self, name: str, n: int = 1):
+        with self._lock:
+            self.counters[name] += n
+
+    def stats(self) -> dict:
+        """Compteurs (hits, negative_hits, misses, coalesced, errors) et taux de hit."""
+        with self._lock:
+            stats = dict(self.counters)
+        lookups = stats["hits"] + stats["negative_hits"] + stats["misses"] + stats["coalesced"]
+        stats["hit_rate"] = (lookups - stats["misses"]) / lookups if lookups else 0.0
+        return stats
+
+    def get_many(self, keys, count_misses: bool = False) -> dict:
+        """
+        Réponses en cache (None pour un résultat vide) ; les clés absentes ne sont pas renvoyées.
+        count_misses=True : l'appelant récupère lui-même les absentes, comptées comme appels API.
+        """
+        keys = list(keys)
+        found = {k: json.loads(v) for k, v in self.backend.get_many(keys).items()}
+        negative = sum(v is None for v in found.values())
+        self._count("hits", len(found) - negative)
+        self._count("negative_hits", negative)
+        if count_misses:
+            self._count("misses", len(keys) - len(found))
+        return found
+
+    def set_many(self, values: dict):
+        positive = {k: json.dumps(v) for k, v in values.items() if v is not None}
+        if positive:
+            self.backend.set_many(positive, self.ttl)
+        negative = {k: NEGATIVE for k, v in values.items() if v is None}
+        if negative:
+            self.backend.set_many(negative, self.negative_ttl)
+
+    def get_or_fetch(self, key: str, fetch, *args):
+        """Réponse en cache, sinon fetch(*args) (une seule fois par clé, même en parallèle) puis mise en cache."""
+        found = self.get_many([key])
+        if key in found:
+            return found[key]
+
+        with self._lock:
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[key] = [threading.Event(), None, None]
+        if not leader:
+            self._count("coalesced")
+            flight[0].wait()
+            if flight[2] is not None:
+                raise flight[2]
+            return flight[1]
+
+        try:
+            flight[1] = self._fetch_once(key, fetch, *args)
+            return flight[1]
+        except Exception as e:
+            flight[2] = e
+            self._count("errors")
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[key]
+            flight[0].set()
+
+    def _fetch_once(self, key: str, fetch, *args):
+        # Verrou entre workers : celui qui ne l'obtient pas attend la réponse de l'autre (au plus LOCK_TTL)
+        deadline = time.monotonic() + LOCK_TTL
+        while not self.backend.claim(key, LOCK_TTL):
+            if time.monotonic() > deadline:
+                break
+            time.sleep(POLL_INTERVAL)
+            found = self.backend.get_many([key])
+            if key in found:
+                self._count("coalesced")
+                return json.loads(found[key])
+        try:
+            self._count("misses")
+            value = fetch(*args)
+            self.set_many({key: value})
+            return value
+        finally:
+            self.backend.release(key)
+
+    def wrap(self, fetch, service: str, endpoint: str, key_args, limiter=None):
+        """
+        Version en cache de fetch, à passer à run_concurrent avec limiter=None :
+        seuls les appels réels à l'API prennent un jeton du limiteur.
+
+        Parameters:
+        key_args (callable): args de fetch -> parties de la clé, ex. lambda sp, artist, title: (artist, title).
+        limiter (TokenBucket): Limiteur de débit de l'API (429 gérés comme dans call_with_limit).
+        """
+        def cached_fetch(*args):
+            key = cache_key(service, endpoint, *key_args(*args))
+            if limiter is None:
+                return self.get_or_fetch(key, fetch, *args)
+            return self.get_or_fetch(key, call_with_limit, fetch, limiter, *args)
+        return cached_fetch
+
+    def clear(self, service: str = None) -> int:
+        return self.backend.delete_prefix(":".join([PREFIX, service, ""]) if service else PREFIX + ":")
+
+
+def open_cache(url: str = None, **kwargs) -> ResponseCache:
+    """
+    Cache configuré par `url`, sinon RESPONSE_CACHE_URL (.env), sinon DEFAULT_URL.
+    """
+    if url is None:
+        dotenv.load_dotenv()
+        url = os.getenv("RESPONSE_CACHE_URL", DEFAULT_URL)
+    if url.startswith("memory://"):
+        backend = MemoryBackend()
+    elif url.startswith("sqlite:///"):
+        backend = SQLiteBackend(url[len("sqlite:///"):])
+    elif url.startswith(("redis://", "rediss://", "unix://")):
+        import redis
+        backend = RedisBackend(redis.Redis.from_url(url))
+    else:
+        raise ValueError(f"URL de cache inconnue : {url}")
+    return ResponseCache(backend, **kwargs)
+
+
+def format_stats(cache: ResponseCache) -> str:
+    s = cache.stats()
+    return (f"Cache de réponses : {s['hits']} hits, {s['negative_hits']} hits négatifs, {s['misses']} appels API, "
+            f"{s['coalesced']} dédupliqués, {s['errors']} erreurs (taux de hit {s['hit_rate']:.0%})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cache partagé des réponses d'API")
+    parser.add_argument("command", choices=["stats", "clear"])
+    parser.add_argument("service", nargs="?", help="spotify ou genius (clear)")
+    parser.add_argument("--url", default=None, help="Backend (défaut : RESPONSE_CACHE_URL ou " + DEFAULT_URL + ")")
+    args = parser.parse_args()
+
+    cache = open_cache(args.url)
+    if args.command == "stats":
+        print(f"{len(cache.backend)} réponses en cache")
+    else:
+        print(f"{cache.clear(args.service)} réponses supprimées")
@@ -0,0 +1,66 @@
+"""
+Fallback mood à partir des paroles (modèle nlptown, 1 à 5 étoiles).
+
+Inférence par lots : les textes sont tokenisés une fois (troncature à 512
+tokens par le tokenizer, pas par caractères), triés par longueur puis passés
+au modèle par lots avec padding dynamique, pour ne presque jamais calculer
+sur du padding.
+"""
+import torch
+from transformers import AutoModelForSequenceClassification, AutoTokenizer
+
+MODEL_NAME = "nlptown/bert-base-multilingual-uncased-sentiment"
+MAX_TOKENS = 512
+
+# Classe i du modèle = i+1 étoiles (LABEL_1..LABEL_5) -> mood
+STARS_TO_MOOD = {1: "sad", 2: "sad", 3: "calm", 4: "happy", 5: "happy"}
+
+BACKENDS = ("torch", "int8", "onnx")
+
+
+class SentimentMoodModel:
+    """
+    Parameters:
+    batch_size (int): Nombre de textes par passe du modèle.
+    num_threads (int): Threads CPU utilisés par torch (None = défaut torch).
+    backend (str): "torch" (fp32), "int8" (quantification dynamique des couches
+        linéaires) ou "onnx" (ONNX Runtime via optimum, si installé).
+    """
+
+    def __init__(self, model_name: str = MODEL_NAME, batch_size: int = 32, num_threads: int = None,
+                 backend: str = "torch"):
+        if backend not in BACKENDS:
+            raise ValueError(f"Backend inconnu : {backend} (attendu : {', '.join(BACKENDS)})")
+        if num_threads:
+            torch.set_num_threads(num_threads)
+        self.batch_size = batch_size
+        self.backend = backend
+        self.tokenizer = AutoTokenizer.from_pretrained(model_name)
+
+        if backend == "onnx":
+            from optimum.onnxruntime import ORTModelForSequenceClassification
+            self.model = ORTModelForSequenceClassification.from_pretrained(model_name, export=True)
+        else:
+            self.model = AutoModelForSequenceClassification.from_pretrained(model_name).eval()
+            if backend == "int8":
+                self.model = torch.ao.quantization.quantize_dynamic(self.model, {torch.nn.Linear}, dtype=torch.qint8)
+
+    def predict_stars(self, texts) -> list:
+        """Nombre d'étoiles (1-5) prédit pour chaque texte, dans l'ordre d'entrée."""
+        encodings = self.tokenizer(list(texts), truncation=True, max_length=MAX_TOKENS)
+        lengths = [len(ids) for ids in encodings["input_ids"]]
+        order = sorted(range(len(lengths)), key=lengths.__getitem__)
+        stars = [0] * len(lengths)
+
+        for start in range(0, len(order), self.batch_size):
+            idx = order[start:start + self.batch_size]
+            batch = self.tokenizer.pad({k: [v[i] for i in idx] for k, v in encodings.items()}, return_tensors="pt")
+            with torch.inference_mode():
+                logits = self.model(**batch).logits
+            for i, label in zip(idx, logits.argmax(dim=-1).tolist()):
+                stars[i] = label + 1
+        return stars
+
+    def predict_moods(self, texts) -> list:
+        """Mood (sad / calm / happy) pour chaque texte, dans l'ordre d'entrée."""
+        return [STARS_TO_MOOD[s] for s in self.predict_stars(texts)]
@@ -0,0 +1,85 @@
+"""
+Séquenceur de playlist : suit une courbe cible d'énergie et de tempo par
+programme au lieu de tirer chaque phase au hasard.
+
+Chaque phase de catalog.PROGRAMMES reçoit une courbe (début -> fin) ; chaque
+créneau de 3.5 min a donc une cible (énergie, tempo). Les créneaux sont
+remplis dans l'ordre par le titre du pool le plus proche de sa cible, calcul
+vectorisé sur tout le pool, avec les contraintes :
+- jamais deux fois le même titre (les pools se recouvrent entre phases)
+- pas deux fois le même artiste (relâché seulement si le pool est épuisé)
+- écart de tempo borné avec le titre précédent (relâché si aucun titre ne convient)
+Un léger bruit tiré avec `seed` varie les playlists à cible égale.
+"""
+import numpy as np
+
+from catalog import PROGRAMMES, TRACK_DURATION
+
+# Courbe par phase (mêmes phases que catalog.PROGRAMMES) : (énergie début, fin), (tempo début, fin)
+CURVES = {
+    "renfo": [((0.85, 0.95), (125, 140)), ((0.8, 0.6), (128, 110)), ((0.35, 0.15), (100, 75))],
+    "flex": [((0.7, 0.55), (115, 100)), ((0.35, 0.1), (95, 70))],
+    "pole dance": [((0.55, 0.75), (100, 118)), ((0.65, 0.8), (100, 125))],
+}
+
+MAX_TEMPO_JUMP = 12.0  # BPM max entre deux titres consécutifs
+ENERGY_SCALE = 0.1     # Écart d'énergie équivalent à ...
+TEMPO_SCALE = 10.0     # ... cet écart de tempo (BPM) dans le score
+NOISE = 0.25           # Amplitude du bruit ajouté au score (variété à seed différente)
+
+
+def targets(programme: str) -> list:
+    """(nom de phase, pool, cibles) avec cibles un tableau (créneaux x 2) énergie / tempo."""
+    phases = []
+    for (name, pool, duration), (energy, tempo) in zip(PROGRAMMES[programme], CURVES[programme]):
+        n_slots = int(duration / TRACK_DURATION)
+        steps = np.linspace(0, 1, n_slots)
+        phases.append((name, pool, np.column_stack([energy[0] + steps * (energy[1] - energy[0]),
+                                                    tempo[0] + steps * (tempo[1] - tempo[0])])))
+    return phases
+
+
+def sequence(catalog, genre: str, programme: str, seed=None, theme: str = None) -> list:
+    """
+    Playlist ordonnée (track_id) pour le genre et le programme.
+
+    Parameters:
+    catalog (Catalog): Catalogue chargé (pools par genre, énergie, tempo, artistes).
+    seed (int): Graine du bruit ; même graine et même catalogue = même playlist.
+    theme (str): Pool de paroles (catalog.themes) auquel restreindre chaque phase, ou None.
+    """
+    rng = np.random.default_rng(seed)
+    used = np.zeros(len(catalog.energy), dtype=bool)
+    # Code -1 (artiste inconnu) : dernière case ; initial=-1 pour un catalogue vide
+    used_artists = np.zeros(catalog.artist_codes.max(initial=-1) + 2, dtype=bool)
+    previous_tempo = None
+    playlist = []
+
+    for _, pool, slots in targets(programme):
+        rows = catalog.pool_positions(genre, pool, theme)
+        if len(rows) == 0:
+            continue
+        energy, tempo, artists = catalog.energy[rows], catalog.tempo[rows], catalog.artist_codes[rows]
+        valid = ~(np.isnan(energy) | np.isnan(tempo))
+        noise = rng.random(len(rows)) * NOISE
+
+        for target_energy, target_tempo in slots:
+            free = valid & ~used[rows]
+            if not free.any():
+                break
+            candidates = free & ~used_artists[artists]
+            if not candidates.any():
+                candidates = free
+            if previous_tempo is not None:
+                smooth = candidates & (np.abs(tempo - previous_tempo) <= MAX_TEMPO_JUMP)
+                if smooth.any():
+                    candidates = smooth
+            score = ((energy - target_energy) / ENERGY_SCALE) ** 2 + ((tempo - target_tempo) / TEMPO_SCALE) ** 2 + noise
+            best = np.argmin(np.where(candidates, score, np.inf))
+
+            used[rows[best]] = True
+            used_artists[artists[best]] = True
+            previous_tempo = tempo[best]
+            playlist.append(rows[best])
+
+    return catalog.index.track_ids[np.array(playlist, dtype=np.intp)].tolist()
@@ -0,0 +1,216 @@
+"""
+Index "titres similaires" sur les features audio (version production de
+notebooks/song_to_song_model.ipynb).
+
+Même mesure que le notebook (similarité cosinus sur les features
+standardisées) sans la matrice N x N : les vecteurs normalisés sont répartis
+en listes par k-means sphérique (IVF). Une requête compare le vecteur aux
+centroïdes, puis exactement aux titres des N_PROBE listes les plus proches.
+Scaler, centroïdes et listes sont enregistrés dans INDEX_FILE avec la version
+(mtime) de la table source.
+
+    python similarity.py build             # construit / met à jour l'index
+    python similarity.py query <track_id>
+"""
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+from dataset_io import read_table, table_file
+
+SOURCE_TABLE = "dataset_mood_activity"
+INDEX_FILE = "similarity_index.npz"
+FEATURES = ['danceability', 'energy', 'valence', 'acousticness', 'instrumentalness', 'speechiness', 'liveness']
+
+N_PROBE = 8           # Listes parcourues par requête (précision / vitesse, voir benchmarks/bench_similarity.py)
+KMEANS_ITER = 15
+ASSIGN_CHUNK = 65536  # Lignes par produit matriciel lors de l'affectation aux centroïdes
+
+
+def fit_scaler(X: np.ndarray) -> tuple:
+    """Moyenne et écart-type par feature (StandardScaler), écart-type nul remplacé par 1."""
+    mean, scale = X.mean(axis=0), X.std(axis=0)
+    scale[scale == 0] = 1.0
+    return mean, scale
+
+
+def embed(X: np.ndarray, mean: np.ndarray, scale: np.ndarray) -> np.ndarray:
+    """Features standardisées puis normalisées : le produit scalaire donne la similarité cosinus."""
+    Z = ((X - mean) / scale).astype(np.float32)
+    norms = np.linalg.norm(Z, axis=1, keepdims=True)
+    return Z / np.where(norms == 0, 1, norms)
+
+
+def nearest_centroid(Z: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    return np.concatenate([np.argmax(Z[i:i + ASSIGN_CHUNK] @ centroids.T, axis=1)
+                           for i in range(0, len(Z), ASSIGN_CHUNK)]) if len(Z) else np.array([], dtype=int)
+
+
+def spherical_kmeans(Z: np.ndarray, n_lists: int, n_iter: int = KMEANS_ITER, seed: int = 0) -> tuple:
+    """Centroïdes unitaires et liste de chaque vecteur."""
+    rng = np.random.default_rng(seed)
+    centroids = Z[rng.choice(len(Z), n_lists, replace=False)]
+    for _ in range(n_iter):
+        assign = nearest_centroid(Z, centroids)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assign, Z)
+        counts = np.bincount(assign, minlength=n_lists)
+        # Liste vide : réinitialisée sur un vecteur tiré au hasard
+        empty = counts == 0
+        sums[empty] = Z[rng.choice(len(Z), empty.sum(), replace=False)]
+        norms = np.linalg.norm(sums, axis=1, keepdims=True)
+        centroids = sums / np.where(norms == 0, 1, norms)
+    return centroids, nearest_centroid(Z, centroids)
+
+
+class SimilarityIndex:
+    """
+    Parameters:
+    track_ids (np.ndarray): Identifiants, dans l'ordre de la table source.
+    vectors (np.ndarray): Vecteurs normalisés (voir embed), même ordre.
+    mean, scale (np.ndarray): Scaler ajusté sur la table.
+    centroids (np.ndarray): Centroïdes des listes.
+    assign (np.ndarray): Liste de chaque vecteur.
+    version (float): mtime de la table source lors de la construction.
+    """
+
+    def __init__(self, track_ids, vectors, mean, scale, centroids, assign, version=None):
+        self.track_ids = np.asarray(track_ids)
+        self.vectors = vectors
+        self.mean, self.scale = mean, scale
+        self.centroids = centroids
+        self.assign = assign
+        self.version = version
+        # Vecteurs regroupés par liste : une liste = une tranche contiguë
+        self._order = np.argsort(assign, kind="stable")
+        self._grouped = vectors[self._order]
+        self._offsets = np.searchsorted(assign[self._order], np.arange(len(centroids) + 1))
+        self._position = pd.Index(self.track_ids)
+
+    def __len__(self):
+        return len(self.track_ids)
+
+    @classmethod
+    def build(cls, df: pd.DataFrame, n_lists: int = None, seed: int = 0, version=None) -> "SimilarityIndex":
+        """Ajuste le scaler et les listes sur df (track_id + FEATURES) ; environ 4 x sqrt(N) listes par défaut."""
+        X = df[FEATURES].fillna(0).to_numpy(dtype=np.float64)
+        mean, scale = fit_scaler(X)
+        vectors = embed(X, mean, scale)
+        n_lists = n_lists or max(1, min(len(df), int(4 * np.sqrt(len(df)))))
+        centroids, assign = spherical_kmeans(vectors, n_lists, seed=seed)
+        return cls(df["track_id"].to_numpy(), vectors, mean, scale, centroids, assign, version)
+
+    def save(self, path: str = INDEX_FILE):
+        tmp = path + ".tmp.npz"
+        np.savez(tmp, track_ids=self.track_ids.astype(str), vectors=self.vectors, mean=self.mean, scale=self.scale,
+                 centroids=self.centroids, assign=self.assign, version=np.float64(self.version or 0))
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str = INDEX_FILE) -> "SimilarityIndex":
+        with np.load(path) as data:
+            return cls(data["track_ids"].astype(object), data["vectors"], data["mean"], data["scale"],
+                       data["centroids"], data["assign"], float(data["version"]))
+
+    def positions(self, track_ids) -> np.ndarray:
+        """Position dans la table de chaque track_id (-1 si absent)."""
+        return self._position.get_indexer(track_ids)
+
+    def search(self, queries: np.ndarray, k: int = 10, n_probe: int = N_PROBE, mask: np.ndarray = None,
+               exclude=None) -> tuple:
+        """
+        Top-k approché pour un lot de requêtes.
+
+        Parameters:
+        queries (np.ndarray): Vecteurs normalisés (Q x d).
+        mask (np.ndarray): Lignes autorisées (booléens dans l'ordre de la table), ex. genre ou pool.
+        exclude (list): Position à exclure pour chaque requête (le titre de départ), ou None.
+
+        Returns:
+        tuple: (positions, scores), listes de Q tableaux triés par similarité décroissante.
+        """
+        queries = np.atleast_2d(queries).astype(np.float32)
+        probes = np.argsort(-(queries @ self.centroids.T), axis=1)
+        if mask is not None:
+            # Filtre : autant de listes en plus que le filtre en écarte (même nombre de candidats)
+            n_probe = int(np.ceil(n_probe / max(mask.mean(), 1 / len(self.centroids))))
+        positions, scores = [], []
+        for q, query in enumerate(queries):
+            skip = None if exclude is None else exclude[q]
+            n = min(n_probe, len(self.centroids))
+            while True:
+                lists = probes[q, :n]
+                candidates = np.concatenate([np.arange(self._offsets[l], self._offsets[l + 1]) for l in lists])
+                rows = self._order[candidates]
+                keep = np.ones(len(rows), dtype=bool) if mask is None else mask[rows]
+                if skip is not None:
+                    keep &= rows != skip
+                # Filtre restrictif : on élargit aux listes suivantes jusqu'à avoir k titres
+                if keep.sum() >= k or n == len(self.centroids):
+                    break
+                n = min(2 * n, len(self.centroids))
+            candidates, rows = candidates[keep], rows[keep]
+            sims = self._grouped[candidates] @ query
+            top = np.argpartition(-sims, min(k, len(sims)) - 1)[:k] if len(sims) > k else np.arange(len(sims))
+            top = top[np.argsort(-sims[top], kind="stable")]
+            positions.append(rows[top])
+            scores.append(sims[top])
+        return positions, scores
+
+    def exact_search(self, queries: np.ndarray, k: int = 10, mask: np.ndarray = None, exclude=None) -> tuple:
+        """Top-k exact (parcours complet), référence pour le rappel de search."""
+        queries = np.atleast_2d(queries).astype(np.float32)
+        positions, scores = [], []
+        for q, query in enumerate(queries):
+            sims = self.vectors @ query
+            if mask is not None:
+                sims = np.where(mask, sims, -np.inf)
+            if exclude is not None and exclude[q] is not None:
+                sims[exclude[q]] = -np.inf
+            top = np.argsort(-sims, kind="stable")[:k]
+            top = top[np.isfinite(sims[top])]
+            positions.append(top)
+            scores.append(sims[top])
+        return positions, scores
+
+    def similar_to(self, track_ids, k: int = 10, mask: np.ndarray = None, n_probe: int = N_PROBE) -> list:
+        """track_id des k titres les plus proches de chaque titre demandé (lui-même exclu)."""
+        rows = self.positions(track_ids)
+        if (rows < 0).any():
+            raise KeyError(f"track_id absent de l'index : {list(np.asarray(track_ids)[rows < 0])}")
+        positions, _ = self.search(self.vectors[rows], k, n_probe, mask, exclude=list(rows))
+        return [self.track_ids[p] for p in positions]
+
+
+def source_version(name: str = SOURCE_TABLE) -> float:
+    return os.path.getmtime(table_file(name))
+
+
+def load_or_build(name: str = SOURCE_TABLE, path: str = INDEX_FILE) -> SimilarityIndex:
+    """Index enregistré s'il correspond à la version actuelle de la table, reconstruit sinon."""
+    version = source_version(name)
+    if os.path.exists(path):
+        index = SimilarityIndex.load(path)
+        if index.version == version:
+            return index
+    print(f"Construction de l'index de similarité ({name})...")
+    index = SimilarityIndex.build(read_table(name, columns=["track_id"] + FEATURES), version=version)
+    index.save(path)
+    return index
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Index de titres similaires (features audio).")
+    parser.add_argument("command", choices=["build", "query"])
+    parser.add_argument("track_ids", nargs="*")
+    parser.add_argument("-k", type=int, default=10)
+    args = parser.parse_args()
+
+    index = load_or_build()
+    if args.command == "build":
+        print(f"Index prêt : {len(index)} titres, {len(index.centroids)} listes → {INDEX_FILE}")
+    else:
+        for track_id, similar in zip(args.track_ids, index.similar_to(args.track_ids, args.k)):
+            print(f"{track_id} : {', '.join(similar)}")
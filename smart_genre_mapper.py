@@ -1,34 +1,30 @@
-import pandas as pd
-import json
+import argparse
+import hashlib
+import os
 import re
-from sklearn.ensemble import RandomForestClassifier
-
-INPUT_CSV = "clean.csv"
-CACHE_FILE = "artist_genre_cache.json"
-OUTPUT_CSV = "dataset_avec_genres_ml.csv"
-
-# === Load ===
-df = pd.read_csv(INPUT_CSV)
-with open(CACHE_FILE, "r") as f:
-    artist_genre_cache = json.load(f)
-
-artistes_fr = [
-    "johnny halliday", "michel sardou", "claude francois", "michel berger", "france gall", "francis cabrel",
-    "mylene farmer", "zazie", "pascal obispo", "helene segara", "daniel balavoine", "jean-jacques goldman",
-    "michel polnareff", "serge gainsbourg", "charlotte gainsbourg", "henri salvador", "alain souchon", "calogero",
-    "renaud", "julien clerc", "charles aznavour", "alain bashung", "bernard lavilliers", "joe dassin",
-    "jacques dutronc", "celine dion", "cali", "-m-", "zaho de sagazan", "eddy de pretto", "benabar",
-    "christophe", "georges brassens", "jacques brel", "leo ferre", "jean-louis aubert", "angele", "patrick bruel",
-    "philippe katerine", "jean ferrat", "charles trenet", "amir", "benjamin biolay", "eddy mitchell", "julien dore",
-    "francoise hardi", "vianney", "ben mazué", "grand corps malade", "louane", "soprano", "les rita mitsouko",
-    "les fatals picards", "izia", "stupeflip", "louise attaque", "les caméléons", "francis lalanne",
-    "pierre bachelet", "bernard adamus", "kyo", "bb brunes", "arno", "emily loizeau", "alain chamfort",
-    "étienne daho", "philippe lafontaine", "dominique a", "nicolas peyrac", "bénabar", "brigitte", "matmatah",
-    "fishbach", "raphaël", "la grande sophie", "indochine", "tryo", "saez", "indila", "mademoiselle k",
-    "grands corps malade", "catherine ringer", "les ogres de barback", "les wampas", "les cowboys fringants",
-    "les hurlements d'léo", "les têtes raides", "mansfield.tya", "manu chao", "dave", "yann tiersen",
-    "thomas fersen", "stromae", "dorothée"
-]
+import unicodedata
+from functools import lru_cache
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import HistGradientBoostingClassifier, RandomForestClassifier
+
+from dataset_io import read_table, write_table
+from genre_cache import open_genre_cache
+
+INPUT_TABLE = "clean"
+CACHE_DB = "artist_genre_cache.sqlite"
+OUTPUT_TABLE = "dataset_avec_genres_ml"
+ARTISTES_FR_FILE = "artistes_fr.txt"
+
+# === Classifieur pour les lignes "Autre" ===
+FEATURES = ["tempo", "valence", "danceability", "energy", "acousticness"]
+MODEL_FILE = "genre_model.joblib"
+PREDICTIONS_FILE = "genre_predictions.parquet"
+MODEL_KIND = "forest"     # "forest", "forest_small" ou "hgb" (voir benchmarks/bench_genre_model.py)
+RANDOM_STATE = 0
+RETRAIN_FRACTION = 0.05   # Réentraînement si plus de 5 % des lignes d'entraînement sont nouvelles ou modifiées
 
 rules = [
     {"pattern": ["k-pop"], "genre": "K-Pop"},
@@ -45,41 +41,178 @@ rules = [
     {"pattern": ["folk", "singer-songwriter"], "genre": "Contemporain"},
 ]
 
+# Une expression par règle (ses motifs en alternative), évaluées dans l'ordre des règles
+COMPILED_RULES = [(re.compile("|".join(re.escape(p) for p in rule["pattern"])), rule["genre"]) for rule in rules]
+
+# Featurings explicites seulement : "stromae feat. angele" -> ["stromae", "angele"]. "&", "," ou "x"
+# font aussi partie de noms de groupes ("sam & dave") : découper dessus ferait matcher "dave"
+COLLAB_SEPARATOR = re.compile(r"\s*\b(?:feat|ft|featuring)\b\.?\s*")
+
+
+def normalize_name(name: str) -> str:
+    """Nom d'artiste comparable : minuscules, sans accents, espaces réduits."""
+    name = unicodedata.normalize("NFKD", str(name).lower())
+    return " ".join("".join(c for c in name if not unicodedata.combining(c)).split())
+
+
+@lru_cache(maxsize=None)
+def load_artistes_fr(path: str = ARTISTES_FR_FILE) -> frozenset:
+    """Noms normalisés de artistes_fr.txt (lignes vides et commentaires # ignorés)."""
+    with open(path, encoding="utf-8") as f:
+        return frozenset(normalize_name(line) for line in f if line.strip() and not line.lstrip().startswith("#"))
+
+
+def is_artiste_fr(artist: str, artistes_fr=None) -> bool:
+    """
+    Correspondance exacte sur le nom entier ou sur l'un des noms d'un
+    featuring : "dave" ne matche plus "dave matthews band" ni "sam & dave",
+    ni "cali" "calibre 50".
+    """
+    artistes_fr = load_artistes_fr() if artistes_fr is None else artistes_fr
+    name = normalize_name(artist)
+    return name in artistes_fr or any(part in artistes_fr for part in COLLAB_SEPARATOR.split(name))
+
+
+@lru_cache(maxsize=None)
+def rule_genre(spotify_genre: str):
+    """Macro-genre de la première règle dont un motif apparaît dans le genre Spotify (None sinon)."""
+    g = spotify_genre.lower()
+    for pattern, genre in COMPILED_RULES:
+        if pattern.search(g):
+            return genre
+    return None
+
+
+@lru_cache(maxsize=None)
+def genre_of_list(spotify_genres: tuple) -> str:
+    for genre in spotify_genres:
+        macro = rule_genre(genre)
+        if macro:
+            return macro
+    return "Autre"
+
+
 def map_genre(spotify_genres, artist):
-    if any(a in artist for a in artistes_fr):
+    if is_artiste_fr(artist):
         return "Variété-Pop"
     if not spotify_genres:
         return "Autre"
-    for genre in spotify_genres:
-        g = genre.lower()
-        for rule in rules:
-            for pat in rule["pattern"]:
-                if pat in g:
-                    return rule["genre"]
-    return "Autre"
+    return genre_of_list(tuple(spotify_genres))
+
+
+def artist_keys(artists: pd.Series):
+    """
+    Artistes distincts en minuscules (clés du cache de genres).
+
+    Returns:
+    tuple: (codes, clés) : code de chaque ligne dans le tableau des clés.
+    """
+    codes, uniques = pd.factorize(artists, use_na_sentinel=False)
+    keys = pd.Index(uniques, dtype=object).fillna('').astype(str).str.lower()
+    return codes, keys
+
+
+def map_genres(artists: pd.Series, artist_genre_cache: dict) -> np.ndarray:
+    """
+    map_genre pour toute une colonne : une évaluation par artiste distinct
+    (et une par liste de genres distincte), diffusée ensuite aux lignes.
+    """
+    codes, keys = artist_keys(artists)
+    labels = np.array([map_genre(artist_genre_cache.get(key, []), key) for key in keys], dtype=object)
+    return labels[codes]
+
+
+def make_model(kind: str = MODEL_KIND):
+    """Classifieur non entraîné : forêt complète (historique), forêt compacte ou gradient boosting."""
+    if kind == "forest":
+        return RandomForestClassifier(n_jobs=-1, random_state=RANDOM_STATE)
+    if kind == "forest_small":
+        return RandomForestClassifier(n_estimators=50, max_depth=16, min_samples_leaf=2, n_jobs=-1,
+                                      random_state=RANDOM_STATE)
+    if kind == "hgb":
+        return HistGradientBoostingClassifier(random_state=RANDOM_STATE)
+    raise ValueError(f"Modèle inconnu : {kind} (attendu : forest, forest_small, hgb)")
+
+
+def row_hashes(df: pd.DataFrame) -> np.ndarray:
+    return pd.util.hash_pandas_object(df, index=False).to_numpy()
+
+
+def load_or_train(X: pd.DataFrame, y: pd.Series, kind: str = MODEL_KIND, path: str = MODEL_FILE,
+                  retrain: bool = False) -> dict:
+    """
+    Modèle persisté avec le hash de ses données d'entraînement.
+
+    Le modèle enregistré est réutilisé tant que les données d'entraînement
+    n'ont pas changé de plus de RETRAIN_FRACTION (lignes absentes de son
+    entraînement) ; sinon il est réentraîné puis sauvegardé.
+
+    Returns:
+    dict: {"model", "data_hash", "kind", "features", "rows"}.
+    """
+    rows = row_hashes(X.assign(genre=y.to_numpy()))
+    data_hash = hashlib.sha256(kind.encode() + np.sort(rows).tobytes()).hexdigest()
+    if not retrain and os.path.exists(path):
+        saved = joblib.load(path)
+        if saved["kind"] == kind and saved["features"] == list(X.columns):
+            unseen = (~np.isin(rows, saved["rows"])).mean() if len(rows) else 0.0
+            if saved["data_hash"] == data_hash or unseen <= RETRAIN_FRACTION:
+                print(f"Modèle réutilisé : {path} ({unseen:.1%} de lignes d'entraînement nouvelles)")
+                return saved
+
+    print(f"Entraînement du modèle ({kind}, {len(X)} lignes)...")
+    saved = {"model": make_model(kind).fit(X, y), "data_hash": data_hash, "kind": kind,
+             "features": list(X.columns), "rows": np.sort(rows)}
+    joblib.dump(saved, path)
+    return saved
+
+
+def predict_undetermined(df: pd.DataFrame, saved: dict, path: str = PREDICTIONS_FILE) -> pd.DataFrame:
+    """
+    Genre prédit pour les lignes "Autre". Les prédictions sont gardées par
+    track_id : seules les lignes nouvelles, aux features modifiées ou
+    prédites par un autre modèle repassent dans le classifieur.
+    """
+    mask = df["genre"] == "Autre"
+    X = df.loc[mask, saved["features"]].fillna(0)
+    todo = pd.DataFrame({"track_id": df.loc[mask, "track_id"].to_numpy(), "row_hash": row_hashes(X),
+                         "genre": None})
+
+    if os.path.exists(path):
+        previous = pd.read_parquet(path)
+        previous = previous[previous["model"] == saved["data_hash"]].drop_duplicates("track_id")
+        known = todo.merge(previous, on=["track_id", "row_hash"], how="left", suffixes=("", "_prev"))
+        todo["genre"] = known["genre_prev"].to_numpy()
 
-macro_genres = []
+    missing = todo["genre"].isna().to_numpy()
+    print(f"Prédiction : {missing.sum()} lignes sur {len(todo)} à classer")
+    if missing.any():
+        todo.loc[missing, "genre"] = saved["model"].predict(X[missing])
 
-for artist in df["artist"].fillna('').astype(str).str.lower():
-    spotify_genres = artist_genre_cache.get(artist, [])
-    macro = map_genre(spotify_genres, artist)
-    macro_genres.append(macro)
+    df.loc[mask, "genre"] = todo["genre"].to_numpy()
+    todo.assign(model=saved["data_hash"]).to_parquet(path, index=False)
+    return df
 
-df["genre"] = macro_genres
 
-train_df = df[df["genre"] != "Autre"]
-X = train_df[["tempo", "valence", "danceability", "energy", "acousticness"]].fillna(0)
-y = train_df["genre"]
+def main(retrain: bool = False):
+    # === Load ===
+    df = read_table(INPUT_TABLE)
+    # Lookups par clé : seuls les artistes du dataset sont lus depuis le cache (import unique de l'ancien JSON)
+    with open_genre_cache(CACHE_DB) as cache:
+        artist_genre_cache = cache.get_many(artist_keys(df["artist"])[1].unique())
 
-clf = RandomForestClassifier()
-clf.fit(X, y)
+    df["genre"] = map_genres(df["artist"], artist_genre_cache)
 
-mask_autre = df["genre"] == "Autre"
-X_autre = df.loc[mask_autre, ["tempo", "valence", "danceability", "energy", "acousticness"]].fillna(0)
-preds = clf.predict(X_autre)
-df.loc[mask_autre, "genre"] = preds
+    train_df = df[df["genre"] != "Autre"]
+    saved = load_or_train(train_df[FEATURES].fillna(0), train_df["genre"], retrain=retrain)
+    df = predict_undetermined(df, saved)
 
-df.to_csv(OUTPUT_CSV, index=False)
-print(f" Sauvegarde terminée sans sous-genre : {OUTPUT_CSV}")
+    write_table(df, OUTPUT_TABLE)
+    print(f" Sauvegarde terminée sans sous-genre : {OUTPUT_TABLE}")
 
 
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Macro-genres par règles, puis classifieur pour les lignes \"Autre\".")
+    parser.add_argument("--retrain", action="store_true", help="Réentraîne le modèle même s'il est à jour")
+    args = parser.parse_args()
+    main(retrain=args.retrain)
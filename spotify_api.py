@@ -0,0 +1,152 @@
+import os
+
+import dotenv
+import requests
+import spotipy
+from spotipy.cache_handler import MemoryCacheHandler
+from spotipy.oauth2 import SpotifyClientCredentials, SpotifyOAuth
+
+from enrichment import run_concurrent
+from response_cache import cache_key
+
+
+def pooled_session(pool_size: int = 1) -> requests.Session:
+    """Session HTTP keep-alive (connexions réutilisées), sans retries automatiques."""
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def make_spotify_client(concurrency: int = 8, prefix: str = None, auth: str = None) -> spotipy.Spotify:
+    """
+    Crée un client Spotify partageable entre threads.
+
+    Le pool de connexions est dimensionné sur `concurrency` et les retries
+    internes de spotipy sont désactivés : les 429 remontent avec leur en-tête
+    Retry-After jusqu'au TokenBucket partagé (voir enrichment.py).
+
+    Parameters:
+    concurrency (int): Nombre de requêtes simultanées prévues.
+    prefix (str): URL de base de l'API (ex. serveur Spotify factice local).
+    auth (str): Jeton d'accès fixe ; sinon Client Credentials lus dans le .env.
+    """
+    session = pooled_session(concurrency)
+    if auth is None:
+        dotenv.load_dotenv()
+        if not os.getenv("SPOTIPY_CLIENT_ID") or not os.getenv("SPOTIPY_CLIENT_SECRET"):
+            raise ValueError("Clé Spotify API manquante. Vérifie ton .env !")
+        sp = spotipy.Spotify(auth_manager=SpotifyClientCredentials(), requests_session=session, retries=0, status_retries=0)
+    else:
+        sp = spotipy.Spotify(auth=auth, requests_session=session, retries=0, status_retries=0)
+
+    if prefix:
+        sp.prefix = prefix
+    return sp
+
+
+def make_user_client(scope: str, prefix: str = None, auth: str = None, cache_handler=None) -> spotipy.Spotify:
+    """
+    Client Spotify au nom d'un utilisateur (OAuth), pour écrire des playlists.
+
+    Identifiants lus dans le .env (SPOTIPY_CLIENT_ID, SPOTIPY_CLIENT_SECRET,
+    SPOTIPY_REDIRECT_URI). Le jeton est gardé par `cache_handler` (un par
+    session utilisateur, en mémoire par défaut) et rafraîchi par spotipy.
+    Comme make_spotify_client : retries de spotipy désactivés, voir
+    playlist_writer.py pour la reprise sur 429 / 5xx.
+
+    Parameters:
+    scope (str): Droits demandés (ex. "playlist-modify-public").
+    prefix (str): URL de base de l'API (ex. serveur Spotify factice local).
+    auth (str): Jeton d'accès fixe (tests) ; sinon flux OAuth.
+    cache_handler: Stockage du jeton OAuth (spotipy.cache_handler).
+    """
+    session = pooled_session()
+    if auth is None:
+        dotenv.load_dotenv()
+        missing = [k for k in ("SPOTIPY_CLIENT_ID", "SPOTIPY_CLIENT_SECRET", "SPOTIPY_REDIRECT_URI") if not os.getenv(k)]
+        if missing:
+            raise ValueError(f"Configuration Spotify manquante ({', '.join(missing)}). Vérifie ton .env !")
+        auth_manager = SpotifyOAuth(scope=scope, cache_handler=cache_handler or MemoryCacheHandler(),
+                                    requests_session=session)
+        sp = spotipy.Spotify(auth_manager=auth_manager, requests_session=session, retries=0, status_retries=0)
+    else:
+        sp = spotipy.Spotify(auth=auth, requests_session=session, retries=0, status_retries=0)
+
+    if prefix:
+        sp.prefix = prefix
+    return sp
+
+
+MAX_IDS_PER_CALL = 50  # Limite des endpoints /tracks et /artists
+
+
+def is_spotify_id(value) -> bool:
+    """Un identifiant Spotify est une chaîne base62 de 22 caractères."""
+    return isinstance(value, str) and len(value) == 22 and value.isalnum()
+
+
+def chunked(items, size: int = MAX_IDS_PER_CALL):
+    items = list(items)
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _get_tracks(sp, ids):
+    return sp.tracks(ids)["tracks"]
+
+
+def _get_artists(sp, ids):
+    return sp.artists(ids)["artists"]
+
+
+def _fetch_by_ids(get, endpoint, sp, ids, limiter, concurrency, cache):
+    ids = list(dict.fromkeys(ids))
+    keys = {}
+    objects = {}
+    if cache is not None:
+        # Ids déjà résolus (ou connus comme inconnus) : seuls les autres partent dans les lots de 50 (misses comptés)
+        keys = {obj_id: cache_key("spotify", endpoint, obj_id) for obj_id in ids}
+        cached = cache.get_many(keys.values(), count_misses=True)
+        objects = {obj_id: cached[key] for obj_id, key in keys.items() if cached.get(key)}
+        ids = [obj_id for obj_id in ids if keys[obj_id] not in cached]
+
+    jobs = [(n, (sp, chunk)) for n, chunk in enumerate(chunked(ids))]
+    pages = run_concurrent(get, jobs, limiter, concurrency=concurrency, default=None)
+    fetched = {}
+    for n, chunk in enumerate(chunked(ids)):
+        if pages.get(n) is None:
+            continue  # Lot en erreur : rien à mettre en cache, il sera retenté
+        for obj_id, obj in zip(chunk, pages[n]):
+            fetched[obj_id] = obj or None
+    if cache is not None:
+        cache.set_many({keys[obj_id]: obj for obj_id, obj in fetched.items()})
+    objects.update({obj_id: obj for obj_id, obj in fetched.items() if obj})
+    return objects
+
+
+def fetch_tracks(sp, track_ids, limiter, concurrency: int = 8, cache=None) -> dict:
+    """
+    Récupère les objets piste par lots de 50 ids (un appel sp.tracks par lot).
+
+    Parameters:
+    cache (ResponseCache): Cache de réponses partagé (response_cache.py), optionnel.
+
+    Returns:
+    dict: track_id -> objet piste. Les ids inconnus ou refusés par l'API sont absents.
+    """
+    return _fetch_by_ids(_get_tracks, "tracks", sp, track_ids, limiter, concurrency, cache)
+
+
+def fetch_artists(sp, artist_ids, limiter, concurrency: int = 8, cache=None) -> dict:
+    """
+    Récupère les objets artiste par lots de 50 ids (un appel sp.artists par lot).
+
+    Parameters:
+    cache (ResponseCache): Cache de réponses partagé (response_cache.py), optionnel.
+
+    Returns:
+    dict: artist_id -> objet artiste (avec ses genres).
+    """
+    return _fetch_by_ids(_get_artists, "artists", sp, artist_ids, limiter, concurrency, cache)
@@ -1,15 +1,23 @@
+import numpy as np
 import pandas as pd
-from transformers import pipeline
-from tqdm import tqdm
 import os
 
+from batch_merge import merge_batches, merge_summary, remove_extra_batches, saved_batch
+from dataset_io import read_table
+from lyrics_store import lyrics_column, lyrics_lengths
+
 # === CONFIG ===
-INPUT_CSV = "dataset_with_lastfm_tags.csv"
+INPUT_TABLE = "dataset_with_lastfm_tags"
 OUTPUT_DIR = "mood_activity_batches"
-OUTPUT_FINAL = "dataset_mood_activity.csv"
+OUTPUT_FINAL = "dataset_mood_activity"
 
 BATCH_SIZE = 1000
 
+# Fallback sentiment (voir sentiment.py)
+SENTIMENT_BATCH_SIZE = 32
+SENTIMENT_THREADS = None     # None = nombre de threads par défaut de torch
+SENTIMENT_BACKEND = "torch"  # "torch", "int8" ou "onnx"
+
 MOOD_KEYWORDS = [
     "happy", "sad", "chill", "romantic", "calm", "melancholic"
 ]
@@ -20,90 +28,127 @@ ACTIVITY_KEYWORDS = [
 
 ERA_KEYWORDS = ["60s", "70s", "80s", "90s", "2000s", "2010s", "2020s"]
 
-# === Init sentiment pipeline ===
-print("Chargement modèle sentiment...")
-sentiment_pipeline = pipeline("sentiment-analysis", model="nlptown/bert-base-multilingual-uncased-sentiment")
-
-# === Charger dataset ===
-df = pd.read_csv(INPUT_CSV)
-
-# Colonnes à créer si absentes
-for col in ["mood", "activity", "era"]:
-    if col not in df.columns:
-        df[col] = ""
-
-# Créer dossier batches
-os.makedirs(OUTPUT_DIR, exist_ok=True)
-
-# === Boucle Batch ===
-for batch_num, start_idx in enumerate(range(0, len(df), BATCH_SIZE)):
-    end_idx = min(start_idx + BATCH_SIZE, len(df))
-    batch = df.iloc[start_idx:end_idx].copy()
-
-    print(f"Traitement batch {batch_num} : lignes {start_idx} à {end_idx}")
-
-    for idx, row in tqdm(batch.iterrows(), total=len(batch), desc=f"Batch {batch_num}"):
-
-        # === SKIP auto ===
-        if isinstance(row["mood"], str) and len(row["mood"]) > 0 and \
-           isinstance(row["activity"], str) and len(row["activity"]) > 0:
-            continue  # Déjà enrichi ➜ on saute
-
-        tags = row.get("lastfm_tags", "")
-        mood = ""
-        activity = ""
-        era = ""
-
-        if isinstance(tags, str) and tags.strip():
-            tags_list = [tag.strip().lower() for tag in tags.split(",")]
-
-            for m in MOOD_KEYWORDS:
-                if m in tags_list:
-                    mood = m
-                    break
-
-            for a in ACTIVITY_KEYWORDS:
-                if a in tags_list:
-                    activity = a
-                    break
-
-            for e in ERA_KEYWORDS:
-                if e in tags_list:
-                    era = e
-                    break
-
-        # Fallback sentiment pour mood
-        if not mood:
-            lyrics = row.get("lyrics", "")
-            if isinstance(lyrics, str) and len(lyrics) > 20:
-                try:
-                    result = sentiment_pipeline(lyrics[:512])[0]["label"]
-                    if result in ["LABEL_1", "LABEL_2"]:
-                        mood = "sad"
-                    elif result in ["LABEL_4", "LABEL_5"]:
-                        mood = "happy"
-                    else:
-                        mood = "calm"
-                except Exception as e:
-                    print(f"HF fallback erreur idx {idx} : {e}")
-
-        batch.at[idx, "mood"] = mood
-        batch.at[idx, "activity"] = activity
-        batch.at[idx, "era"] = era
-
-    # Sauvegarde Batch
-    batch_file = os.path.join(OUTPUT_DIR, f"mood_activity_batch_{batch_num:04d}.csv")
-    batch.to_csv(batch_file, index=False)
-    print(f"Batch {batch_num} sauvegardé → {batch_file}")
-
-print("Tous les lots traités ! Fusion finale...")
-
-# === Fusion Finale ===
-import glob
-
-batch_files = glob.glob(f"{OUTPUT_DIR}/mood_activity_batch_*.csv")
-dfs = [pd.read_csv(f) for f in batch_files]
-final_df = pd.concat(dfs, ignore_index=True)
-final_df.to_csv(OUTPUT_FINAL, index=False)
-
-print(f"Dataset final enrichi → {OUTPUT_FINAL}")
+
+def extract_tag_fields(tags: pd.Series) -> pd.DataFrame:
+    """
+    mood, activity, era pour une colonne de tags Last.fm ("tag1, tag2, ...") en une passe vectorisée.
+
+    Chaque champ reçoit le premier mot-clé de sa liste (ordre de priorité de
+    MOOD_KEYWORDS, ACTIVITY_KEYWORDS, ERA_KEYWORDS) présent parmi les tags, "" sinon.
+    """
+    split = tags.fillna("").astype(str).str.split(",")
+    rows = np.repeat(np.arange(len(split)), split.str.len().to_numpy())
+    # Normalisation sur les tags distincts seulement, puis rang de chaque tag dans chaque liste
+    codes, uniques = pd.factorize(split.explode().to_numpy())
+    normalized = pd.Index(uniques, dtype=object).str.strip().str.lower()
+
+    fields = pd.DataFrame(index=tags.index)
+    for col, keywords in (("mood", MOOD_KEYWORDS), ("activity", ACTIVITY_KEYWORDS), ("era", ERA_KEYWORDS)):
+        rank = normalized.map({kw: i for i, kw in enumerate(keywords)}).to_numpy(dtype=float, na_value=np.inf)[codes]
+        hit = np.isfinite(rank)
+        best = np.full(len(split), len(keywords))
+        np.minimum.at(best, rows[hit], rank[hit].astype(int))
+        fields[col] = np.asarray(keywords + [""], dtype=object)[best]
+    return fields
+
+
+def tag_keywords(df):
+    """Passe mots-clés sur tout le dataset, sauf les lignes déjà enrichies (mood et activity remplis)."""
+    done = df["mood"].map(lambda v: isinstance(v, str) and len(v) > 0) & \
+        df["activity"].map(lambda v: isinstance(v, str) and len(v) > 0)
+    tags = df.loc[~done, "lastfm_tags"] if "lastfm_tags" in df.columns else pd.Series("", index=df.index[~done])
+    df.loc[~done, ["mood", "activity", "era"]] = extract_tag_fields(tags)
+    return df
+
+
+def needs_sentiment(batch):
+    """Lignes sans mood après les mots-clés mais avec des paroles exploitables (longueur lue dans l'index du store)."""
+    lengths = lyrics_lengths(batch)
+    if lengths is None:
+        return batch.index[:0]
+    return batch.index[(batch["mood"] == "") & (lengths > 20)]
+
+
+_sentiment_model = None
+
+
+def get_sentiment_model():
+    """Modèle sentiment chargé au premier besoin seulement."""
+    global _sentiment_model
+    if _sentiment_model is None:
+        from sentiment import SentimentMoodModel
+        print("Chargement modèle sentiment...")
+        _sentiment_model = SentimentMoodModel(batch_size=SENTIMENT_BATCH_SIZE, num_threads=SENTIMENT_THREADS,
+                                              backend=SENTIMENT_BACKEND)
+    return _sentiment_model
+
+
+def fill_sentiment(batch):
+    """Fallback sentiment pour mood, en lots triés par longueur."""
+    fallback_idx = needs_sentiment(batch)
+    if len(fallback_idx):
+        try:
+            # Paroles décompressées pour ces lignes seulement
+            moods = get_sentiment_model().predict_moods(lyrics_column(batch.loc[fallback_idx]).tolist())
+            batch.loc[fallback_idx, "mood"] = moods
+        except Exception as e:
+            # mood reste vide : ces lignes repassent par le modèle au prochain run (voir main)
+            print(f"HF fallback erreur ({len(fallback_idx)} lignes, retentées au prochain run) : {e}")
+    return batch
+
+
+def prepare_columns(df):
+    # Colonnes à créer si absentes
+    for col in ["mood", "activity", "era"]:
+        if col not in df.columns:
+            df[col] = ""
+        df[col] = df[col].astype(object)
+    return df
+
+
+def tag_moods(df):
+    """Étape complète (mots-clés puis fallback sentiment) sur un DataFrame, sans batchs."""
+    return fill_sentiment(tag_keywords(prepare_columns(df)))
+
+
+def main():
+    # === Charger dataset ===
+    df = prepare_columns(read_table(INPUT_TABLE))
+
+    # === Mots-clés Last.fm : tout le dataset d'un coup, sans le modèle ===
+    tag_keywords(df)
+
+    # Créer dossier batches
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+
+    # === Boucle Batch ===
+    for batch_num, start_idx in enumerate(range(0, len(df), BATCH_SIZE)):
+        end_idx = min(start_idx + BATCH_SIZE, len(df))
+        batch = df.iloc[start_idx:end_idx].copy()
+        batch_file = os.path.join(OUTPUT_DIR, f"mood_activity_batch_{batch_num:04d}.csv")
+        unchanged, saved = saved_batch(batch_file, batch, ["mood"])
+        # Moods du modèle déjà calculés pour les lignes inchangées : seuls les manquants repassent par le modèle
+        empty = saved.index[batch.loc[saved.index, "mood"].eq("").to_numpy()]
+        batch.loc[empty, "mood"] = saved.loc[empty, "mood"].fillna("")
+        if unchanged and len(needs_sentiment(batch)) == 0:
+            continue  # Batch déjà traité, mêmes titres et aucun mood en échec, on saute
+
+        print(f"Traitement batch {batch_num} : lignes {start_idx} à {end_idx}")
+        fill_sentiment(batch)
+
+        # Sauvegarde Batch
+        batch.to_csv(batch_file, index=False)
+        print(f"Batch {batch_num} sauvegardé → {batch_file}")
+
+    print("Tous les lots traités ! Fusion finale...")
+
+    # === Fusion Finale ===
+    remove_extra_batches(f"{OUTPUT_DIR}/mood_activity_batch_*.csv", len(df), BATCH_SIZE)
+    stats = merge_batches(f"{OUTPUT_DIR}/mood_activity_batch_*.csv", OUTPUT_FINAL,
+                          expected_rows=len(df), batch_size=BATCH_SIZE)
+
+    print(f"Dataset final enrichi → {OUTPUT_FINAL} ({merge_summary(stats)})")
+
+
+if __name__ == "__main__":
+    main()